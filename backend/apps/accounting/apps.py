@@ -13,4 +13,4 @@ class AccountingConfig(AppConfig):
     
     def ready(self):
         """Import signals when app is ready."""
-        pass  # Signals will be added as needed
+        import apps.accounting.signals  # noqa: F401
@@ -0,0 +1,260 @@
+"""
+Per-company chart of accounts cache.
+
+Two tiers:
+- In-process: a ChartOfAccounts per company with accounts indexed by
+  code and id and the active account tree pre-built. Lookups are
+  dictionary reads.
+- Redis (Django cache): the raw account rows under a versioned key, so a
+  worker that misses locally rebuilds from one cache read instead of a
+  query.
+
+Each company has a version counter in the cache. Account saves and
+deletes bump it after commit (see signals); workers compare their local
+copy against the counter at most every CHART_VERSION_CHECK_SECONDS, so
+all workers converge on the new chart within that interval. The worker
+that made the change drops its local copy immediately.
+
+Balances are not cached: they change on every posting (which bypasses
+model signals), so callers merge current_balance in separately.
+
+Usage:
+    chart = get_chart(company.id)
+    receivable = chart.by_code['1100']
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+# How long a chart payload stays in the shared cache
+CHART_CACHE_TIMEOUT = getattr(settings, 'ACCOUNTING_CHART_CACHE_TIMEOUT_SECONDS', 3600)
+
+# How often a worker checks its local chart against the shared version
+CHART_VERSION_CHECK_SECONDS = getattr(settings, 'ACCOUNTING_CHART_VERSION_CHECK_SECONDS', 5)
+
+# Account fields held in the cache (in payload tuple order)
+CHART_FIELDS = (
+    'id', 'parent_id', 'code', 'name', 'account_type',
+    'account_subtype', 'gst_code', 'is_active', 'is_system',
+)
+
+
+@dataclass(frozen=True)
+class CachedAccount:
+    """Account fields that only change through Account.save()."""
+    id: Any
+    parent_id: Any
+    code: str
+    name: str
+    account_type: str
+    account_subtype: str
+    gst_code: str
+    is_active: bool
+    is_system: bool
+    
+    @property
+    def is_debit_normal(self) -> bool:
+        """True for asset and expense accounts."""
+        return self.account_type in ('asset', 'expense')
+
+
+class ChartOfAccounts:
+    """
+    A company's accounts indexed by code and id, with the active tree.
+    
+    Instances are shared between threads and must not be mutated.
+    """
+    
+    def __init__(self, version: int, rows: Iterable[Tuple]):
+        self.version = version
+        self.accounts: List[CachedAccount] = [CachedAccount(*row) for row in rows]
+        self.by_id: Dict[Any, CachedAccount] = {account.id: account for account in self.accounts}
+        self.by_code: Dict[str, CachedAccount] = {account.code: account for account in self.accounts}
+        
+        self.children: Dict[Any, List[CachedAccount]] = {}
+        for account in self.accounts:
+            if account.parent_id is not None:
+                self.children.setdefault(account.parent_id, []).append(account)
+        
+        # Active accounts reachable from active roots, parents first
+        # (depth-first in code order)
+        self.active_order: List[CachedAccount] = []
+        stack = [
+            account for account in reversed(self.accounts)
+            if account.parent_id is None and account.is_active
+        ]
+        while stack:
+            account = stack.pop()
+            self.active_order.append(account)
+            stack.extend(
+                child for child in reversed(self.children.get(account.id, []))
+                if child.is_active
+            )
+        
+        self.tree = self._build_tree(lambda account: {})
+    
+    def _build_tree(self, extra) -> List[Dict[str, Any]]:
+        """
+        Assemble the active tree in one pass over active_order.
+        
+        Args:
+            extra: Called with each account; returns extra node fields
+        """
+        nodes: Dict[Any, Dict[str, Any]] = {}
+        roots = []
+        for account in self.active_order:
+            node = {
+                'id': account.id,
+                'code': account.code,
+                'name': account.name,
+                'account_type': account.account_type,
+                **extra(account),
+                'is_active': account.is_active,
+                'children': [],
+            }
+            nodes[account.id] = node
+            if account.parent_id is None:
+                roots.append(node)
+            else:
+                nodes[account.parent_id]['children'].append(node)
+        return roots
+    
+    def resolve(self, codes: Iterable[str]) -> Dict[str, Any]:
+        """Map codes to account IDs (missing codes are omitted)."""
+        return {
+            code: self.by_code[code].id for code in codes if code in self.by_code
+        }
+    
+    def tree_with_balances(
+        self,
+        balances: Dict[Any, Decimal],
+        roll_up: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Copy the active tree with a current_balance on every node.
+        
+        Args:
+            balances: Dict of account ID to current_balance
+            roll_up: Also add total_balance (own balance plus all active
+                descendants', signed to the node's normal balance),
+                computed bottom-up in one pass
+        """
+        zero = Decimal('0.00')
+        if not roll_up:
+            return self._build_tree(
+                lambda account: {'current_balance': balances.get(account.id, zero)}
+            )
+        
+        totals = {account.id: balances.get(account.id, zero) for account in self.active_order}
+        for account in reversed(self.active_order):
+            if account.parent_id is not None:
+                parent = self.by_id[account.parent_id]
+                sign = 1 if parent.is_debit_normal == account.is_debit_normal else -1
+                totals[account.parent_id] += sign * totals[account.id]
+        
+        return self._build_tree(lambda account: {
+            'current_balance': balances.get(account.id, zero),
+            'total_balance': totals[account.id],
+        })
+
+
+# company_id -> (chart, monotonic time of last version check)
+_local: Dict[str, Tuple[ChartOfAccounts, float]] = {}
+_local_lock = threading.Lock()
+
+
+def version_key(company_id) -> str:
+    """Cache key of a company's chart version counter."""
+    return f"accounting:chart_version:{company_id}"
+
+
+def chart_key(company_id, version: int) -> str:
+    """Cache key of a company's chart payload at a version."""
+    return f"accounting:chart:{company_id}:{version}"
+
+
+def _current_version(company_id) -> int:
+    """Get the shared chart version, seeding it if missing."""
+    key = version_key(company_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a lost counter never reuses an old version
+        cache.add(key, time.time_ns() // 1000, None)
+        version = cache.get(key)
+    return version
+
+
+def _load_rows(company_id) -> List[Tuple]:
+    from apps.accounting.models import Account
+    
+    return list(
+        Account.objects.filter(company_id=company_id)
+        .order_by('code')
+        .values_list(*CHART_FIELDS)
+    )
+
+
+def get_chart(company_id) -> ChartOfAccounts:
+    """
+    Get a company's chart of accounts.
+    
+    Args:
+        company_id: Company UUID
+    
+    Returns:
+        ChartOfAccounts (no more than CHART_VERSION_CHECK_SECONDS older
+        than the last committed Account change made by another worker)
+    """
+    key = str(company_id)
+    now = time.monotonic()
+    
+    local = _local.get(key)
+    if local is not None and now - local[1] < CHART_VERSION_CHECK_SECONDS:
+        return local[0]
+    
+    version = _current_version(company_id)
+    if local is not None and local[0].version == version:
+        chart = local[0]
+    else:
+        rows = cache.get(chart_key(company_id, version))
+        if rows is None:
+            rows = _load_rows(company_id)
+            cache.set(chart_key(company_id, version), rows, CHART_CACHE_TIMEOUT)
+            logger.debug(f"Built chart of accounts for company {company_id} (v{version})")
+        chart = ChartOfAccounts(version, rows)
+    
+    with _local_lock:
+        _local[key] = (chart, now)
+    return chart
+
+
+def invalidate_chart(company_id) -> None:
+    """
+    Publish a new chart version for a company.
+    
+    Call after the Account change has committed.
+    """
+    key = version_key(company_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns() // 1000, None)
+        cache.incr(key)
+    
+    with _local_lock:
+        _local.pop(str(company_id), None)
+
+
+def clear_local_charts() -> None:
+    """Drop every in-process chart (e.g. in tests)."""
+    with _local_lock:
+        _local.clear()
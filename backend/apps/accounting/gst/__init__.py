@@ -1,7 +1,16 @@
 """
 GST engine package for Singapore GST calculations.
 """
-from apps.accounting.gst.rates import get_gst_rate, get_current_gst_rate, GST_RATES
+from apps.accounting.gst.rates import (
+    get_gst_rate,
+    get_current_gst_rate,
+    get_rate_segments,
+    get_quarter_rate_segments,
+    GST_RATES,
+    GST_TIMELINE,
+    GSTRateTimeline,
+    RateSegment,
+)
 from apps.accounting.gst.engine import GSTEngine
 
 
@@ -9,5 +18,10 @@ __all__ = [
     'GSTEngine',
     'get_gst_rate',
     'get_current_gst_rate',
+    'get_rate_segments',
+    'get_quarter_rate_segments',
     'GST_RATES',
+    'GST_TIMELINE',
+    'GSTRateTimeline',
+    'RateSegment',
 ]
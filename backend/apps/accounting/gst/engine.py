@@ -3,24 +3,33 @@ GST Engine for Singapore GST calculations and F5 return preparation.
 
 Provides:
 - GST calculation for different tax codes (SR, ZR, ES, OS)
+- Batch (columnar) GST calculation in integer cents
 - Historical rate lookup
 - F5 return preparation with box calculations
+- Set-based F5 aggregation grouped by GST code and rate epoch
 - F5 validation
 """
+from array import array
 from dataclasses import dataclass
 from datetime import date
 from decimal import Decimal, ROUND_HALF_UP
-from typing import Optional, Dict, Any, Tuple, List
+from typing import Optional, Dict, Any, Tuple, List, Sequence, Union
 import logging
 
-from django.db.models import Sum, Q
+from django.db.models import (
+    Case, DecimalField, ExpressionWrapper, F, Q, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Round
 from django.utils import timezone
 
-from apps.accounting.gst.rates import get_gst_rate, get_current_gst_rate
+from apps.accounting.gst.rates import get_gst_rate, get_current_gst_rate, get_rate_segments
 
 
 logger = logging.getLogger(__name__)
 
+# Rates are expressed in basis points for integer-cent arithmetic
+RATE_SCALE = 10000
+
 
 @dataclass
 class GSTCalculationResult:
@@ -42,6 +51,49 @@ class GSTCalculationResult:
         }
 
 
+@dataclass
+class GSTBatchResult:
+    """
+    Columnar result of GSTEngine.calculate_many().
+    
+    Amount columns are int64 arrays of cents; use the *_amounts
+    properties for Decimal values.
+    """
+    net_cents: array
+    gst_cents: array
+    gross_cents: array
+    gst_rates: List[Decimal]
+    gst_codes: List[str]
+    
+    def __len__(self) -> int:
+        return len(self.net_cents)
+    
+    @property
+    def net_amounts(self) -> List[Decimal]:
+        """Net amounts as Decimals."""
+        return [Decimal(cents).scaleb(-2) for cents in self.net_cents]
+    
+    @property
+    def gst_amounts(self) -> List[Decimal]:
+        """GST amounts as Decimals."""
+        return [Decimal(cents).scaleb(-2) for cents in self.gst_cents]
+    
+    @property
+    def gross_amounts(self) -> List[Decimal]:
+        """Gross amounts as Decimals."""
+        return [Decimal(cents).scaleb(-2) for cents in self.gross_cents]
+    
+    def row(self, index: int) -> GSTCalculationResult:
+        """Get a single line as a GSTCalculationResult."""
+        return GSTCalculationResult(
+            net_amount=Decimal(self.net_cents[index]).scaleb(-2),
+            gst_amount=Decimal(self.gst_cents[index]).scaleb(-2),
+            gross_amount=Decimal(self.gross_cents[index]).scaleb(-2),
+            gst_rate=self.gst_rates[index],
+            gst_code=self.gst_codes[index],
+        )
+
+
 @dataclass
 class F5Return:
     """GST F5 Return data structure."""
@@ -144,6 +196,87 @@ class GSTEngine:
             gst_code=gst_code,
         )
     
+    @classmethod
+    def calculate_many(
+        cls,
+        amounts: Sequence[Union[Decimal, int]],
+        gst_codes: Union[str, Sequence[str]],
+        transaction_dates: Optional[Sequence[Optional[date]]] = None,
+        amount_includes_gst: bool = False,
+        amounts_in_cents: bool = False,
+    ) -> GSTBatchResult:
+        """
+        Calculate GST for many transactions at once.
+        
+        Columnar counterpart of calculate(). Amounts are converted to
+        integer cents and rates to basis points, so each line costs a
+        few integer operations instead of Decimal quantize calls. Rates
+        are looked up once per distinct (code, date) pair. Results are
+        identical to calling calculate() per line (ROUND_HALF_UP).
+        
+        Args:
+            amounts: Transaction amounts (Decimal, or int cents if
+                amounts_in_cents is True)
+            gst_codes: GST code per line, or one code for all lines
+            transaction_dates: Date per line for rate lookup (default: today)
+            amount_includes_gst: If True, amounts are GST-inclusive
+            amounts_in_cents: If True, amounts are already integer cents
+            
+        Returns:
+            GSTBatchResult with net, GST and gross cent columns
+            
+        Raises:
+            ValueError: If column lengths differ, an amount has
+                sub-cent precision or a rate has more than 4 decimals
+        """
+        count = len(amounts)
+        if isinstance(gst_codes, str):
+            gst_codes = [gst_codes] * count
+        if transaction_dates is None:
+            transaction_dates = [None] * count
+        if len(gst_codes) != count or len(transaction_dates) != count:
+            raise ValueError("amounts, gst_codes and transaction_dates must have equal length")
+        
+        net_cents = array('q')
+        gst_cents = array('q')
+        gross_cents = array('q')
+        rates: List[Decimal] = []
+        rate_cache: Dict[Tuple[str, Optional[date]], Tuple[Decimal, int]] = {}
+        
+        for amount, gst_code, transaction_date in zip(amounts, gst_codes, transaction_dates):
+            key = (gst_code, transaction_date)
+            cached = rate_cache.get(key)
+            if cached is None:
+                rate = cls.get_rate(gst_code, transaction_date)
+                cached = rate_cache[key] = (rate, _rate_to_basis_points(rate))
+            rate, basis_points = cached
+            
+            cents = amount if amounts_in_cents else _amount_to_cents(amount)
+            
+            if amount_includes_gst and basis_points > 0:
+                # Extract GST from inclusive amount
+                net = _divide_round_half_up(cents * RATE_SCALE, RATE_SCALE + basis_points)
+                gst = cents - net
+                gross = cents
+            else:
+                # Calculate GST on exclusive amount
+                net = cents
+                gst = _divide_round_half_up(cents * basis_points, RATE_SCALE)
+                gross = cents + gst
+            
+            net_cents.append(net)
+            gst_cents.append(gst)
+            gross_cents.append(gross)
+            rates.append(rate)
+        
+        return GSTBatchResult(
+            net_cents=net_cents,
+            gst_cents=gst_cents,
+            gross_cents=gross_cents,
+            gst_rates=rates,
+            gst_codes=list(gst_codes),
+        )
+    
     @classmethod
     def get_rate(
         cls,
@@ -180,6 +313,7 @@ class GSTEngine:
         company,
         quarter: int,
         year: int,
+        use_sql_aggregation: bool = True,
     ) -> F5Return:
         """
         Prepare GST F5 return data for a quarter.
@@ -191,6 +325,8 @@ class GSTEngine:
             company: Company model instance
             quarter: Quarter (1-4)
             year: Year
+            use_sql_aggregation: If True, item-level fallback is computed
+                in a single grouped query; if False, items are walked in Python
             
         Returns:
             F5Return with all box values calculated
@@ -228,20 +364,20 @@ class GSTEngine:
         
         # If order doesn't have F5 fields, calculate from items
         if box_1 == Decimal('0.00') and box_6 == Decimal('0.00'):
-            for order in orders:
-                for item in order.items.select_related('product'):
-                    product_gst_code = item.product.gst_code if item.product else 'SR'
-                    item_total = item.unit_price * item.quantity
-                    
-                    if product_gst_code == 'SR':
-                        box_1 += item_total
-                        gst_result = cls.calculate(item_total, 'SR', order.created_at.date())
-                        box_6 += gst_result.gst_amount
-                    elif product_gst_code == 'ZR':
-                        box_2 += item_total
-                    elif product_gst_code == 'ES':
-                        box_3 += item_total
-                    # OS is out of scope, not included
+            if use_sql_aggregation:
+                rows = cls.aggregate_f5_supplies(orders, period_start, period_end)
+            else:
+                rows = cls._aggregate_f5_supplies_python(orders)
+            
+            for row in rows:
+                if row['gst_code'] == 'SR':
+                    box_1 += row['supplies']
+                    box_6 += row['output_tax']
+                elif row['gst_code'] == 'ZR':
+                    box_2 += row['supplies']
+                elif row['gst_code'] == 'ES':
+                    box_3 += row['supplies']
+                # OS is out of scope, not included
         
         # Calculate derived boxes
         box_4 = box_1 + box_2 + box_3  # Total supplies
@@ -263,6 +399,125 @@ class GSTEngine:
             box_8=box_8,
         )
     
+    @classmethod
+    def aggregate_f5_supplies(
+        cls,
+        orders,
+        period_start: date,
+        period_end: date,
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate order item supplies in a single grouped query.
+        
+        Lines are grouped by product GST code and by the GST rate epoch
+        (from GST_RATES) the order falls in. Output tax is rounded per
+        line with ROUND_HALF_UP semantics before summing, matching
+        GSTEngine.calculate() applied line by line.
+        
+        Args:
+            orders: Order queryset to aggregate
+            period_start: First day of the period
+            period_end: Last day of the period
+            
+        Returns:
+            List of dicts with gst_code, gst_rate, supplies, output_tax
+        """
+        from apps.commerce.models import OrderItem
+        
+        money = DecimalField(max_digits=14, decimal_places=2)
+        
+        rows = (
+            OrderItem.objects
+            .filter(order__in=orders)
+            .annotate(
+                f5_gst_code=Coalesce('product__gst_code', Value('SR')),
+                f5_rate=cls._rate_epoch_case(
+                    'order__created_at__date', period_start, period_end
+                ),
+                f5_supplies=ExpressionWrapper(
+                    F('unit_price') * F('quantity'), output_field=money
+                ),
+            )
+            .annotate(
+                # PostgreSQL round(numeric) rounds half away from zero,
+                # which equals ROUND_HALF_UP for non-negative amounts
+                f5_output_tax=Round(
+                    ExpressionWrapper(
+                        F('f5_supplies') * F('f5_rate'), output_field=money
+                    ),
+                    precision=2,
+                ),
+            )
+            .values('f5_gst_code', 'f5_rate')
+            .annotate(
+                supplies=Sum('f5_supplies'),
+                output_tax=Sum('f5_output_tax'),
+            )
+            .order_by()
+        )
+        
+        return [
+            {
+                'gst_code': row['f5_gst_code'],
+                'gst_rate': row['f5_rate'],
+                'supplies': row['supplies'] or Decimal('0.00'),
+                'output_tax': (
+                    row['output_tax'] or Decimal('0.00')
+                ).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP),
+            }
+            for row in rows
+        ]
+    
+    @classmethod
+    def _aggregate_f5_supplies_python(cls, orders) -> List[Dict[str, Any]]:
+        """
+        Aggregate order item supplies by walking items in Python.
+        
+        Reference implementation for aggregate_f5_supplies(); issues
+        one query per order.
+        """
+        totals: Dict[Tuple[str, Decimal], Dict[str, Any]] = {}
+        
+        for order in orders:
+            for item in order.items.select_related('product'):
+                product_gst_code = item.product.gst_code if item.product else 'SR'
+                item_total = item.unit_price * item.quantity
+                rate = get_gst_rate(order.created_at.date())
+                
+                row = totals.setdefault((product_gst_code, rate), {
+                    'gst_code': product_gst_code,
+                    'gst_rate': rate,
+                    'supplies': Decimal('0.00'),
+                    'output_tax': Decimal('0.00'),
+                })
+                row['supplies'] += item_total
+                if product_gst_code == 'SR':
+                    gst_result = cls.calculate(item_total, 'SR', order.created_at.date())
+                    row['output_tax'] += gst_result.gst_amount
+        
+        return list(totals.values())
+    
+    @staticmethod
+    def _rate_epoch_case(date_field: str, period_start: date, period_end: date) -> Case:
+        """
+        Build a CASE expression mapping a date column to its GST rate.
+        
+        Only rate segments overlapping [period_start, period_end] are emitted.
+        """
+        segments = list(get_rate_segments(period_start, period_end))
+        
+        # Latest segment first so each WHEN only needs a lower bound
+        whens = [
+            When(**{f'{date_field}__gte': segment.start}, then=Value(segment.rate))
+            for segment in reversed(segments[1:])
+        ]
+        
+        return Case(
+            *whens,
+            default=Value(segments[0].rate),
+            output_field=DecimalField(max_digits=5, decimal_places=4),
+        )
+    
     @classmethod
     def validate_f5(cls, f5_return: F5Return) -> Tuple[bool, List[str]]:
         """
@@ -335,3 +590,27 @@ class GSTEngine:
             date(year, start_month, start_day),
             date(year, end_month, end_day),
         )
+
+
+def _amount_to_cents(amount: Decimal) -> int:
+    """Convert a Decimal amount to integer cents without rounding."""
+    cents = Decimal(amount) * 100
+    integral = cents.to_integral_value()
+    if cents != integral:
+        raise ValueError(f"Amount has sub-cent precision: {amount}")
+    return int(integral)
+
+
+def _rate_to_basis_points(rate: Decimal) -> int:
+    """Convert a Decimal rate (e.g. 0.09) to basis points (e.g. 900)."""
+    scaled = rate * RATE_SCALE
+    integral = scaled.to_integral_value()
+    if scaled != integral:
+        raise ValueError(f"GST rate has more than 4 decimal places: {rate}")
+    return int(integral)
+
+
+def _divide_round_half_up(numerator: int, denominator: int) -> int:
+    """Integer division rounding half away from zero (Decimal ROUND_HALF_UP)."""
+    quotient = (abs(numerator) * 2 + denominator) // (denominator * 2)
+    return quotient if numerator >= 0 else -quotient
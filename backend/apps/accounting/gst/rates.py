@@ -8,10 +8,16 @@ Rate History:
 - July 1, 2007: Increased to 7%
 - January 1, 2023: Increased to 8%
 - January 1, 2024: Increased to 9% (current)
+
+Lookups go through a compiled GSTRateTimeline that bisects over
+ordinal day boundaries instead of scanning GST_RATES.
 """
-from datetime import date
+from bisect import bisect_right
+from dataclasses import dataclass
+from datetime import date, timedelta
 from decimal import Decimal
-from typing import List, Tuple
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
 
 from django.conf import settings
 
@@ -29,12 +35,84 @@ GST_RATES: List[Tuple[date, Decimal]] = [
 ]
 
 
+@dataclass(frozen=True)
+class RateSegment:
+    """A contiguous date range (inclusive) charged at a single GST rate."""
+    start: date
+    end: date
+    rate: Decimal
+
+
+class GSTRateTimeline:
+    """
+    Precompiled GST rate history.
+    
+    Effective dates are stored as ascending ordinal day numbers so a
+    rate lookup is a single bisect. Rates are interned, so every lookup
+    of the same rate returns the same Decimal instance.
+    """
+    
+    def __init__(self, rates: List[Tuple[date, Decimal]]):
+        interned: Dict[Decimal, Decimal] = {}
+        ordered = sorted(rates, key=lambda entry: entry[0])
+        
+        self._boundaries: List[int] = [
+            effective_date.toordinal() for effective_date, _ in ordered
+        ]
+        self._starts: List[date] = [effective_date for effective_date, _ in ordered]
+        self._rates: List[Decimal] = [
+            interned.setdefault(rate, rate) for _, rate in ordered
+        ]
+        self.zero_rate = interned.setdefault(Decimal('0.00'), Decimal('0.00'))
+        self.latest_rate = self._rates[-1] if self._rates else self.zero_rate
+    
+    def rate_for(self, transaction_date: date) -> Decimal:
+        """Get the rate in effect on a date."""
+        index = bisect_right(self._boundaries, transaction_date.toordinal()) - 1
+        if index < 0:
+            return self.zero_rate
+        return self._rates[index]
+    
+    def segments(self, period_start: date, period_end: date) -> Iterator[RateSegment]:
+        """
+        Split a period into rate segments.
+        
+        Yields one RateSegment per rate in effect within
+        [period_start, period_end], in ascending date order.
+        """
+        if period_start > period_end:
+            return
+        
+        index = bisect_right(self._boundaries, period_start.toordinal()) - 1
+        segment_start = period_start
+        
+        while segment_start <= period_end:
+            rate = self._rates[index] if index >= 0 else self.zero_rate
+            next_index = index + 1
+            if next_index < len(self._starts) and self._starts[next_index] <= period_end:
+                segment_end = self._starts[next_index] - timedelta(days=1)
+            else:
+                segment_end = period_end
+            
+            yield RateSegment(start=segment_start, end=segment_end, rate=rate)
+            
+            segment_start = segment_end + timedelta(days=1)
+            index = next_index
+
+
+GST_TIMELINE = GSTRateTimeline(GST_RATES)
+
+# Last seen settings.GST_DEFAULT_RATE and its Decimal form
+_current_rate_cache: Tuple[object, Decimal] = (None, GST_TIMELINE.latest_rate)
+
+
+@lru_cache(maxsize=4096)
 def get_gst_rate(transaction_date: date) -> Decimal:
     """
     Get the applicable GST rate for a given transaction date.
     
     Uses historical rate lookup for accurate GST calculation
-    on historical transactions.
+    on historical transactions. Results are memoized per date.
     
     Args:
         transaction_date: Date of the transaction
@@ -42,10 +120,7 @@ def get_gst_rate(transaction_date: date) -> Decimal:
     Returns:
         Decimal GST rate (e.g., 0.09 for 9%)
     """
-    for effective_date, rate in GST_RATES:
-        if transaction_date >= effective_date:
-            return rate
-    return Decimal('0.00')
+    return GST_TIMELINE.rate_for(transaction_date)
 
 
 def get_current_gst_rate() -> Decimal:
@@ -58,15 +133,60 @@ def get_current_gst_rate() -> Decimal:
     Returns:
         Current GST rate as Decimal
     """
+    global _current_rate_cache
+    
     # Check for environment override
     env_rate = getattr(settings, 'GST_DEFAULT_RATE', None)
     if env_rate is not None:
+        cached_setting, cached_rate = _current_rate_cache
+        if env_rate is cached_setting:
+            return cached_rate
         if isinstance(env_rate, Decimal):
-            return env_rate
-        return Decimal(str(env_rate))
+            rate = env_rate
+        else:
+            rate = Decimal(str(env_rate))
+        _current_rate_cache = (env_rate, rate)
+        return rate
     
     # Return most recent rate
-    return GST_RATES[0][1]
+    return GST_TIMELINE.latest_rate
+
+
+def get_rate_segments(period_start: date, period_end: date) -> Iterator[RateSegment]:
+    """
+    Split a period into segments charged at a single GST rate.
+    
+    Lets bulk callers (F5, ledger, UBL) apply one rate per segment
+    instead of looking up a rate per transaction.
+    
+    Args:
+        period_start: First day of the period
+        period_end: Last day of the period
+        
+    Returns:
+        Iterator of RateSegment in ascending date order
+    """
+    return GST_TIMELINE.segments(period_start, period_end)
+
+
+def get_quarter_rate_segments(quarter: int, year: int) -> Iterator[RateSegment]:
+    """
+    Split a calendar quarter into GST rate segments.
+    
+    Args:
+        quarter: Quarter (1-4)
+        year: Year
+        
+    Returns:
+        Iterator of RateSegment in ascending date order
+    """
+    start_month = (quarter - 1) * 3 + 1
+    period_start = date(year, start_month, 1)
+    if quarter == 4:
+        period_end = date(year, 12, 31)
+    else:
+        period_end = date(year, start_month + 3, 1) - timedelta(days=1)
+    return get_rate_segments(period_start, period_end)
 
 
 def format_gst_rate_percent(rate: Decimal) -> str:
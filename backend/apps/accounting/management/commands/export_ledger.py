@@ -0,0 +1,61 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounting.models import ENTRY_STATUS_CHOICES, REFERENCE_TYPE_CHOICES
+from apps.accounting.services import LedgerExportService
+from apps.accounting.services.ledger_export_service import EXPORT_CHUNK_SIZE, EXPORT_FORMATS
+from apps.accounts.models import Company
+
+
+class Command(BaseCommand):
+    help = 'Export a company general ledger as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--company', required=True, help='Company UEN')
+        parser.add_argument('--start', type=date.fromisoformat, help='First entry date (YYYY-MM-DD)')
+        parser.add_argument('--end', type=date.fromisoformat, help='Last entry date (YYYY-MM-DD)')
+        parser.add_argument(
+            '--account',
+            action='append',
+            dest='accounts',
+            help='Account code (repeat for several)',
+        )
+        parser.add_argument(
+            '--reference-type',
+            choices=[value for value, _ in REFERENCE_TYPE_CHOICES],
+        )
+        parser.add_argument(
+            '--status',
+            choices=[value for value, _ in ENTRY_STATUS_CHOICES] + ['all'],
+            default='posted',
+        )
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv', dest='file_format')
+        parser.add_argument('--output', help='Output file (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        company = Company.objects.filter(uen=str(options['company']).upper()).first()
+        if company is None:
+            raise CommandError(f"Company {options['company']} not found")
+        if options['start'] and options['end'] and options['start'] > options['end']:
+            raise CommandError('--start must be on or before --end')
+
+        chunks = LedgerExportService.stream(
+            company,
+            options['file_format'],
+            chunk_size=options['chunk_size'],
+            start_date=options['start'],
+            end_date=options['end'],
+            account_codes=options['accounts'],
+            reference_type=options['reference_type'],
+            status=None if options['status'] == 'all' else options['status'],
+        )
+
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,74 @@
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+
+
+def backfill_period_balances(apps, schema_editor):
+    """Build snapshots for entries posted before this migration."""
+    JournalLine = apps.get_model('accounting', 'JournalLine')
+    AccountPeriodBalance = apps.get_model('accounting', 'AccountPeriodBalance')
+    
+    rows = JournalLine.objects.filter(
+        journal_entry__status='posted',
+    ).annotate(
+        period_start=TruncMonth('journal_entry__entry_date'),
+    ).values(
+        'account_id', 'account__company_id', 'period_start',
+    ).annotate(
+        period_debit=Sum('debit_amount'),
+        period_credit=Sum('credit_amount'),
+    ).order_by('account_id', 'period_start')
+    
+    snapshots = []
+    closing = {}
+    for row in rows:
+        debit, credit = closing.get(row['account_id'], (Decimal('0.00'), Decimal('0.00')))
+        debit += row['period_debit']
+        credit += row['period_credit']
+        closing[row['account_id']] = (debit, credit)
+        snapshots.append(AccountPeriodBalance(
+            company_id=row['account__company_id'],
+            account_id=row['account_id'],
+            period_start=row['period_start'],
+            period_debit=row['period_debit'],
+            period_credit=row['period_credit'],
+            closing_debit=debit,
+            closing_credit=credit,
+        ))
+    
+    AccountPeriodBalance.objects.bulk_create(snapshots, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0002_initial'),
+        ('accounts', '0002_alter_company_options_alter_role_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccountPeriodBalance',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('period_start', models.DateField(help_text='First day of the month')),
+                ('period_debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('period_credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('closing_debit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('closing_credit', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('account', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_balances', to='accounting.account')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='account_period_balances', to='accounts.company')),
+            ],
+            options={
+                'db_table': '"accounting"."account_period_balances"',
+                'ordering': ['account', 'period_start'],
+                'indexes': [models.Index(fields=['company', 'period_start'], name='period_balances_company_idx')],
+                'constraints': [models.UniqueConstraint(fields=('account', 'period_start'), name='period_balance_unique_account_period')],
+            },
+        ),
+        migrations.RunPython(backfill_period_balances, migrations.RunPython.noop),
+    ]
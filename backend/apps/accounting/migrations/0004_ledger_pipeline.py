@@ -0,0 +1,36 @@
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0003_accountperiodbalance'),
+        ('accounts', '0002_alter_company_options_alter_role_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEvent',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('reference_type', models.CharField(choices=[('order', 'Order'), ('invoice', 'Invoice'), ('payment', 'Payment'), ('manual', 'Manual Entry'), ('adjustment', 'Adjustment')], max_length=50)),
+                ('reference_id', models.UUIDField(help_text='UUID of the source document')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, help_text='When the event was applied to the ledger', null=True)),
+                ('attempts', models.PositiveIntegerField(default=0, help_text='Failed processing attempts')),
+                ('last_error', models.TextField(blank=True, default='')),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_events', to='accounts.company')),
+            ],
+            options={
+                'db_table': '"accounting"."ledger_events"',
+                'ordering': ['created_at'],
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['created_at'], name='ledger_events_pending_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='journalentry',
+            constraint=models.UniqueConstraint(condition=models.Q(('reference_type', 'order'), models.Q(('status', 'voided'), _negated=True)), fields=('company', 'reference_type', 'reference_id'), name='journal_entry_unique_live_reference'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+import django.db.models.deletion
+import uuid
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounting', '0004_ledger_pipeline'),
+        ('accounts', '0002_alter_company_options_alter_role_options_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ARAgingSnapshot',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('snapshot_date', models.DateField()),
+                ('current', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Not yet due', max_digits=15)),
+                ('days_1_30', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('days_31_60', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('days_61_90', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('days_90_plus', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=15)),
+                ('invoice_count', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ar_aging_snapshots', to='accounts.company')),
+            ],
+            options={
+                'db_table': '"accounting"."ar_aging_snapshots"',
+                'ordering': ['company', '-snapshot_date'],
+                'constraints': [models.UniqueConstraint(fields=('company', 'snapshot_date'), name='ar_aging_snapshot_unique_company_date')],
+            },
+        ),
+    ]
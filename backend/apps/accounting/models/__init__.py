@@ -5,8 +5,11 @@ This package contains all models for the accounting domain:
 - Account: Chart of Accounts with hierarchical structure
 - JournalEntry: Double-entry journal entries
 - JournalLine: Individual debit/credit lines
+- AccountPeriodBalance: Monthly posted totals per account
+- LedgerEvent: Queued ledger work for source documents
 - Invoice: Customer invoices with PEPPOL support
 - Payment: Payment records with gateway integration
+- ARAgingSnapshot: Daily receivables aging per company
 """
 from apps.accounting.models.account import (
     Account,
@@ -20,11 +23,14 @@ from apps.accounting.models.journal_entry import (
     REFERENCE_TYPE_CHOICES,
 )
 from apps.accounting.models.journal_line import JournalLine
+from apps.accounting.models.period_balance import AccountPeriodBalance
+from apps.accounting.models.ledger_event import LedgerEvent
 from apps.accounting.models.invoice import (
     Invoice,
     INVOICE_STATUS_CHOICES,
     PEPPOL_STATUS_CHOICES,
 )
+from apps.accounting.models.aging_snapshot import ARAgingSnapshot
 from apps.accounting.models.payment import (
     Payment,
     PAYMENT_STATUS_CHOICES,
@@ -39,8 +45,11 @@ __all__ = [
     'Account',
     'JournalEntry',
     'JournalLine',
+    'AccountPeriodBalance',
+    'LedgerEvent',
     'Invoice',
     'Payment',
+    'ARAgingSnapshot',
     # Account choices
     'ACCOUNT_TYPE_CHOICES',
     'ACCOUNT_SUBTYPE_CHOICES',
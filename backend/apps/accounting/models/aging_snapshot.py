@@ -0,0 +1,83 @@
+"""
+Daily accounts receivable aging snapshots.
+
+Written once a day for every company by the accounting.snapshot_ar_aging
+task so dashboards read precomputed buckets and can chart aging over time.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import models
+
+
+class ARAgingSnapshot(models.Model):
+    """
+    A company's receivables by age bucket on a date.
+    
+    Buckets hold the amount due (total - paid) of sent and overdue
+    invoices, by days past due_date on snapshot_date.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    company = models.ForeignKey(
+        'accounts.Company',
+        on_delete=models.CASCADE,
+        related_name='ar_aging_snapshots',
+    )
+    
+    snapshot_date = models.DateField()
+    
+    current = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Not yet due",
+    )
+    
+    days_1_30 = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    days_31_60 = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    days_61_90 = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    days_90_plus = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    total = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    invoice_count = models.PositiveIntegerField(default=0)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = '"accounting"."ar_aging_snapshots"'
+        ordering = ['company', '-snapshot_date']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company', 'snapshot_date'],
+                name='ar_aging_snapshot_unique_company_date',
+            ),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.company_id} {self.snapshot_date}"
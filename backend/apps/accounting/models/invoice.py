@@ -229,23 +229,31 @@ class Invoice(AuditableModel):
     
     @classmethod
     def generate_invoice_number(cls, company) -> str:
-        """Generate unique invoice number for company."""
+        """
+        Generate the next invoice number for company.
+        
+        Gapless per company and month: must be called in the transaction
+        that creates the invoice (see core.sequences).
+        """
         from django.db.models import Max
+        from core.sequences import next_number
         
-        year = timezone.now().year
-        month = timezone.now().month
-        prefix = f"INV-{year}{month:02d}-"
+        now = timezone.now()
+        period_key = f"{now.year}{now.month:02d}"
+        prefix = f"INV-{period_key}-"
         
-        last_invoice = cls.objects.filter(
-            company=company,
-            invoice_number__startswith=prefix,
-        ).aggregate(max_num=Max('invoice_number'))
+        def highest_existing() -> int:
+            last_invoice = cls.objects.filter(
+                company=company,
+                invoice_number__startswith=prefix,
+            ).aggregate(max_num=Max('invoice_number'))
+            if last_invoice['max_num']:
+                return int(last_invoice['max_num'].split('-')[-1])
+            return 0
         
-        if last_invoice['max_num']:
-            last_num = int(last_invoice['max_num'].split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        new_num = next_number(
+            company.id, 'invoice', period_key=period_key, floor=highest_existing,
+        )
         
         return f"{prefix}{new_num:04d}"
     
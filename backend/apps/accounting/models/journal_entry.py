@@ -8,7 +8,7 @@ import uuid
 from decimal import Decimal
 from typing import List, Tuple
 
-from django.db import models
+from django.db import models, transaction
 from django.db.models import Sum
 from django.utils import timezone
 
@@ -136,6 +136,12 @@ class JournalEntry(AuditableModel):
                 condition=models.Q(total_debit=models.F('total_credit')),
                 name='balanced_entry',
             ),
+            # One live entry per source document for pipeline-generated types
+            models.UniqueConstraint(
+                fields=['company', 'reference_type', 'reference_id'],
+                condition=models.Q(reference_type='order') & ~models.Q(status='voided'),
+                name='journal_entry_unique_live_reference',
+            ),
         ]
         indexes = [
             models.Index(fields=['company'], name='journals_company_idx'),
@@ -196,12 +202,14 @@ class JournalEntry(AuditableModel):
         
         This will:
         1. Validate balance
-        2. Update account balances
+        2. Update account balances and period balance snapshots
         3. Set status to 'posted'
         
         Raises:
             ValueError: If entry is not balanced or already posted
         """
+        from apps.accounting.services.posting_service import PostingService
+        
         if self.status != 'draft':
             raise ValueError(f"Cannot post entry with status '{self.status}'")
         
@@ -211,64 +219,76 @@ class JournalEntry(AuditableModel):
                 f"credit={self.total_credit}"
             )
         
-        # Update account balances
-        for line in self.lines.select_related('account'):
-            if line.debit_amount > 0:
-                line.account.update_balance(line.debit_amount, is_debit=True)
-            else:
-                line.account.update_balance(line.credit_amount, is_debit=False)
-            line.account.save(update_fields=['current_balance', 'updated_at'])
-        
-        self.status = 'posted'
-        self.posted_at = timezone.now()
-        if approved_by:
-            self.approved_by = approved_by
-        self.save()
+        with transaction.atomic():
+            # Update account balances (one statement for all lines)
+            PostingService.apply_entries([self.pk])
+            
+            self.status = 'posted'
+            self.posted_at = timezone.now()
+            if approved_by:
+                self.approved_by = approved_by
+            self.save()
     
     def void(self) -> None:
         """
         Void a posted journal entry.
         
         This will:
-        1. Reverse account balance updates
+        1. Reverse account balance and period balance snapshot updates
         2. Set status to 'voided'
         
         Raises:
             ValueError: If entry is not posted
         """
+        from apps.accounting.services.posting_service import PostingService
+        
         if self.status != 'posted':
             raise ValueError(f"Cannot void entry with status '{self.status}'")
         
-        # Reverse account balances
-        for line in self.lines.select_related('account'):
-            if line.debit_amount > 0:
-                # Reverse debit = credit
-                line.account.update_balance(line.debit_amount, is_debit=False)
-            else:
-                # Reverse credit = debit
-                line.account.update_balance(line.credit_amount, is_debit=True)
-            line.account.save(update_fields=['current_balance', 'updated_at'])
-        
-        self.status = 'voided'
-        self.save()
+        with transaction.atomic():
+            # Reverse account balances
+            PostingService.apply_entries([self.pk], reverse=True)
+            
+            self.status = 'voided'
+            self.save()
     
     @classmethod
     def generate_entry_number(cls, company) -> str:
-        """Generate unique entry number for company."""
+        """
+        Generate the next entry number for company.
+        
+        Gapless per company and year: must be called in the transaction
+        that creates the entry (see core.sequences).
+        """
+        return cls.generate_entry_numbers(company, 1)[0]
+    
+    @classmethod
+    def generate_entry_numbers(cls, company, count: int) -> List[str]:
+        """
+        Generate count consecutive entry numbers for company.
+        
+        Args:
+            company: Company instance (or its UUID)
+            count: Number of entry numbers to allocate
+        """
         from django.db.models import Max
+        from core.sequences import next_range
         
+        company_id = getattr(company, 'pk', company)
         year = timezone.now().year
         prefix = f"JE-{year}-"
         
-        last_entry = cls.objects.filter(
-            company=company,
-            entry_number__startswith=prefix,
-        ).aggregate(max_num=Max('entry_number'))
+        def highest_existing() -> int:
+            last_entry = cls.objects.filter(
+                company_id=company_id,
+                entry_number__startswith=prefix,
+            ).aggregate(max_num=Max('entry_number'))
+            if last_entry['max_num']:
+                return int(last_entry['max_num'].split('-')[-1])
+            return 0
         
-        if last_entry['max_num']:
-            last_num = int(last_entry['max_num'].split('-')[-1])
-            new_num = last_num + 1
-        else:
-            new_num = 1
+        numbers = next_range(
+            company_id, 'journal_entry', count, period_key=str(year), floor=highest_existing,
+        )
         
-        return f"{prefix}{new_num:05d}"
+        return [f"{prefix}{number:05d}" for number in numbers]
@@ -0,0 +1,71 @@
+"""
+Ledger event queue.
+
+A row is written in the same transaction as a source document change
+(e.g. an order being confirmed or cancelled) and drained in batches by
+the accounting.process_ledger_events task, which brings the document's
+journal entry in line with its current state (see LedgerPipelineService).
+"""
+import uuid
+
+from django.db import models
+
+from apps.accounting.models.journal_entry import REFERENCE_TYPE_CHOICES
+
+
+class LedgerEvent(models.Model):
+    """
+    Pending ledger work for a source document.
+    
+    Events carry no amounts: the consumer reads the document when it
+    processes the event, so duplicate and replayed events are harmless.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    company = models.ForeignKey(
+        'accounts.Company',
+        on_delete=models.CASCADE,
+        related_name='ledger_events',
+    )
+    
+    reference_type = models.CharField(
+        max_length=50,
+        choices=REFERENCE_TYPE_CHOICES,
+    )
+    
+    reference_id = models.UUIDField(
+        help_text="UUID of the source document",
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the event was applied to the ledger",
+    )
+    
+    attempts = models.PositiveIntegerField(
+        default=0,
+        help_text="Failed processing attempts",
+    )
+    
+    last_error = models.TextField(
+        blank=True,
+        default='',
+    )
+    
+    class Meta:
+        db_table = '"accounting"."ledger_events"'
+        ordering = ['created_at']
+        indexes = [
+            models.Index(
+                fields=['created_at'],
+                condition=models.Q(processed_at__isnull=True),
+                name='ledger_events_pending_idx',
+            ),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.reference_type}:{self.reference_id}"
@@ -0,0 +1,168 @@
+"""
+Account period balance snapshots.
+
+One row per account per calendar month holding the month's posted
+debit/credit activity and the cumulative (closing) totals through the
+month end. Rows are maintained when journal entries are posted or
+voided (see PostingService), so an as-of balance is the nearest closing snapshot plus the
+lines of at most one month.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import connection, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+
+class AccountPeriodBalance(models.Model):
+    """
+    Monthly posted totals for an account.
+    
+    closing_debit/closing_credit include every posted line dated on or
+    before the end of the period, so they are what an as-of query for
+    the last day of the month would aggregate.
+    """
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    
+    company = models.ForeignKey(
+        'accounts.Company',
+        on_delete=models.CASCADE,
+        related_name='account_period_balances',
+    )
+    
+    account = models.ForeignKey(
+        'accounting.Account',
+        on_delete=models.CASCADE,
+        related_name='period_balances',
+    )
+    
+    period_start = models.DateField(
+        help_text="First day of the month",
+    )
+    
+    # Activity within the month
+    period_debit = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    period_credit = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    # Cumulative totals through the month end
+    closing_debit = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    closing_credit = models.DecimalField(
+        max_digits=15,
+        decimal_places=2,
+        default=Decimal('0.00'),
+    )
+    
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = '"accounting"."account_period_balances"'
+        ordering = ['account', 'period_start']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['account', 'period_start'],
+                name='period_balance_unique_account_period',
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['company', 'period_start'],
+                name='period_balances_company_idx'
+            ),
+        ]
+    
+    def __str__(self) -> str:
+        return f"{self.account_id} {self.period_start:%Y-%m}"
+    
+    @classmethod
+    def apply_deltas(cls, deltas, company_ids) -> None:
+        """
+        Add posted (or voided, as negatives) amounts to the snapshots.
+        
+        Missing period rows are created carrying forward the prior
+        closing totals; then one UPDATE adds every delta to its own
+        period and to the closing totals of all later periods.
+        
+        Must run inside the transaction that holds the accounts' row
+        locks, which serialize snapshot maintenance per account.
+        
+        Args:
+            deltas: Dict of (account_id, period_start) to (debit, credit)
+            company_ids: Dict of account_id to company_id
+        """
+        if not deltas:
+            return
+        
+        account_ids = {account_id for account_id, _ in deltas}
+        existing = set(cls.objects.filter(
+            account_id__in=account_ids,
+            period_start__in={period_start for _, period_start in deltas},
+        ).values_list('account_id', 'period_start'))
+        
+        missing = [key for key in deltas if key not in existing]
+        if missing:
+            created = cls.objects.bulk_create([
+                cls(
+                    company_id=company_ids[account_id],
+                    account_id=account_id,
+                    period_start=period_start,
+                )
+                for account_id, period_start in missing
+            ])
+            new_ids = [row.id for row in created]
+            
+            # Carry forward the closing totals of the nearest existing period
+            previous = cls.objects.filter(
+                account_id=OuterRef('account_id'),
+                period_start__lt=OuterRef('period_start'),
+            ).exclude(pk__in=new_ids).order_by('-period_start')
+            cls.objects.filter(pk__in=new_ids).update(
+                closing_debit=Coalesce(
+                    Subquery(previous.values('closing_debit')[:1]), Value(Decimal('0.00')),
+                ),
+                closing_credit=Coalesce(
+                    Subquery(previous.values('closing_credit')[:1]), Value(Decimal('0.00')),
+                ),
+            )
+        
+        values_sql = ', '.join(['(%s::uuid, %s::date, %s::numeric, %s::numeric)'] * len(deltas))
+        params = [timezone.now()]
+        for (account_id, period_start), (debit, credit) in deltas.items():
+            params.extend([account_id, period_start, debit, credit])
+        
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {table} AS b SET "
+                f"closing_debit = b.closing_debit + s.closing_debit, "
+                f"closing_credit = b.closing_credit + s.closing_credit, "
+                f"period_debit = b.period_debit + s.period_debit, "
+                f"period_credit = b.period_credit + s.period_credit, "
+                f"updated_at = %s "
+                f"FROM ("
+                f"SELECT p.id, SUM(v.debit) AS closing_debit, SUM(v.credit) AS closing_credit, "
+                f"SUM(CASE WHEN v.period_start = p.period_start THEN v.debit ELSE 0 END) AS period_debit, "
+                f"SUM(CASE WHEN v.period_start = p.period_start THEN v.credit ELSE 0 END) AS period_credit "
+                f"FROM {table} AS p "
+                f"JOIN (VALUES {values_sql}) AS v(account_id, period_start, debit, credit) "
+                f"ON p.account_id = v.account_id AND p.period_start >= v.period_start "
+                f"GROUP BY p.id"
+                f") AS s WHERE b.id = s.id",
+                params,
+            )
@@ -5,10 +5,11 @@ from decimal import Decimal
 from rest_framework import serializers
 
 from apps.accounting.models import (
-    Account, JournalEntry, JournalLine, Invoice, Payment,
-    ACCOUNT_TYPE_CHOICES, ENTRY_STATUS_CHOICES,
+    Account, ARAgingSnapshot, JournalEntry, JournalLine, Invoice, Payment,
+    ACCOUNT_TYPE_CHOICES, ENTRY_STATUS_CHOICES, REFERENCE_TYPE_CHOICES,
     INVOICE_STATUS_CHOICES, PAYMENT_STATUS_CHOICES,
 )
+from apps.accounting.services.ledger_export_service import EXPORT_FORMATS
 
 
 # =============================================================================
@@ -42,21 +43,28 @@ class AccountListSerializer(serializers.ModelSerializer):
 
 
 class AccountTreeSerializer(serializers.ModelSerializer):
-    """Serializer for hierarchical account tree."""
+    """
+    Serializer for hierarchical account tree.
     
+    Serializes the node dicts of ChartOfAccounts.tree_with_balances;
+    total_balance is only present when balances were rolled up.
+    """
+    
+    total_balance = serializers.DecimalField(
+        max_digits=15, decimal_places=2, required=False, read_only=True
+    )
     children = serializers.SerializerMethodField()
     
     class Meta:
         model = Account
         fields = [
             'id', 'code', 'name', 'account_type',
-            'current_balance', 'is_active', 'children',
+            'current_balance', 'total_balance', 'is_active', 'children',
         ]
     
     def get_children(self, obj):
         """Get nested children."""
-        children = obj.children.filter(is_active=True)
-        return AccountTreeSerializer(children, many=True).data
+        return AccountTreeSerializer(obj['children'], many=True).data
 
 
 # =============================================================================
@@ -288,15 +296,62 @@ class GSTF5PrepareRequestSerializer(serializers.Serializer):
 # REPORT SERIALIZERS
 # =============================================================================
 
-class TrialBalanceLineSerializer(serializers.Serializer):
-    """Serializer for trial balance line item."""
+class TrialBalanceRequestSerializer(serializers.Serializer):
+    """Serializer for trial balance query parameters."""
+    
+    as_of_date = serializers.DateField(required=False)
+    compare_years = serializers.IntegerField(min_value=0, max_value=10, default=0)
+    
+    def validate(self, data):
+        """Ensure comparatives have an as-of date."""
+        if data['compare_years'] and not data.get('as_of_date'):
+            raise serializers.ValidationError("compare_years requires as_of_date")
+        return data
+
+
+class FinancialReportRequestSerializer(serializers.Serializer):
+    """Serializer for balance sheet / P&L query parameters."""
+    
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    compare_years = serializers.IntegerField(min_value=0, max_value=10, default=0)
+    
+    def validate(self, data):
+        """Ensure the period is ordered and comparatives have an end date."""
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError("start_date must be on or before end_date")
+        if data['compare_years'] and not end_date:
+            raise serializers.ValidationError("compare_years requires end_date")
+        return data
+
+
+class LedgerExportRequestSerializer(serializers.Serializer):
+    """Serializer for general ledger export query parameters."""
+    
+    start_date = serializers.DateField(required=False)
+    end_date = serializers.DateField(required=False)
+    account = serializers.ListField(
+        child=serializers.CharField(max_length=20),
+        required=False,
+        help_text="Account codes (repeat the parameter for several)",
+    )
+    reference_type = serializers.ChoiceField(
+        choices=REFERENCE_TYPE_CHOICES, required=False
+    )
+    status = serializers.ChoiceField(
+        choices=ENTRY_STATUS_CHOICES + [('all', 'All')], default='posted'
+    )
+    file_format = serializers.ChoiceField(choices=EXPORT_FORMATS, default='csv')
     
-    account_id = serializers.UUIDField(allow_null=True)
-    account_code = serializers.CharField()
-    account_name = serializers.CharField()
-    account_type = serializers.CharField()
-    debit = serializers.DecimalField(max_digits=15, decimal_places=2)
-    credit = serializers.DecimalField(max_digits=15, decimal_places=2)
+    def validate(self, data):
+        """Ensure the period is ordered."""
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        if start_date and end_date and start_date > end_date:
+            raise serializers.ValidationError("start_date must be on or before end_date")
+        return data
 
 
 class AgingSummarySerializer(serializers.Serializer):
@@ -316,3 +371,28 @@ class AgingSummarySerializer(serializers.Serializer):
         max_digits=15, decimal_places=2, source='90_plus'
     )
     total = serializers.DecimalField(max_digits=15, decimal_places=2)
+
+
+class CustomerAgingSerializer(serializers.Serializer):
+    """Serializer for one customer's receivables aging."""
+    
+    customer_id = serializers.UUIDField(allow_null=True)
+    customer_name = serializers.CharField()
+    current = serializers.DecimalField(max_digits=15, decimal_places=2)
+    days_1_30 = serializers.DecimalField(max_digits=15, decimal_places=2)
+    days_31_60 = serializers.DecimalField(max_digits=15, decimal_places=2)
+    days_61_90 = serializers.DecimalField(max_digits=15, decimal_places=2)
+    days_90_plus = serializers.DecimalField(max_digits=15, decimal_places=2)
+    total = serializers.DecimalField(max_digits=15, decimal_places=2)
+    invoice_count = serializers.IntegerField()
+
+
+class ARAgingSnapshotSerializer(serializers.ModelSerializer):
+    """Serializer for daily aging snapshots."""
+    
+    class Meta:
+        model = ARAgingSnapshot
+        fields = [
+            'snapshot_date', 'current', 'days_1_30', 'days_31_60',
+            'days_61_90', 'days_90_plus', 'total', 'invoice_count',
+        ]
@@ -4,6 +4,14 @@ Accounting services package.
 from apps.accounting.services.ledger_service import LedgerService
 from apps.accounting.services.invoice_service import InvoiceService
 from apps.accounting.services.payment_service import PaymentService
+from apps.accounting.services.report_service import FinancialReportService, ReportPeriod
+from apps.accounting.services.posting_service import PostingService
+from apps.accounting.services.ledger_pipeline_service import LedgerPipelineService
+from apps.accounting.services.ledger_export_service import LedgerExportService
 
 
-__all__ = ['LedgerService', 'InvoiceService', 'PaymentService']
+__all__ = [
+    'LedgerService', 'InvoiceService', 'PaymentService',
+    'FinancialReportService', 'ReportPeriod', 'PostingService',
+    'LedgerPipelineService', 'LedgerExportService',
+]
@@ -6,21 +6,33 @@ Provides:
 - Payment application
 - Status management
 - Invoice number generation
+- Receivables aging (live, per customer and daily snapshots)
 """
 from decimal import Decimal
 from datetime import date, timedelta
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import logging
 
-from django.db import transaction
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, F, Q, Sum
 from django.utils import timezone
 
-from apps.accounting.models import Invoice
+from apps.accounting.models import ARAgingSnapshot, Invoice
+from apps.accounts.models import Company
 from apps.accounting.gst import GSTEngine
 
 
 logger = logging.getLogger(__name__)
 
+# Invoice statuses with receivables outstanding
+AGING_STATUSES = ('sent', 'overdue')
+
+# Aggregated columns of an ARAgingSnapshot
+AGING_SNAPSHOT_FIELDS = (
+    'current', 'days_1_30', 'days_31_60', 'days_61_90', 'days_90_plus',
+    'total', 'invoice_count',
+)
+
 
 class InvoiceService:
     """
@@ -41,15 +53,12 @@ class InvoiceService:
         Args:
             order: Order instance
             payment_terms_days: Days until due (default 30)
-            
+        
         Returns:
             Created Invoice
         """
         payment_terms = payment_terms_days or InvoiceService.DEFAULT_PAYMENT_TERMS_DAYS
         
-        # Generate invoice number
-        invoice_number = Invoice.generate_invoice_number(order.company)
-        
         # Calculate dates
         invoice_date = date.today()
         due_date = invoice_date + timedelta(days=payment_terms)
@@ -60,6 +69,10 @@ class InvoiceService:
         total_amount = order.total_amount
         
         with transaction.atomic():
+            # Allocated with the insert so a failed insert rolls the
+            # gapless counter back
+            invoice_number = Invoice.generate_invoice_number(order.company)
+            
             invoice = Invoice.objects.create(
                 company=order.company,
                 customer=order.customer,
@@ -98,33 +111,35 @@ class InvoiceService:
             payment_terms_days: Days until due
             notes: Internal notes
             terms: Payment terms text
-            
+        
         Returns:
             Created Invoice
         """
         # Calculate GST
         gst_result = GSTEngine.calculate(subtotal, gst_code)
         
-        # Generate invoice number
-        invoice_number = Invoice.generate_invoice_number(company)
-        
         # Calculate dates
         invoice_date = date.today()
         due_date = invoice_date + timedelta(days=payment_terms_days)
         
-        invoice = Invoice.objects.create(
-            company=company,
-            customer=customer,
-            invoice_number=invoice_number,
-            invoice_date=invoice_date,
-            due_date=due_date,
-            subtotal=subtotal,
-            gst_amount=gst_result.gst_amount,
-            total_amount=gst_result.gross_amount,
-            status='draft',
-            notes=notes,
-            terms=terms,
-        )
+        with transaction.atomic():
+            # Allocated with the insert so a failed insert rolls the
+            # gapless counter back
+            invoice_number = Invoice.generate_invoice_number(company)
+            
+            invoice = Invoice.objects.create(
+                company=company,
+                customer=customer,
+                invoice_number=invoice_number,
+                invoice_date=invoice_date,
+                due_date=due_date,
+                subtotal=subtotal,
+                gst_amount=gst_result.gst_amount,
+                total_amount=gst_result.gross_amount,
+                status='draft',
+                notes=notes,
+                terms=terms,
+            )
         
         logger.info(f"Created manual invoice {invoice.invoice_number}")
         
@@ -185,31 +200,97 @@ class InvoiceService:
         
         Args:
             company: Company to check
-            
+        
         Returns:
             Count of invoices marked overdue
         """
-        today = date.today()
+        marked = InvoiceService.mark_overdue_invoices(company_id=company.id)
+        return sum(len(invoice_ids) for invoice_ids in marked.values())
+    
+    @staticmethod
+    def mark_overdue_invoices(
+        company_id=None,
+        as_of: Optional[date] = None,
+    ) -> Dict[Any, List[Any]]:
+        """
+        Mark sent invoices past their due date as overdue.
         
-        overdue_invoices = Invoice.objects.filter(
-            company=company,
-            status='sent',
-            due_date__lt=today,
+        One UPDATE ... RETURNING for one company or all companies; the
+        returned IDs are written to the audit log in one bulk insert
+        (the UPDATE bypasses the per-save audit signals).
+        
+        Args:
+            company_id: Restrict to a company (default: all companies)
+            as_of: Date invoices are due before (default: today)
+        
+        Returns:
+            Dict of company ID to the invoice IDs marked overdue
+        """
+        from apps.compliance.services import AuditService
+        
+        sql = (
+            f"UPDATE {Invoice._meta.db_table} SET status = 'overdue', updated_at = %s "
+            f"WHERE status = 'sent' AND due_date < %s"
         )
+        params: List[Any] = [timezone.now(), as_of or date.today()]
+        if company_id is not None:
+            sql += " AND company_id = %s"
+            params.append(company_id)
+        sql += " RETURNING company_id, id"
+        
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            
+            if rows:
+                AuditService.log_bulk_update(
+                    'accounting.invoice',
+                    rows,
+                    old_values={'status': 'sent'},
+                    new_values={'status': 'overdue'},
+                )
+        
+        marked: Dict[Any, List[Any]] = {}
+        for row_company_id, invoice_id in rows:
+            marked.setdefault(row_company_id, []).append(invoice_id)
+        
+        for row_company_id, invoice_ids in marked.items():
+            logger.info(
+                f"Marked {len(invoice_ids)} invoices as overdue for company {row_company_id}"
+            )
+        
+        return marked
+    
+    @staticmethod
+    def _aging_aggregates(as_of: date) -> Dict[str, Any]:
+        """
+        Aggregates bucketing amount due by days past due_date on as_of.
         
-        count = 0
-        for invoice in overdue_invoices:
-            invoice.status = 'overdue'
-            invoice.save(update_fields=['status', 'updated_at'])
-            count += 1
+        Keys match ARAgingSnapshot fields.
+        """
+        amount_due = F('total_amount') - F('amount_paid')
+        output_field = DecimalField(max_digits=15, decimal_places=2)
+        
+        def bucket(condition=None):
+            return Sum(amount_due, filter=condition, default=Decimal('0.00'), output_field=output_field)
         
-        if count > 0:
-            logger.info(f"Marked {count} invoices as overdue for company {company.id}")
+        day_30 = as_of - timedelta(days=30)
+        day_60 = as_of - timedelta(days=60)
+        day_90 = as_of - timedelta(days=90)
         
-        return count
+        return {
+            'current': bucket(Q(due_date__gte=as_of)),
+            'days_1_30': bucket(Q(due_date__lt=as_of, due_date__gte=day_30)),
+            'days_31_60': bucket(Q(due_date__lt=day_30, due_date__gte=day_60)),
+            'days_61_90': bucket(Q(due_date__lt=day_60, due_date__gte=day_90)),
+            'days_90_plus': bucket(Q(due_date__lt=day_90)),
+            'total': bucket(),
+            'invoice_count': Count('id'),
+        }
     
     @staticmethod
-    def get_aging_summary(company) -> dict:
+    def get_aging_summary(company, as_of: Optional[date] = None) -> dict:
         """
         Get accounts receivable aging summary.
         
@@ -220,43 +301,119 @@ class InvoiceService:
         - 61-90 days overdue
         - 90+ days overdue
         
+        Computed in one aggregate query.
+        
         Args:
             company: Company to analyze
-            
+            as_of: Date to age invoices on (default: today)
+        
         Returns:
             Dict with aging buckets and totals
         """
-        today = date.today()
-        
-        # Get unpaid invoices
-        invoices = Invoice.objects.filter(
+        totals = Invoice.objects.filter(
             company=company,
-            status__in=['sent', 'overdue'],
-        )
+            status__in=AGING_STATUSES,
+        ).aggregate(**InvoiceService._aging_aggregates(as_of or date.today()))
         
-        buckets = {
-            'current': Decimal('0.00'),
-            '1_30': Decimal('0.00'),
-            '31_60': Decimal('0.00'),
-            '61_90': Decimal('0.00'),
-            '90_plus': Decimal('0.00'),
+        return {
+            'current': totals['current'],
+            '1_30': totals['days_1_30'],
+            '31_60': totals['days_31_60'],
+            '61_90': totals['days_61_90'],
+            '90_plus': totals['days_90_plus'],
+            'total': totals['total'],
         }
+    
+    @staticmethod
+    def get_aging_by_customer(company, as_of: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Get aging buckets per customer in one grouped query.
         
-        for invoice in invoices:
-            amount_due = invoice.amount_due
-            days_overdue = (today - invoice.due_date).days
-            
-            if days_overdue <= 0:
-                buckets['current'] += amount_due
-            elif days_overdue <= 30:
-                buckets['1_30'] += amount_due
-            elif days_overdue <= 60:
-                buckets['31_60'] += amount_due
-            elif days_overdue <= 90:
-                buckets['61_90'] += amount_due
-            else:
-                buckets['90_plus'] += amount_due
-        
-        buckets['total'] = sum(buckets.values())
-        
-        return buckets
+        Args:
+            company: Company to analyze
+            as_of: Date to age invoices on (default: today)
+        
+        Returns:
+            One dict per customer (customer_id None for cash sales),
+            largest total first
+        """
+        rows = Invoice.objects.filter(
+            company=company,
+            status__in=AGING_STATUSES,
+        ).values(
+            'customer_id',
+            'customer__first_name', 'customer__last_name', 'customer__company_name',
+        ).annotate(
+            **InvoiceService._aging_aggregates(as_of or date.today()),
+        ).order_by('-total')
+        
+        customers = []
+        for row in rows:
+            name = row.pop('customer__company_name') or ''
+            first_name = row.pop('customer__first_name') or ''
+            last_name = row.pop('customer__last_name') or ''
+            row['customer_name'] = name or f"{first_name} {last_name}".strip()
+            customers.append(row)
+        
+        return customers
+    
+    @staticmethod
+    def snapshot_aging(snapshot_date: Optional[date] = None) -> int:
+        """
+        Write every company's aging buckets for a date.
+        
+        One grouped query across companies and one upsert, so re-running
+        for the same date replaces that day's rows. Every company gets a
+        row, zero when it has nothing outstanding, and rows left for the
+        date by an earlier run that this run did not write are removed.
+        
+        Args:
+            snapshot_date: Date to age invoices on (default: today)
+        
+        Returns:
+            Number of snapshot rows written
+        """
+        snapshot_date = snapshot_date or date.today()
+        
+        rows = Invoice.objects.filter(
+            status__in=AGING_STATUSES,
+        ).values('company_id').annotate(
+            **InvoiceService._aging_aggregates(snapshot_date),
+        ).order_by()
+        
+        by_company = {row['company_id']: row for row in rows}
+        for company_id in Company.objects.values_list('id', flat=True):
+            by_company.setdefault(company_id, {'company_id': company_id})
+        
+        snapshots = [
+            ARAgingSnapshot(snapshot_date=snapshot_date, **row)
+            for row in by_company.values()
+        ]
+        with transaction.atomic():
+            ARAgingSnapshot.objects.bulk_create(
+                snapshots,
+                update_conflicts=True,
+                unique_fields=['company', 'snapshot_date'],
+                update_fields=list(AGING_SNAPSHOT_FIELDS),
+            )
+            ARAgingSnapshot.objects.filter(
+                snapshot_date=snapshot_date,
+            ).exclude(company_id__in=list(by_company)).delete()
+        
+        logger.info(f"Wrote {len(snapshots)} AR aging snapshots for {snapshot_date}")
+        
+        return len(snapshots)
+    
+    @staticmethod
+    def get_aging_history(company, days: int = 90) -> List[ARAgingSnapshot]:
+        """
+        Get a company's daily aging snapshots, oldest first.
+        
+        Args:
+            company: Company to read
+            days: Number of days back from today
+        """
+        return list(ARAgingSnapshot.objects.filter(
+            company=company,
+            snapshot_date__gt=date.today() - timedelta(days=days),
+        ).order_by('snapshot_date'))
@@ -0,0 +1,165 @@
+"""
+General ledger export.
+
+Streams journal lines (one row per line, with entry and account
+columns) as CSV or JSON Lines. Rows are read with a server-side cursor
+in chunks and encoded one at a time, so memory use does not grow with
+the size of the ledger. Used by the reports/general-ledger endpoint and
+the export_ledger management command.
+"""
+from datetime import date
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence
+import csv
+import json
+import logging
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.accounting.models import JournalLine
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+EXPORT_CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+# Rows fetched per server-side cursor round trip
+EXPORT_CHUNK_SIZE = 2000
+
+# (column name, JournalLine lookup), in output order
+EXPORT_COLUMNS = (
+    ('entry_date', 'journal_entry__entry_date'),
+    ('entry_number', 'journal_entry__entry_number'),
+    ('status', 'journal_entry__status'),
+    ('reference_type', 'journal_entry__reference_type'),
+    ('reference_id', 'journal_entry__reference_id'),
+    ('entry_description', 'journal_entry__description'),
+    ('account_code', 'account__code'),
+    ('account_name', 'account__name'),
+    ('account_type', 'account__account_type'),
+    ('debit', 'debit_amount'),
+    ('credit', 'credit_amount'),
+    ('gst_amount', 'gst_amount'),
+    ('gst_code', 'gst_code'),
+    ('line_description', 'description'),
+)
+
+
+class _Echo:
+    """File-like object whose write() returns the value (for csv.writer)."""
+    
+    def write(self, value: str) -> str:
+        return value
+
+
+class LedgerExportService:
+    """
+    Service for streaming the general ledger.
+    """
+    
+    @staticmethod
+    def get_lines(
+        company,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        account_codes: Optional[Sequence[str]] = None,
+        reference_type: Optional[str] = None,
+        status: Optional[str] = 'posted',
+    ):
+        """
+        Build the export query.
+        
+        Args:
+            company: Company to export
+            start_date: First entry date included
+            end_date: Last entry date included
+            account_codes: Restrict to these account codes
+            reference_type: Restrict to entries of this reference type
+            status: Entry status (None: all statuses)
+        
+        Returns:
+            values_list QuerySet of rows in EXPORT_COLUMNS order, sorted by
+            entry date and number
+        """
+        lines = JournalLine.objects.filter(journal_entry__company=company)
+        
+        if start_date:
+            lines = lines.filter(journal_entry__entry_date__gte=start_date)
+        if end_date:
+            lines = lines.filter(journal_entry__entry_date__lte=end_date)
+        if account_codes:
+            lines = lines.filter(account__code__in=list(account_codes))
+        if reference_type:
+            lines = lines.filter(journal_entry__reference_type=reference_type)
+        if status:
+            lines = lines.filter(journal_entry__status=status)
+        
+        return lines.order_by(
+            'journal_entry__entry_date', 'journal_entry__entry_number', 'created_at', 'id',
+        ).values_list(*(lookup for _, lookup in EXPORT_COLUMNS))
+    
+    @staticmethod
+    def iter_rows(lines, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[tuple]:
+        """Iterate export rows through a server-side cursor."""
+        return lines.iterator(chunk_size=chunk_size)
+    
+    @staticmethod
+    def encode_csv(rows: Iterable[tuple]) -> Iterator[str]:
+        """Encode rows as CSV lines, header first."""
+        writer = csv.writer(_Echo())
+        yield writer.writerow([name for name, _ in EXPORT_COLUMNS])
+        for row in rows:
+            yield writer.writerow(row)
+    
+    @staticmethod
+    def encode_jsonl(rows: Iterable[tuple]) -> Iterator[str]:
+        """Encode rows as one JSON object per line."""
+        names = [name for name, _ in EXPORT_COLUMNS]
+        for row in rows:
+            yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+    
+    @staticmethod
+    def stream(
+        company,
+        file_format: str = 'csv',
+        chunk_size: int = EXPORT_CHUNK_SIZE,
+        **filters: Any,
+    ) -> Iterator[str]:
+        """
+        Stream a company's general ledger.
+        
+        Args:
+            company: Company to export
+            file_format: 'csv' or 'jsonl'
+            chunk_size: Rows fetched per cursor round trip
+            **filters: Passed to get_lines
+        
+        Returns:
+            Iterator of encoded text chunks
+        
+        Raises:
+            ValueError: If file_format is not supported
+        """
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format '{file_format}'")
+        
+        rows = LedgerExportService.iter_rows(
+            LedgerExportService.get_lines(company, **filters), chunk_size
+        )
+        if file_format == 'csv':
+            return LedgerExportService.encode_csv(rows)
+        return LedgerExportService.encode_jsonl(rows)
+    
+    @staticmethod
+    def filename(company, file_format: str, filters: Dict[str, Any]) -> str:
+        """Download filename for an export (e.g. general-ledger-<uen>-2024-01-01-2024-12-31.csv)."""
+        parts = ['general-ledger', company.uen or str(company.id)]
+        if filters.get('start_date'):
+            parts.append(filters['start_date'].isoformat())
+        if filters.get('end_date'):
+            parts.append(filters['end_date'].isoformat())
+        return f"{'-'.join(parts)}.{file_format}"
@@ -0,0 +1,368 @@
+"""
+Asynchronous order-to-ledger pipeline.
+
+Order status changes write a LedgerEvent in their own transaction
+(enqueue) and schedule the accounting.process_ledger_events task after
+commit, so checkout and status transitions do no accounting work.
+
+The consumer drains events in batches. For each batch it locks the
+referenced orders, resolves the chart of accounts for every company in
+one query, then bulk-creates the missing entries and lines (and voids
+entries of orders that no longer count as revenue). Work is decided
+from the order's current state and the live entry for
+(reference_type, reference_id), so replayed or duplicate events are
+no-ops.
+"""
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import logging
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.accounting.models import JournalEntry, JournalLine, LedgerEvent
+from apps.accounting.services.ledger_service import LedgerService, ORDER_ACCOUNT_CODES
+from apps.accounting.services.posting_service import PostingService
+
+
+logger = logging.getLogger(__name__)
+
+# Order statuses recognised as revenue
+ORDER_REVENUE_STATUSES = ('confirmed', 'processing', 'shipped', 'delivered')
+
+# Events per consumer transaction
+LEDGER_EVENT_BATCH_SIZE = getattr(settings, 'LEDGER_EVENT_BATCH_SIZE', 200)
+
+# Failed events are retried until they reach this many attempts
+LEDGER_EVENT_MAX_ATTEMPTS = getattr(settings, 'LEDGER_EVENT_MAX_ATTEMPTS', 5)
+
+# Delay before a scheduled drain runs, so bursts share one batch
+LEDGER_DRAIN_DELAY_SECONDS = getattr(settings, 'LEDGER_DRAIN_DELAY_SECONDS', 5)
+
+DRAIN_SCHEDULED_KEY = 'accounting:ledger_drain_scheduled'
+
+
+class LedgerPipelineService:
+    """
+    Service for queueing and applying ledger work for source documents.
+    """
+    
+    @staticmethod
+    def enqueue(company_id, reference_type: str, reference_id) -> LedgerEvent:
+        """
+        Queue ledger work for a document.
+        
+        Call inside the transaction that changes the document, so the
+        event commits (or rolls back) with the change.
+        
+        Args:
+            company_id: Company UUID
+            reference_type: Document type (e.g. 'order')
+            reference_id: Document UUID
+        
+        Returns:
+            Created LedgerEvent
+        """
+        event = LedgerEvent.objects.create(
+            company_id=company_id,
+            reference_type=reference_type,
+            reference_id=reference_id,
+        )
+        transaction.on_commit(LedgerPipelineService.schedule_drain)
+        return event
+    
+    @staticmethod
+    def schedule_drain() -> None:
+        """
+        Schedule one drain task for all events queued in the next few seconds.
+        
+        Runs after the document change has committed, so a cache or broker
+        outage is logged rather than raised; the periodic
+        accounting.process_ledger_events drain picks the events up.
+        """
+        from apps.accounting.tasks import process_ledger_events
+        
+        try:
+            if cache.add(DRAIN_SCHEDULED_KEY, 1, LEDGER_DRAIN_DELAY_SECONDS * 2):
+                process_ledger_events.apply_async(countdown=LEDGER_DRAIN_DELAY_SECONDS)
+        except Exception as e:
+            logger.warning(f"Could not schedule ledger drain, leaving events to the periodic drain: {e}")
+    
+    @staticmethod
+    def drain_events(
+        batch_size: int = LEDGER_EVENT_BATCH_SIZE,
+        max_batches: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Process pending ledger events in batches.
+        
+        Each batch is one transaction. Events locked by another consumer
+        are skipped. If a batch raises, its events are retried one at a
+        time so only the failing ones are charged an attempt.
+        
+        Args:
+            batch_size: Events per batch
+            max_batches: Stop after this many batches (default: until empty)
+        
+        Returns:
+            Dict with 'processed' and 'failed' event counts
+        """
+        # Events queued from here on schedule a new drain
+        cache.delete(DRAIN_SCHEDULED_KEY)
+        
+        totals = {'processed': 0, 'failed': 0}
+        batches = 0
+        # Failed events wait for the next drain rather than spinning here
+        failed_ids: List[Any] = []
+        while max_batches is None or batches < max_batches:
+            event_ids: List[Any] = []
+            try:
+                with transaction.atomic():
+                    events = list(
+                        LedgerEvent.objects.select_for_update(skip_locked=True)
+                        .filter(
+                            processed_at__isnull=True,
+                            attempts__lt=LEDGER_EVENT_MAX_ATTEMPTS,
+                        )
+                        .exclude(pk__in=failed_ids)
+                        .order_by('created_at')
+                        .values('id', 'reference_type', 'reference_id')[:batch_size]
+                    )
+                    if not events:
+                        break
+                    event_ids = [event['id'] for event in events]
+                    
+                    processed, failed = LedgerPipelineService._process_batch(events)
+                    failed_ids.extend(failed)
+            except Exception as e:
+                if not event_ids:
+                    logger.exception(f"Ledger event batch failed: {e}")
+                    break
+                # Find the failing events without charging the healthy ones
+                logger.warning(f"Ledger event batch failed, retrying events one at a time: {e}")
+                processed, failed = LedgerPipelineService._process_one_by_one(event_ids)
+                failed_ids.extend(failed)
+            
+            totals['processed'] += processed
+            totals['failed'] += len(failed)
+            batches += 1
+            
+            if len(events) < batch_size:
+                break
+        
+        if totals['processed'] or totals['failed']:
+            logger.info(
+                f"Drained ledger events: {totals['processed']} processed, "
+                f"{totals['failed']} failed"
+            )
+        
+        return totals
+    
+    @staticmethod
+    def _process_one_by_one(event_ids: List[Any]) -> Tuple[int, List[Any]]:
+        """
+        Apply events in their own transactions after their batch failed.
+        
+        Only an event whose own transaction raises is charged an attempt.
+        
+        Returns:
+            Tuple of (processed count, failed event IDs)
+        """
+        processed = 0
+        failed: List[Any] = []
+        for event_id in event_ids:
+            try:
+                with transaction.atomic():
+                    events = list(
+                        LedgerEvent.objects.select_for_update(skip_locked=True)
+                        .filter(pk=event_id, processed_at__isnull=True)
+                        .values('id', 'reference_type', 'reference_id')
+                    )
+                    if not events:
+                        continue
+                    event_processed, event_failed = LedgerPipelineService._process_batch(events)
+            except Exception as e:
+                logger.exception(f"Ledger event {event_id} failed: {e}")
+                LedgerEvent.objects.filter(pk=event_id).update(
+                    attempts=F('attempts') + 1,
+                    last_error=str(e),
+                )
+                failed.append(event_id)
+                continue
+            
+            processed += event_processed
+            failed.extend(event_failed)
+        
+        return processed, failed
+    
+    @staticmethod
+    def _process_batch(events: List[Dict[str, Any]]) -> Tuple[int, List[Any]]:
+        """
+        Apply a locked batch of events and record the outcome on each.
+        
+        Returns:
+            Tuple of (processed count, failed event IDs)
+        """
+        by_type: Dict[str, List[Any]] = defaultdict(list)
+        for event in events:
+            by_type[event['reference_type']].append(event['reference_id'])
+        
+        errors: Dict[Any, str] = {}
+        for reference_type, reference_ids in by_type.items():
+            if reference_type == 'order':
+                errors.update(LedgerPipelineService.sync_orders(reference_ids))
+            else:
+                for reference_id in reference_ids:
+                    errors[reference_id] = f"Unsupported reference type '{reference_type}'"
+        
+        failed_events = [event for event in events if event['reference_id'] in errors]
+        processed_ids = [event['id'] for event in events if event['reference_id'] not in errors]
+        
+        LedgerEvent.objects.filter(pk__in=processed_ids).update(processed_at=timezone.now())
+        for event in failed_events:
+            LedgerEvent.objects.filter(pk=event['id']).update(
+                attempts=F('attempts') + 1,
+                last_error=errors[event['reference_id']],
+            )
+            logger.warning(
+                f"Ledger event for {event['reference_type']} {event['reference_id']} "
+                f"failed: {errors[event['reference_id']]}"
+            )
+        
+        return len(processed_ids), [event['id'] for event in failed_events]
+    
+    @staticmethod
+    def sync_orders(order_ids: Iterable) -> Dict[Any, str]:
+        """
+        Bring the ledger in line with the current state of orders.
+        
+        Orders in a revenue status without a live entry get a draft
+        revenue entry; live entries of orders that left those statuses
+        are voided (reversing balances if they were posted). Must be
+        called inside a transaction.
+        
+        Args:
+            order_ids: Order UUIDs
+        
+        Returns:
+            Dict of order ID to error message for orders that could not
+            be applied
+        """
+        from apps.commerce.models import Order
+        
+        order_ids = sorted(set(order_ids))
+        
+        # Lock the orders so concurrent consumers (and status changes)
+        # serialize with this batch
+        orders = {
+            order.pk: order
+            for order in Order.all_objects.select_for_update(of=('self',))
+            .filter(pk__in=order_ids)
+            .order_by('pk')
+            .only(
+                'id', 'company_id', 'order_number', 'status',
+                'gst_amount', 'total_amount', 'created_at',
+            )
+        }
+        
+        live_entries = {
+            row['reference_id']: row
+            for row in JournalEntry.objects.filter(
+                reference_type='order',
+                reference_id__in=order_ids,
+            ).exclude(status='voided').values('id', 'reference_id', 'status')
+        }
+        
+        to_create = [
+            order for order in orders.values()
+            if order.status in ORDER_REVENUE_STATUSES and order.pk not in live_entries
+        ]
+        to_void = [
+            entry for order_id, entry in live_entries.items()
+            if order_id not in orders or orders[order_id].status not in ORDER_REVENUE_STATUSES
+        ]
+        
+        errors: Dict[Any, str] = {}
+        if to_create:
+            errors.update(LedgerPipelineService._create_order_entries(to_create))
+        if to_void:
+            LedgerPipelineService._void_entries(to_void)
+        
+        return errors
+    
+    @staticmethod
+    def _create_order_entries(orders: List[Any]) -> Dict[Any, str]:
+        """Bulk-create draft revenue entries for orders."""
+        by_company: Dict[Any, List[Any]] = defaultdict(list)
+        for order in orders:
+            by_company[order.company_id].append(order)
+        
+        chart = LedgerService.get_chart_accounts(by_company, ORDER_ACCOUNT_CODES.values())
+        
+        errors: Dict[Any, str] = {}
+        entries: List[JournalEntry] = []
+        lines: List[JournalLine] = []
+        for company_id, company_orders in by_company.items():
+            prepared = []
+            for order in company_orders:
+                if order.total_amount <= 0:
+                    continue
+                try:
+                    prepared.append((order, LedgerService.build_order_lines(order, chart[company_id])))
+                except ValueError as e:
+                    errors[order.pk] = str(e)
+            
+            if not prepared:
+                continue
+            
+            numbers = JournalEntry.generate_entry_numbers(company_id, len(prepared))
+            for entry_number, (order, order_lines) in zip(numbers, prepared):
+                entry = JournalEntry(
+                    id=uuid.uuid4(),
+                    company_id=company_id,
+                    entry_number=entry_number,
+                    entry_date=order.created_at.date(),
+                    description=f"Revenue from Order {order.order_number}",
+                    reference_type='order',
+                    reference_id=order.pk,
+                    total_debit=order.total_amount,
+                    total_credit=order.total_amount,
+                )
+                entries.append(entry)
+                lines.extend(
+                    JournalLine(
+                        journal_entry_id=entry.id,
+                        account_id=line['account_id'],
+                        debit_amount=line['debit_amount'],
+                        credit_amount=line['credit_amount'],
+                        description=line.get('description', ''),
+                        gst_amount=line.get('gst_amount', 0),
+                        gst_code=line.get('gst_code', ''),
+                    )
+                    for line in order_lines
+                )
+        
+        JournalEntry.objects.bulk_create(entries)
+        JournalLine.objects.bulk_create(lines)
+        
+        if entries:
+            logger.info(f"Created {len(entries)} journal entries from orders")
+        
+        return errors
+    
+    @staticmethod
+    def _void_entries(entries: List[Dict[str, Any]]) -> None:
+        """Void live entries, reversing the balances of posted ones."""
+        posted_ids = [entry['id'] for entry in entries if entry['status'] == 'posted']
+        if posted_ids:
+            PostingService.apply_entries(posted_ids, reverse=True)
+        
+        JournalEntry.objects.filter(
+            pk__in=[entry['id'] for entry in entries],
+        ).update(status='voided', updated_at=timezone.now())
+        
+        logger.info(f"Voided {len(entries)} journal entries for orders")
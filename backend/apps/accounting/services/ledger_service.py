@@ -7,20 +7,32 @@ Provides:
 - Voiding entries (reverses balances)
 - Auto-generation of entries from orders
 - Trial balance reporting
+- As-of balances from monthly period balance snapshots
 """
 from decimal import Decimal
-from datetime import date
+from datetime import date, timedelta
 from typing import List, Dict, Any, Optional, Tuple
 import logging
 
 from django.db import transaction
 from django.db.models import Sum, Q
+from django.db.models.functions import TruncMonth
 
-from apps.accounting.models import Account, JournalEntry, JournalLine
+from apps.accounting.chart_cache import get_chart
+from apps.accounting.models import (
+    Account, AccountPeriodBalance, JournalEntry, JournalLine,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# Standard chart of accounts codes used for order revenue
+ORDER_ACCOUNT_CODES = {
+    'receivable': '1100',
+    'revenue': '4000',
+    'gst_payable': '2100',
+}
+
 
 class LedgerService:
     """
@@ -98,8 +110,8 @@ class LedgerService:
             )
             
             # Create lines
-            for line_data in lines:
-                JournalLine.objects.create(
+            journal_lines = [
+                JournalLine(
                     journal_entry=entry,
                     account_id=line_data['account_id'],
                     debit_amount=Decimal(str(line_data.get('debit_amount', 0))),
@@ -108,6 +120,11 @@ class LedgerService:
                     gst_amount=Decimal(str(line_data.get('gst_amount', 0))),
                     gst_code=line_data.get('gst_code', ''),
                 )
+                for line_data in lines
+            ]
+            for line in journal_lines:
+                line.clean()
+            JournalLine.objects.bulk_create(journal_lines)
             
             logger.info(f"Created journal entry {entry.entry_number}")
             
@@ -129,6 +146,22 @@ class LedgerService:
             entry.post(approved_by=approved_by)
             logger.info(f"Posted journal entry {entry.entry_number}")
     
+    @staticmethod
+    def post_entries(entries: List[JournalEntry], approved_by=None) -> int:
+        """
+        Post many draft entries in one transaction (all or nothing).
+        
+        Args:
+            entries: JournalEntries to post
+            approved_by: User approving the entries
+            
+        Returns:
+            Number of entries posted
+        """
+        from apps.accounting.services.posting_service import PostingService
+        
+        return PostingService.post_entries(entries, approved_by=approved_by)
+    
     @staticmethod
     def void_entry(entry: JournalEntry) -> None:
         """
@@ -145,61 +178,78 @@ class LedgerService:
             logger.info(f"Voided journal entry {entry.entry_number}")
     
     @staticmethod
-    def create_from_order(order, created_by=None) -> JournalEntry:
+    def get_chart_accounts(company_ids, codes) -> Dict[Any, Dict[str, Any]]:
         """
-        Create journal entry from a completed order.
+        Resolve account codes to account IDs for many companies at once.
+        
+        Served from the chart of accounts cache (memory reads once warm).
+        
+        Args:
+            company_ids: Company UUIDs
+            codes: Account codes to resolve
+            
+        Returns:
+            Dict of company ID to {code: account ID}
+        """
+        codes = list(codes)
+        return {
+            company_id: get_chart(company_id).resolve(codes)
+            for company_id in company_ids
+        }
+    
+    @staticmethod
+    def build_order_lines(order, accounts: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Build journal lines for an order's revenue.
         
         Standard double-entry for sales:
         - DR Accounts Receivable: Total amount
-        - CR Sales Revenue: Subtotal
+        - CR Sales Revenue: Total less GST
         - CR GST Payable: GST amount
         
         Args:
             order: Order instance
-            created_by: User creating the entry
+            accounts: Dict of account code to account ID (ORDER_ACCOUNT_CODES)
             
         Returns:
-            Created JournalEntry
+            Line dicts as accepted by create_journal_entry
+            
+        Raises:
+            ValueError: If a required account is missing
         """
-        # Get required accounts
-        company = order.company
-        
-        # Find accounts by code (assumes standard chart of accounts)
-        try:
-            ar_account = Account.objects.get(company=company, code='1100')
-            revenue_account = Account.objects.get(company=company, code='4000')
-            gst_payable_account = Account.objects.get(company=company, code='2100')
-        except Account.DoesNotExist as e:
+        missing = [code for code in ORDER_ACCOUNT_CODES.values() if code not in accounts]
+        if missing:
             raise ValueError(
-                f"Required account not found. Please initialize chart of accounts: {e}"
+                f"Required account not found. Please initialize chart of accounts: "
+                f"{', '.join(missing)}"
             )
         
-        # Calculate amounts
-        subtotal = order.subtotal
-        gst_amount = order.gst_amount
         total = order.total_amount
+        gst_amount = order.gst_amount
         
-        # Build lines
         lines = [
             {
-                'account_id': ar_account.id,
+                'account_id': accounts[ORDER_ACCOUNT_CODES['receivable']],
                 'debit_amount': total,
                 'credit_amount': Decimal('0.00'),
                 'description': f"Order {order.order_number}",
             },
-            {
-                'account_id': revenue_account.id,
+        ]
+        
+        # Revenue is net of GST so discounts and shipping keep the entry balanced
+        if total - gst_amount > 0:
+            lines.append({
+                'account_id': accounts[ORDER_ACCOUNT_CODES['revenue']],
                 'debit_amount': Decimal('0.00'),
-                'credit_amount': subtotal,
+                'credit_amount': total - gst_amount,
                 'description': f"Sales - Order {order.order_number}",
                 'gst_code': 'SR',
-            },
-        ]
+            })
         
         # Only add GST line if there's GST
         if gst_amount > 0:
             lines.append({
-                'account_id': gst_payable_account.id,
+                'account_id': accounts[ORDER_ACCOUNT_CODES['gst_payable']],
                 'debit_amount': Decimal('0.00'),
                 'credit_amount': gst_amount,
                 'description': f"GST - Order {order.order_number}",
@@ -207,10 +257,34 @@ class LedgerService:
                 'gst_code': 'SR',
             })
         
+        return lines
+    
+    @staticmethod
+    def create_from_order(order, created_by=None) -> JournalEntry:
+        """
+        Create journal entry from a completed order.
+        
+        Order status changes normally reach the ledger through
+        LedgerPipelineService; this is the synchronous path.
+        
+        Args:
+            order: Order instance
+            created_by: User creating the entry
+            
+        Returns:
+            Created JournalEntry
+        """
+        company = order.company
+        
+        # Find accounts by code (assumes standard chart of accounts)
+        accounts = LedgerService.get_chart_accounts(
+            [company.id], ORDER_ACCOUNT_CODES.values(),
+        )[company.id]
+        
         return LedgerService.create_journal_entry(
             company=company,
             entry_date=order.created_at.date(),
-            lines=lines,
+            lines=LedgerService.build_order_lines(order, accounts),
             description=f"Revenue from Order {order.order_number}",
             reference_type='order',
             reference_id=order.id,
@@ -232,20 +306,9 @@ class LedgerService:
         if as_of_date is None:
             return account.current_balance
         
-        # Calculate from posted entries up to date
-        lines = JournalLine.objects.filter(
-            account=account,
-            journal_entry__status='posted',
-            journal_entry__entry_date__lte=as_of_date,
-        )
-        
-        totals = lines.aggregate(
-            total_debit=Sum('debit_amount'),
-            total_credit=Sum('credit_amount'),
-        )
-        
-        total_debit = totals['total_debit'] or Decimal('0.00')
-        total_credit = totals['total_credit'] or Decimal('0.00')
+        total_debit, total_credit = LedgerService.get_posted_totals(
+            account.company_id, as_of_date, account_ids=[account.id],
+        ).get(account.id, (Decimal('0.00'), Decimal('0.00')))
         
         # Calculate balance based on normal balance
         if account.is_debit_normal:
@@ -253,6 +316,128 @@ class LedgerService:
         else:
             return total_credit - total_debit
     
+    @staticmethod
+    def get_posted_totals(
+        company_id,
+        as_of_date: date,
+        account_ids: Optional[List] = None,
+    ) -> Dict[Any, Tuple[Decimal, Decimal]]:
+        """
+        Get posted debit/credit totals per account as of a date.
+        
+        Reads each account's latest period balance snapshot closed on or
+        before as_of_date, then adds posted lines dated after it (at most
+        one month). Two queries regardless of account count or history.
+        
+        Args:
+            company_id: Company UUID
+            as_of_date: Date to total through (inclusive)
+            account_ids: Optional account UUIDs to restrict to
+            
+        Returns:
+            Dict of account ID to (total_debit, total_credit); accounts
+            with no posted lines are omitted
+        """
+        month_start = as_of_date.replace(day=1)
+        
+        # A snapshot covers its whole month, so use the as-of month's own
+        # snapshot only when as_of_date is the month end
+        if (as_of_date + timedelta(days=1)).day == 1:
+            snapshots = AccountPeriodBalance.objects.filter(period_start__lte=month_start)
+            delta_from = None
+        else:
+            snapshots = AccountPeriodBalance.objects.filter(period_start__lt=month_start)
+            delta_from = month_start
+        
+        snapshots = snapshots.filter(company_id=company_id)
+        if account_ids is not None:
+            snapshots = snapshots.filter(account_id__in=account_ids)
+        
+        totals = {
+            row['account_id']: (row['closing_debit'], row['closing_credit'])
+            for row in snapshots.order_by('account_id', '-period_start')
+            .distinct('account_id')
+            .values('account_id', 'closing_debit', 'closing_credit')
+        }
+        
+        if delta_from is not None:
+            lines = JournalLine.objects.filter(
+                journal_entry__company_id=company_id,
+                journal_entry__status='posted',
+                journal_entry__entry_date__gte=delta_from,
+                journal_entry__entry_date__lte=as_of_date,
+            )
+            if account_ids is not None:
+                lines = lines.filter(account_id__in=account_ids)
+            
+            for row in lines.values('account_id').annotate(
+                total_debit=Sum('debit_amount'),
+                total_credit=Sum('credit_amount'),
+            ).order_by():
+                debit, credit = totals.get(
+                    row['account_id'], (Decimal('0.00'), Decimal('0.00')),
+                )
+                totals[row['account_id']] = (
+                    debit + row['total_debit'],
+                    credit + row['total_credit'],
+                )
+        
+        return totals
+    
+    @staticmethod
+    def rebuild_period_balances(company) -> int:
+        """
+        Rebuild a company's period balance snapshots from posted lines.
+        
+        Used to backfill history and to repair drift.
+        
+        Args:
+            company: Company to rebuild
+            
+        Returns:
+            Number of snapshot rows written
+        """
+        with transaction.atomic():
+            # Lock the chart so concurrent posts wait for the rebuild
+            list(Account.objects.select_for_update().filter(company=company).values_list('id'))
+            
+            rows = JournalLine.objects.filter(
+                journal_entry__company=company,
+                journal_entry__status='posted',
+            ).annotate(
+                period_start=TruncMonth('journal_entry__entry_date'),
+            ).values('account_id', 'period_start').annotate(
+                period_debit=Sum('debit_amount'),
+                period_credit=Sum('credit_amount'),
+            ).order_by('account_id', 'period_start')
+            
+            snapshots = []
+            closing: Dict[Any, Tuple[Decimal, Decimal]] = {}
+            for row in rows:
+                debit, credit = closing.get(row['account_id'], (Decimal('0.00'), Decimal('0.00')))
+                debit += row['period_debit']
+                credit += row['period_credit']
+                closing[row['account_id']] = (debit, credit)
+                
+                snapshots.append(AccountPeriodBalance(
+                    company=company,
+                    account_id=row['account_id'],
+                    period_start=row['period_start'],
+                    period_debit=row['period_debit'],
+                    period_credit=row['period_credit'],
+                    closing_debit=debit,
+                    closing_credit=credit,
+                ))
+            
+            AccountPeriodBalance.objects.filter(company=company).delete()
+            AccountPeriodBalance.objects.bulk_create(snapshots)
+        
+        logger.info(
+            f"Rebuilt {len(snapshots)} period balances for company {company.id}"
+        )
+        
+        return len(snapshots)
+    
     @staticmethod
     def get_trial_balance(
         company,
@@ -273,12 +458,25 @@ class LedgerService:
             is_active=True,
         ).order_by('code')
         
+        posted_totals = None
+        if as_of_date is not None:
+            posted_totals = LedgerService.get_posted_totals(company.id, as_of_date)
+        
         trial_balance = []
         total_debit = Decimal('0.00')
         total_credit = Decimal('0.00')
         
         for account in accounts:
-            balance = LedgerService.get_account_balance(account, as_of_date)
+            if posted_totals is None:
+                balance = account.current_balance
+            else:
+                account_debit, account_credit = posted_totals.get(
+                    account.id, (Decimal('0.00'), Decimal('0.00')),
+                )
+                if account.is_debit_normal:
+                    balance = account_debit - account_credit
+                else:
+                    balance = account_credit - account_debit
             
             if balance == 0:
                 continue
@@ -0,0 +1,252 @@
+"""
+Posting engine for journal entries.
+
+Aggregates line amounts per account in one grouped query and applies
+them with a single UPDATE ... FROM (VALUES ...) statement, after locking
+the affected accounts in sorted order (so concurrent postings cannot
+deadlock). The number of statements per posting does not depend on the
+number of lines, and many entries can be posted in one transaction.
+"""
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Tuple
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from apps.accounting.models import Account, AccountPeriodBalance, JournalEntry, JournalLine
+
+
+logger = logging.getLogger(__name__)
+
+
+class PostingService:
+    """
+    Service for applying journal entries to account balances.
+    """
+    
+    @staticmethod
+    def apply_entries(entry_ids: Iterable, reverse: bool = False) -> Dict[Any, Decimal]:
+        """
+        Apply the lines of entries to account balances and snapshots.
+        
+        Must be called inside a transaction. Entry statuses are left to
+        the caller.
+        
+        Args:
+            entry_ids: UUIDs of the entries being posted (or voided)
+            reverse: True when voiding
+        
+        Returns:
+            Dict of account ID to change in current_balance
+        """
+        sign = -1 if reverse else 1
+        
+        rows = JournalLine.objects.filter(
+            journal_entry_id__in=list(entry_ids),
+        ).values(
+            'account_id', 'account__account_type', 'account__company_id',
+            period_start=TruncMonth('journal_entry__entry_date'),
+        ).annotate(
+            debit=Sum('debit_amount'),
+            credit=Sum('credit_amount'),
+        ).order_by()
+        
+        balance_deltas: Dict[Any, Decimal] = {}
+        period_deltas: Dict[Tuple[Any, Any], Tuple[Decimal, Decimal]] = {}
+        company_ids: Dict[Any, Any] = {}
+        for row in rows:
+            debit = sign * row['debit']
+            credit = sign * row['credit']
+            if row['account__account_type'] in ('asset', 'expense'):
+                change = debit - credit
+            else:
+                change = credit - debit
+            
+            account_id = row['account_id']
+            balance_deltas[account_id] = balance_deltas.get(account_id, Decimal('0.00')) + change
+            period_deltas[(account_id, row['period_start'])] = (debit, credit)
+            company_ids[account_id] = row['account__company_id']
+        
+        if not balance_deltas:
+            return balance_deltas
+        
+        PostingService.lock_accounts(balance_deltas)
+        PostingService.update_balances(balance_deltas)
+        AccountPeriodBalance.apply_deltas(period_deltas, company_ids)
+        
+        return balance_deltas
+    
+    @staticmethod
+    def lock_accounts(account_ids: Iterable) -> None:
+        """Lock account rows in primary key order."""
+        list(
+            Account.objects.select_for_update()
+            .filter(pk__in=list(account_ids))
+            .order_by('pk')
+            .values_list('pk', flat=True)
+        )
+    
+    @staticmethod
+    def update_balances(balance_deltas: Dict[Any, Decimal]) -> None:
+        """Add deltas to current_balance in one UPDATE ... FROM (VALUES ...)."""
+        values_sql = ', '.join(['(%s::uuid, %s::numeric)'] * len(balance_deltas))
+        params: List[Any] = [timezone.now()]
+        for account_id, delta in balance_deltas.items():
+            params.extend([account_id, delta])
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Account._meta.db_table} AS a SET "
+                f"current_balance = a.current_balance + v.delta, "
+                f"updated_at = %s "
+                f"FROM (VALUES {values_sql}) AS v(id, delta) "
+                f"WHERE a.id = v.id",
+                params,
+            )
+    
+    @staticmethod
+    def set_balances(balances: Dict[Any, Decimal]) -> None:
+        """Overwrite current_balance in one UPDATE ... FROM (VALUES ...)."""
+        values_sql = ', '.join(['(%s::uuid, %s::numeric)'] * len(balances))
+        params: List[Any] = [timezone.now()]
+        for account_id, balance in balances.items():
+            params.extend([account_id, balance])
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Account._meta.db_table} AS a SET "
+                f"current_balance = v.balance, "
+                f"updated_at = %s "
+                f"FROM (VALUES {values_sql}) AS v(id, balance) "
+                f"WHERE a.id = v.id",
+                params,
+            )
+    
+    @staticmethod
+    def reconcile_balances(company_id, fix: bool = True) -> Dict[str, Any]:
+        """
+        Compare current_balance with posted lines for a company's accounts.
+        
+        Posted totals come from one grouped query; only drifted accounts
+        are rewritten, in one statement. The accounts are locked first
+        so postings committed meanwhile are not overwritten.
+        
+        Args:
+            company_id: Company UUID
+            fix: If True, set drifted balances to the posted totals
+            
+        Returns:
+            Drift report dict; 'drift' lists each drifted account with
+            recorded and expected balances
+        """
+        with transaction.atomic():
+            accounts = list(
+                Account.objects.select_for_update()
+                .filter(company_id=company_id)
+                .order_by('pk')
+                .values('id', 'code', 'account_type', 'current_balance')
+            )
+            
+            totals = {
+                row['account_id']: (row['debit'], row['credit'])
+                for row in JournalLine.objects.filter(
+                    journal_entry__company_id=company_id,
+                    journal_entry__status='posted',
+                ).values('account_id').annotate(
+                    debit=Sum('debit_amount'),
+                    credit=Sum('credit_amount'),
+                ).order_by()
+            }
+            
+            drift = []
+            expected_balances: Dict[Any, Decimal] = {}
+            for account in accounts:
+                debit, credit = totals.get(account['id'], (Decimal('0.00'), Decimal('0.00')))
+                if account['account_type'] in ('asset', 'expense'):
+                    expected = debit - credit
+                else:
+                    expected = credit - debit
+                
+                if expected != account['current_balance']:
+                    expected_balances[account['id']] = expected
+                    drift.append({
+                        'account_id': str(account['id']),
+                        'account_code': account['code'],
+                        'recorded': str(account['current_balance']),
+                        'expected': str(expected),
+                        'difference': str(expected - account['current_balance']),
+                    })
+            
+            if fix and expected_balances:
+                PostingService.set_balances(expected_balances)
+        
+        if drift:
+            logger.warning(
+                f"Account balance drift for company {company_id}: "
+                f"{len(drift)} of {len(accounts)} accounts"
+                f"{' (fixed)' if fix else ''}"
+            )
+        
+        return {
+            'company_id': str(company_id),
+            'accounts_checked': len(accounts),
+            'drift': sorted(drift, key=lambda row: row['account_code']),
+            'has_drift': bool(drift),
+            'fixed': fix and bool(drift),
+        }
+    
+    @staticmethod
+    def post_entries(entries: Iterable[JournalEntry], approved_by=None) -> int:
+        """
+        Post many draft entries in one transaction.
+        
+        All entries are validated first; if any is not a balanced draft
+        nothing is posted.
+        
+        Args:
+            entries: JournalEntries (or their UUIDs) to post
+            approved_by: User approving the entries
+        
+        Returns:
+            Number of entries posted
+        
+        Raises:
+            ValueError: If any entry is not a balanced draft
+        """
+        entry_ids = [getattr(entry, 'pk', entry) for entry in entries]
+        if not entry_ids:
+            return 0
+        
+        with transaction.atomic():
+            locked = list(
+                JournalEntry.objects.select_for_update()
+                .filter(pk__in=entry_ids)
+                .order_by('pk')
+                .values('pk', 'entry_number', 'status', 'total_debit', 'total_credit')
+            )
+            
+            errors = []
+            if len(locked) != len(set(entry_ids)):
+                errors.append("some entries were not found")
+            for entry in locked:
+                if entry['status'] != 'draft':
+                    errors.append(f"{entry['entry_number']} has status '{entry['status']}'")
+                elif entry['total_debit'] != entry['total_credit']:
+                    errors.append(f"{entry['entry_number']} is not balanced")
+            if errors:
+                raise ValueError(f"Cannot post entries: {'; '.join(errors)}")
+            
+            PostingService.apply_entries(entry_ids)
+            
+            now = timezone.now()
+            updates = {'status': 'posted', 'posted_at': now, 'updated_at': now}
+            if approved_by:
+                updates['approved_by'] = approved_by
+            JournalEntry.objects.filter(pk__in=entry_ids).update(**updates)
+        
+        logger.info(f"Posted {len(locked)} journal entries")
+        
+        return len(locked)
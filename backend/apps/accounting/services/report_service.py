@@ -0,0 +1,372 @@
+"""
+Financial report engine.
+
+Produces the trial balance, balance sheet and profit & loss from one
+grouped aggregation of posted JournalLines per Account. Each report
+period adds conditional SUM columns to the same query, so comparative
+reports are still a single round trip. Balances roll up through the
+Account.parent hierarchy in Python.
+"""
+from dataclasses import dataclass
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+
+from django.db.models import DecimalField, F, Q, Sum
+
+from apps.accounting.models import Account
+
+
+logger = logging.getLogger(__name__)
+
+ZERO = Decimal('0.00')
+
+
+@dataclass(frozen=True)
+class ReportPeriod:
+    """
+    A report column.
+    
+    Attributes:
+        end: Last date included (None: all posted entries)
+        start: First date of period activity for P&L
+            (default: 1 January of the end year)
+    """
+    end: Optional[date] = None
+    start: Optional[date] = None
+    
+    @property
+    def activity_start(self) -> Optional[date]:
+        """First date counted as activity for this period."""
+        if self.start is not None:
+            return self.start
+        if self.end is not None:
+            return self.end.replace(month=1, day=1)
+        return None
+    
+    @property
+    def label(self) -> str:
+        """Human-readable column label."""
+        if self.end is None:
+            return 'Current'
+        return self.end.isoformat()
+
+
+def shift_years(value: date, years: int) -> date:
+    """Move a date by whole years (29 February becomes 28 February)."""
+    try:
+        return value.replace(year=value.year + years)
+    except ValueError:
+        return value.replace(year=value.year + years, day=28)
+
+
+class FinancialReportService:
+    """
+    Service for period-end financial statements.
+    """
+    
+    @staticmethod
+    def get_account_amounts(
+        company,
+        periods: Sequence[ReportPeriod],
+        closing: bool = True,
+        activity: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """
+        Aggregate posted lines per account for each period in one query.
+        
+        Amounts are signed to the account's normal balance (positive
+        debit for assets/expenses, positive credit for the rest).
+        
+        Args:
+            company: Company to report on
+            periods: Report columns
+            closing: Include cumulative balances through each period end
+            activity: Include movement within each period
+        
+        Returns:
+            One dict per account with 'closing' and/or 'activity' lists
+            (one amount per period) and the account's own fields
+        """
+        posted = Q(journal_lines__journal_entry__status='posted')
+        net = F('journal_lines__debit_amount') - F('journal_lines__credit_amount')
+        output_field = DecimalField(max_digits=15, decimal_places=2)
+        
+        annotations = {}
+        for index, period in enumerate(periods):
+            if closing:
+                condition = posted
+                if period.end is not None:
+                    condition &= Q(journal_lines__journal_entry__entry_date__lte=period.end)
+                annotations[f'closing_{index}'] = Sum(
+                    net, filter=condition, default=ZERO, output_field=output_field,
+                )
+            if activity:
+                condition = posted
+                if period.activity_start is not None:
+                    condition &= Q(
+                        journal_lines__journal_entry__entry_date__gte=period.activity_start,
+                    )
+                if period.end is not None:
+                    condition &= Q(journal_lines__journal_entry__entry_date__lte=period.end)
+                annotations[f'activity_{index}'] = Sum(
+                    net, filter=condition, default=ZERO, output_field=output_field,
+                )
+        
+        rows = Account.objects.filter(company=company).values(
+            'id', 'parent_id', 'code', 'name', 'account_type', 'is_active',
+        ).annotate(**annotations).order_by('code')
+        
+        accounts = []
+        for row in rows:
+            sign = 1 if row['account_type'] in ('asset', 'expense') else -1
+            account = {
+                'account_id': row['id'],
+                'parent_id': row['parent_id'],
+                'account_code': row['code'],
+                'account_name': row['name'],
+                'account_type': row['account_type'],
+                'is_active': row['is_active'],
+            }
+            if closing:
+                account['closing'] = [
+                    sign * row[f'closing_{index}'] for index in range(len(periods))
+                ]
+            if activity:
+                account['activity'] = [
+                    sign * row[f'activity_{index}'] for index in range(len(periods))
+                ]
+            accounts.append(account)
+        
+        return accounts
+    
+    @staticmethod
+    def roll_up(accounts: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+        """
+        Order accounts as a tree and add rolled-up amounts.
+        
+        Each account gets 'depth' and 'total_<key>' (its own amounts
+        plus all descendants', signed to its own normal balance).
+        
+        Args:
+            accounts: Rows from get_account_amounts
+            key: 'closing' or 'activity'
+        
+        Returns:
+            Accounts in depth-first code order
+        """
+        by_id = {account['account_id']: account for account in accounts}
+        children: Dict[Any, List[Dict[str, Any]]] = {}
+        roots = []
+        for account in accounts:
+            parent_id = account['parent_id']
+            if parent_id in by_id:
+                children.setdefault(parent_id, []).append(account)
+            else:
+                roots.append(account)
+        
+        ordered = []
+        
+        def visit(account, depth):
+            ordered.append(account)
+            account['depth'] = depth
+            sign = 1 if account['account_type'] in ('asset', 'expense') else -1
+            total = list(account[key])
+            for child in children.get(account['account_id'], []):
+                visit(child, depth + 1)
+                child_sign = 1 if child['account_type'] in ('asset', 'expense') else -1
+                for index, amount in enumerate(child[f'total_{key}']):
+                    total[index] += amount * sign * child_sign
+            account[f'total_{key}'] = total
+        
+        for root in roots:
+            visit(root, 0)
+        
+        return ordered
+    
+    @staticmethod
+    def _visible(accounts: List[Dict[str, Any]], key: str) -> List[Dict[str, Any]]:
+        """Drop rows whose own and rolled-up amounts are all zero."""
+        return [
+            account for account in accounts
+            if any(account[f'total_{key}']) or any(account[key])
+        ]
+    
+    @staticmethod
+    def trial_balance(
+        company,
+        periods: Sequence[ReportPeriod] = (ReportPeriod(),),
+    ) -> Dict[str, Any]:
+        """
+        Trial balance with one debit/credit column pair per period.
+        
+        Args:
+            company: Company to report on
+            periods: Report columns (default: all posted entries)
+        
+        Returns:
+            Dict with 'periods', 'lines' and 'totals'
+        """
+        accounts = FinancialReportService.get_account_amounts(company, periods)
+        
+        lines = []
+        total_debit = [ZERO] * len(periods)
+        total_credit = [ZERO] * len(periods)
+        for account in accounts:
+            if not any(account['closing']):
+                continue
+            debit_normal = account['account_type'] in ('asset', 'expense')
+            debits, credits = [], []
+            for index, balance in enumerate(account['closing']):
+                # A negative balance sits on the opposite side
+                on_debit_side = (balance > 0) == debit_normal
+                debit = abs(balance) if on_debit_side else ZERO
+                credit = ZERO if on_debit_side else abs(balance)
+                debits.append(debit)
+                credits.append(credit)
+                total_debit[index] += debit
+                total_credit[index] += credit
+            lines.append({
+                'account_id': account['account_id'],
+                'account_code': account['account_code'],
+                'account_name': account['account_name'],
+                'account_type': account['account_type'],
+                'debit': debits,
+                'credit': credits,
+            })
+        
+        return {
+            'periods': [period.label for period in periods],
+            'lines': lines,
+            'totals': {'debit': total_debit, 'credit': total_credit},
+        }
+    
+    @staticmethod
+    def balance_sheet(
+        company,
+        periods: Sequence[ReportPeriod],
+    ) -> Dict[str, Any]:
+        """
+        Balance sheet with one column per period end.
+        
+        Current earnings (revenue less expenses to date) are reported
+        under equity so each column balances.
+        
+        Args:
+            company: Company to report on
+            periods: Report columns
+        
+        Returns:
+            Dict with 'periods', 'assets', 'liabilities', 'equity' and 'totals'
+        """
+        accounts = FinancialReportService.get_account_amounts(company, periods)
+        count = len(periods)
+        
+        totals = {key: [ZERO] * count for key in (
+            'asset', 'liability', 'equity', 'revenue', 'expense',
+        )}
+        for account in accounts:
+            for index, amount in enumerate(account['closing']):
+                totals[account['account_type']][index] += amount
+        
+        current_earnings = [
+            totals['revenue'][index] - totals['expense'][index] for index in range(count)
+        ]
+        
+        ordered = FinancialReportService._visible(
+            FinancialReportService.roll_up(accounts, 'closing'), 'closing',
+        )
+        
+        return {
+            'periods': [period.label for period in periods],
+            'assets': [a for a in ordered if a['account_type'] == 'asset'],
+            'liabilities': [a for a in ordered if a['account_type'] == 'liability'],
+            'equity': [a for a in ordered if a['account_type'] == 'equity'],
+            'totals': {
+                'assets': totals['asset'],
+                'liabilities': totals['liability'],
+                'equity': totals['equity'],
+                'current_earnings': current_earnings,
+                'liabilities_and_equity': [
+                    totals['liability'][index] + totals['equity'][index] + current_earnings[index]
+                    for index in range(count)
+                ],
+            },
+        }
+    
+    @staticmethod
+    def profit_and_loss(
+        company,
+        periods: Sequence[ReportPeriod],
+    ) -> Dict[str, Any]:
+        """
+        Profit and loss with one column per period.
+        
+        Args:
+            company: Company to report on
+            periods: Report columns (activity from start to end)
+        
+        Returns:
+            Dict with 'periods', 'revenue', 'expenses' and 'totals'
+        """
+        accounts = FinancialReportService.get_account_amounts(
+            company, periods, closing=False, activity=True,
+        )
+        count = len(periods)
+        
+        revenue = [ZERO] * count
+        expenses = [ZERO] * count
+        for account in accounts:
+            target = {'revenue': revenue, 'expense': expenses}.get(account['account_type'])
+            if target is None:
+                continue
+            for index, amount in enumerate(account['activity']):
+                target[index] += amount
+        
+        ordered = FinancialReportService._visible(
+            FinancialReportService.roll_up(accounts, 'activity'), 'activity',
+        )
+        
+        return {
+            'periods': [
+                f"{period.activity_start} to {period.end}" if period.end
+                else f"{period.start} onwards" if period.start
+                else period.label
+                for period in periods
+            ],
+            'revenue': [a for a in ordered if a['account_type'] == 'revenue'],
+            'expenses': [a for a in ordered if a['account_type'] == 'expense'],
+            'totals': {
+                'revenue': revenue,
+                'expenses': expenses,
+                'net_profit': [revenue[index] - expenses[index] for index in range(count)],
+            },
+        }
+    
+    @staticmethod
+    def comparative_periods(
+        end: Optional[date],
+        start: Optional[date] = None,
+        compare_years: int = 0,
+    ) -> List[ReportPeriod]:
+        """
+        Build a period and the same period in each of the prior years.
+        
+        Args:
+            end: Period end (None: all posted entries, no comparatives)
+            start: Period start for P&L activity (kept without an end)
+            compare_years: Number of prior years to add
+        
+        Returns:
+            Periods, most recent first
+        """
+        if end is None:
+            return [ReportPeriod(start=start)]
+        return [
+            ReportPeriod(
+                end=shift_years(end, -offset),
+                start=shift_years(start, -offset) if start else None,
+            )
+            for offset in range(compare_years + 1)
+        ]
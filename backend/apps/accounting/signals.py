@@ -0,0 +1,31 @@
+"""
+Accounting signals.
+
+Invalidates the per-company chart of accounts cache when accounts change.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.accounting.chart_cache import invalidate_chart
+from apps.accounting.models import Account
+
+
+# Saves limited to these fields do not change the cached chart
+BALANCE_FIELDS = frozenset({'current_balance', 'updated_at'})
+
+
+@receiver(post_save, sender=Account)
+def account_saved(sender, instance, update_fields=None, **kwargs):
+    """Publish a new chart version once the save commits."""
+    if update_fields is not None and set(update_fields) <= BALANCE_FIELDS:
+        return
+    company_id = instance.company_id
+    transaction.on_commit(lambda: invalidate_chart(company_id))
+
+
+@receiver(post_delete, sender=Account)
+def account_deleted(sender, instance, **kwargs):
+    """Publish a new chart version once the delete commits."""
+    company_id = instance.company_id
+    transaction.on_commit(lambda: invalidate_chart(company_id))
@@ -16,21 +16,44 @@ def check_overdue_invoices():
     """
     Periodic task to check and update overdue invoice status.
     
-    Run daily to mark invoices as overdue when past due date.
+    Run daily to mark invoices as overdue when past due date. One
+    statement covers every company.
     """
-    from apps.accounts.models import Company
     from apps.accounting.services import InvoiceService
     
-    total_marked = 0
-    
-    for company in Company.objects.filter(is_active=True):
-        count = InvoiceService.check_overdue_invoices(company)
-        total_marked += count
+    marked = InvoiceService.mark_overdue_invoices()
+    total_marked = sum(len(invoice_ids) for invoice_ids in marked.values())
     
     if total_marked > 0:
-        logger.info(f"Marked {total_marked} invoices as overdue")
+        logger.info(
+            f"Marked {total_marked} invoices as overdue across {len(marked)} companies"
+        )
+    
+    return {
+        'marked_overdue': total_marked,
+        'by_company': {
+            str(company_id): [str(invoice_id) for invoice_id in invoice_ids]
+            for company_id, invoice_ids in marked.items()
+        },
+    }
+
+
+@shared_task(name='accounting.snapshot_ar_aging')
+def snapshot_ar_aging(snapshot_date: str = None):
+    """
+    Periodic task to record every company's receivables aging.
+    
+    Run daily. Dashboards chart aging trends from these snapshots.
+    
+    Args:
+        snapshot_date: Date in YYYY-MM-DD format (default: today)
+    """
+    from apps.accounting.services import InvoiceService
     
-    return {'marked_overdue': total_marked}
+    target_date = date.fromisoformat(snapshot_date) if snapshot_date else None
+    count = InvoiceService.snapshot_aging(target_date)
+    
+    return {'snapshots_written': count}
 
 
 @shared_task(name='accounting.prepare_gst_filing_reminder')
@@ -158,7 +181,7 @@ def generate_invoice_pdf(invoice_id: str):
 
 
 @shared_task(name='accounting.sync_account_balances')
-def sync_account_balances(company_id: str):
+def sync_account_balances(company_id: str, fix: bool = True):
     """
     Recalculate and sync account balances from journal entries.
     
@@ -166,46 +189,86 @@ def sync_account_balances(company_id: str):
     
     Args:
         company_id: UUID of company
+        fix: If False, only report drift
+        
+    Returns:
+        Drift report (see PostingService.reconcile_balances)
+    """
+    from apps.accounting.services import PostingService
+    
+    return PostingService.reconcile_balances(company_id, fix=fix)
+
+
+@shared_task(name='accounting.sync_account_balances_chunk')
+def sync_account_balances_chunk(company_ids: list, fix: bool = True):
+    """
+    Reconcile account balances for a chunk of companies.
+    
+    Args:
+        company_ids: Company UUIDs
+        fix: If False, only report drift
+        
+    Returns:
+        Dict with companies checked and the reports of drifted companies
+    """
+    from apps.accounting.services import PostingService
+    
+    drifted = []
+    for company_id in company_ids:
+        report = PostingService.reconcile_balances(company_id, fix=fix)
+        if report['has_drift']:
+            drifted.append(report)
+    
+    return {'companies_checked': len(company_ids), 'drifted': drifted}
+
+
+@shared_task(name='accounting.sync_all_account_balances')
+def sync_all_account_balances(chunk_size: int = 50, fix: bool = True):
+    """
+    Fan out balance reconciliation for every company on the accounting queue.
+    
+    Companies are split into chunks that run in parallel, one
+    transaction per company.
+    
+    Args:
+        chunk_size: Companies per task
+        fix: If False, only report drift
+        
+    Returns:
+        Dict with the number of companies and chunks dispatched
     """
-    from decimal import Decimal
-    from django.db.models import Sum
     from apps.accounts.models import Company
-    from apps.accounting.models import Account, JournalLine
     
-    company = Company.objects.get(id=company_id)
-    accounts = Account.objects.filter(company=company)
-    
-    updated_count = 0
-    
-    with transaction.atomic():
-        for account in accounts:
-            # Calculate balance from posted journal lines
-            totals = JournalLine.objects.filter(
-                account=account,
-                journal_entry__status='posted',
-            ).aggregate(
-                total_debit=Sum('debit_amount'),
-                total_credit=Sum('credit_amount'),
-            )
-            
-            total_debit = totals['total_debit'] or Decimal('0.00')
-            total_credit = totals['total_credit'] or Decimal('0.00')
-            
-            # Calculate new balance
-            if account.is_debit_normal:
-                new_balance = total_debit - total_credit
-            else:
-                new_balance = total_credit - total_debit
-            
-            # Update if different
-            if account.current_balance != new_balance:
-                account.current_balance = new_balance
-                account.save(update_fields=['current_balance', 'updated_at'])
-                updated_count += 1
-                logger.info(
-                    f"Updated balance for {account.code}: {new_balance}"
-                )
-    
-    logger.info(f"Synced {updated_count} account balances for {company.name}")
-    
-    return {'updated_count': updated_count}
+    company_ids = [
+        str(company_id)
+        for company_id in Company.objects.order_by('pk').values_list('pk', flat=True)
+    ]
+    
+    chunks = 0
+    for start in range(0, len(company_ids), chunk_size):
+        sync_account_balances_chunk.apply_async(
+            args=[company_ids[start:start + chunk_size]],
+            kwargs={'fix': fix},
+            queue='accounting',
+        )
+        chunks += 1
+    
+    logger.info(
+        f"Dispatched balance reconciliation for {len(company_ids)} companies "
+        f"in {chunks} chunks"
+    )
+    
+    return {'companies': len(company_ids), 'chunks': chunks}
+
+
+@shared_task(name='accounting.process_ledger_events')
+def process_ledger_events(max_batches: int = None):
+    """
+    Drain queued ledger events (order status changes) into journal entries.
+    
+    Scheduled after commit by LedgerPipelineService.enqueue and run
+    periodically to pick up retries.
+    """
+    from apps.accounting.services import LedgerPipelineService
+    
+    return LedgerPipelineService.drain_events(max_batches=max_batches)
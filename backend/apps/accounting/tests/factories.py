@@ -43,6 +43,13 @@ class LiabilityAccountFactory(AccountFactory):
     code = factory.Sequence(lambda n: f'{2000 + n}')
 
 
+class EquityAccountFactory(AccountFactory):
+    """Factory for Equity accounts."""
+    account_type = 'equity'
+    account_subtype = 'capital'
+    code = factory.Sequence(lambda n: f'{3000 + n}')
+
+
 class RevenueAccountFactory(AccountFactory):
     """Factory for Revenue accounts."""
     account_type = 'revenue'
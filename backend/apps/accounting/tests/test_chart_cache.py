@@ -0,0 +1,98 @@
+"""
+Tests for the chart of accounts cache.
+"""
+import pytest
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from apps.accounting.chart_cache import get_chart, invalidate_chart, version_key
+from apps.accounting.tests.factories import (
+    AssetAccountFactory, LiabilityAccountFactory, RevenueAccountFactory,
+)
+from apps.accounts.tests.factories import CompanyFactory
+
+
+pytestmark = pytest.mark.django_db
+
+
+class TestChartCache:
+    """Tests for get_chart and invalidation."""
+    
+    def test_lookups_by_code_and_id(self):
+        """Test accounts are indexed by code and id."""
+        company = CompanyFactory()
+        receivable = AssetAccountFactory(company=company, code='1100')
+        
+        chart = get_chart(company.id)
+        
+        assert chart.by_code['1100'].id == receivable.id
+        assert chart.by_id[receivable.id].code == '1100'
+        assert chart.resolve(['1100', '9999']) == {'1100': receivable.id}
+    
+    def test_warm_lookup_is_memory_read(self, django_assert_num_queries):
+        """Test a warm chart costs no queries."""
+        company = CompanyFactory()
+        AssetAccountFactory(company=company, code='1100')
+        get_chart(company.id)
+        
+        with django_assert_num_queries(0):
+            assert get_chart(company.id).by_code['1100']
+    
+    def test_tree_is_prebuilt(self):
+        """Test active accounts are nested under their parents."""
+        company = CompanyFactory()
+        parent = AssetAccountFactory(company=company, code='1000')
+        AssetAccountFactory(company=company, code='1100', parent=parent)
+        AssetAccountFactory(company=company, code='1200', parent=parent, is_active=False)
+        
+        tree = get_chart(company.id).tree
+        
+        assert [node['code'] for node in tree] == ['1000']
+        assert [node['code'] for node in tree[0]['children']] == ['1100']
+    
+    def test_tree_with_rolled_up_balances(self):
+        """Test totals include descendants, signed to each node's normal balance."""
+        company = CompanyFactory()
+        assets = AssetAccountFactory(company=company, code='1000')
+        receivables = AssetAccountFactory(company=company, code='1100', parent=assets)
+        debtor = AssetAccountFactory(company=company, code='1110', parent=receivables)
+        allowance = LiabilityAccountFactory(company=company, code='1190', parent=assets)
+        
+        tree = get_chart(company.id).tree_with_balances({
+            assets.id: Decimal('1.00'),
+            receivables.id: Decimal('10.00'),
+            debtor.id: Decimal('5.00'),
+            allowance.id: Decimal('3.00'),
+        }, roll_up=True)
+        
+        root = tree[0]
+        assert root['current_balance'] == Decimal('1.00')
+        assert root['total_balance'] == Decimal('13.00')
+        assert [node['total_balance'] for node in root['children']] == [
+            Decimal('15.00'), Decimal('3.00'),
+        ]
+        assert root['children'][0]['children'][0]['total_balance'] == Decimal('5.00')
+    
+    def test_account_save_invalidates_after_commit(self, django_capture_on_commit_callbacks):
+        """Test saving an account publishes a new version."""
+        company = CompanyFactory()
+        AssetAccountFactory(company=company, code='1100')
+        old_version = get_chart(company.id).version
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            RevenueAccountFactory(company=company, code='4000')
+        
+        chart = get_chart(company.id)
+        assert chart.version > old_version
+        assert '4000' in chart.by_code
+    
+    def test_lost_version_never_reused(self):
+        """Test a reseeded version counter is above earlier versions."""
+        company = CompanyFactory()
+        old_version = get_chart(company.id).version
+        cache.delete(version_key(company.id))
+        
+        invalidate_chart(company.id)
+        
+        assert get_chart(company.id).version > old_version
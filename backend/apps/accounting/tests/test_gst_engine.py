@@ -5,8 +5,11 @@ import pytest
 from decimal import Decimal
 from datetime import date
 
-from apps.accounting.gst import GSTEngine, get_gst_rate, get_current_gst_rate
-from apps.accounting.gst.engine import GSTCalculationResult, F5Return
+from apps.accounting.gst import (
+    GSTEngine, get_gst_rate, get_current_gst_rate,
+    get_rate_segments, get_quarter_rate_segments, RateSegment,
+)
+from apps.accounting.gst.engine import GSTCalculationResult, GSTBatchResult, F5Return
 
 
 pytestmark = pytest.mark.django_db
@@ -46,6 +49,37 @@ class TestGSTRates:
         assert rate == Decimal('0.00')
 
 
+class TestGSTRateTimeline:
+    """Tests for compiled rate timeline and rate segments."""
+    
+    def test_rate_lookup_returns_interned_constant(self):
+        """Test lookups of the same rate return the same instance."""
+        assert get_gst_rate(date(2024, 2, 1)) is get_gst_rate(date(2025, 7, 1))
+    
+    def test_boundary_day(self):
+        """Test the effective date itself uses the new rate."""
+        assert get_gst_rate(date(2023, 12, 31)) == Decimal('0.08')
+        assert get_gst_rate(date(2024, 1, 1)) == Decimal('0.09')
+    
+    def test_segments_split_period_by_rate(self):
+        """Test a period spanning rate changes is split into segments."""
+        segments = list(get_rate_segments(date(2022, 12, 15), date(2024, 2, 1)))
+        
+        assert segments == [
+            RateSegment(date(2022, 12, 15), date(2022, 12, 31), Decimal('0.07')),
+            RateSegment(date(2023, 1, 1), date(2023, 12, 31), Decimal('0.08')),
+            RateSegment(date(2024, 1, 1), date(2024, 2, 1), Decimal('0.09')),
+        ]
+    
+    def test_quarter_segments(self):
+        """Test a quarter within one rate epoch yields one segment."""
+        segments = list(get_quarter_rate_segments(4, 2023))
+        
+        assert segments == [
+            RateSegment(date(2023, 10, 1), date(2023, 12, 31), Decimal('0.08')),
+        ]
+
+
 class TestGSTEngineCalculation:
     """Tests for GSTEngine.calculate()."""
     
@@ -132,6 +166,83 @@ class TestGSTEngineCalculation:
         assert result.gross_amount == Decimal('36.33')
 
 
+class TestGSTEngineCalculateMany:
+    """Tests for GSTEngine.calculate_many()."""
+    
+    def test_matches_calculate(self):
+        """Test batch results equal per-line calculate() results."""
+        amounts = [Decimal('100.00'), Decimal('33.33'), Decimal('0.50'), Decimal('20.00')]
+        codes = ['SR', 'SR', 'SR', 'ZR']
+        dates = [date(2024, 6, 15), date(2024, 1, 1), date(2023, 6, 15), date(2024, 6, 15)]
+        
+        batch = GSTEngine.calculate_many(amounts, codes, dates)
+        
+        assert isinstance(batch, GSTBatchResult)
+        assert len(batch) == 4
+        for i, (amount, code, tx_date) in enumerate(zip(amounts, codes, dates)):
+            assert batch.row(i) == GSTEngine.calculate(amount, code, tx_date)
+    
+    def test_gst_inclusive(self):
+        """Test batch GST-inclusive extraction."""
+        batch = GSTEngine.calculate_many(
+            [Decimal('109.00'), Decimal('10.00')],
+            'SR',
+            [date(2024, 6, 15), date(2024, 6, 15)],
+            amount_includes_gst=True,
+        )
+        
+        assert batch.net_amounts == [Decimal('100.00'), Decimal('9.17')]
+        assert batch.gst_amounts == [Decimal('9.00'), Decimal('0.83')]
+        assert batch.gross_amounts == [Decimal('109.00'), Decimal('10.00')]
+    
+    def test_amounts_in_cents(self):
+        """Test integer cent input skips Decimal conversion."""
+        batch = GSTEngine.calculate_many(
+            [3333], 'SR', [date(2024, 1, 1)], amounts_in_cents=True,
+        )
+        
+        assert list(batch.gst_cents) == [300]
+        assert list(batch.gross_cents) == [3633]
+    
+    def test_sub_cent_amount_rejected(self):
+        """Test amounts with sub-cent precision are rejected."""
+        with pytest.raises(ValueError):
+            GSTEngine.calculate_many([Decimal('1.005')], 'SR')
+    
+    def test_length_mismatch_rejected(self):
+        """Test mismatched column lengths are rejected."""
+        with pytest.raises(ValueError):
+            GSTEngine.calculate_many([Decimal('1.00')], ['SR', 'ZR'])
+    
+    @pytest.mark.slow
+    def test_benchmark_one_million_lines(self):
+        """Benchmark parity and speedup against calculate() on 1M lines."""
+        import random
+        import time
+        
+        rng = random.Random(42)
+        count = 1_000_000
+        amounts = [Decimal(rng.randint(1, 10_000_000)).scaleb(-2) for _ in range(count)]
+        codes = [rng.choice(['SR', 'SR', 'SR', 'ZR', 'ES', 'OS']) for _ in range(count)]
+        dates = [date(rng.choice([2022, 2023, 2024]), rng.randint(1, 12), 1) for _ in range(count)]
+        
+        started = time.perf_counter()
+        expected = [
+            GSTEngine.calculate(amount, code, tx_date).gst_amount
+            for amount, code, tx_date in zip(amounts, codes, dates)
+        ]
+        scalar_seconds = time.perf_counter() - started
+        
+        started = time.perf_counter()
+        batch = GSTEngine.calculate_many(amounts, codes, dates)
+        batch_seconds = time.perf_counter() - started
+        
+        assert batch.gst_amounts == expected
+        assert batch_seconds < scalar_seconds, (
+            f"calculate: {scalar_seconds:.2f}s, calculate_many: {batch_seconds:.2f}s"
+        )
+
+
 class TestGSTEngineRateLookup:
     """Tests for GSTEngine.get_rate()."""
     
@@ -277,3 +388,83 @@ class TestF5Return:
         
         is_valid, errors = GSTEngine.validate_f5(f5)
         assert is_valid is True  # Box 8 can be negative
+
+
+class TestF5Aggregation:
+    """Tests for set-based F5 aggregation."""
+    
+    def _make_order(self, company, created_at, lines):
+        from apps.commerce.tests.factories import (
+            OrderFactory, OrderItemFactory, ProductFactory,
+        )
+        from apps.commerce.models import Order
+        
+        order = OrderFactory(
+            company=company,
+            status='confirmed',
+            gst_box_1_amount=None,
+            gst_box_6_amount=None,
+        )
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        for gst_code, unit_price, quantity in lines:
+            product = ProductFactory(company=company, gst_code=gst_code)
+            OrderItemFactory(
+                order=order,
+                product=product,
+                unit_price=unit_price,
+                quantity=quantity,
+            )
+        return order
+    
+    def test_sql_matches_python_path(self):
+        """Test grouped query reports the same boxes as the Python loop."""
+        from datetime import datetime
+        from django.utils import timezone
+        from apps.accounts.tests.factories import CompanyFactory
+        
+        company = CompanyFactory()
+        created_at = timezone.make_aware(datetime(2024, 2, 15, 12, 0))
+        self._make_order(company, created_at, [
+            ('SR', Decimal('33.33'), 1),   # 2.9997 -> 3.00
+            ('SR', Decimal('10.05'), 1),   # 0.9045 -> 0.90
+            ('ZR', Decimal('20.00'), 2),
+        ])
+        self._make_order(company, created_at, [
+            ('SR', Decimal('0.50'), 1),    # 0.045 -> 0.05 (half up)
+            ('ES', Decimal('15.00'), 1),
+            ('OS', Decimal('99.00'), 1),
+        ])
+        
+        sql = GSTEngine.prepare_f5(company, 1, 2024)
+        python = GSTEngine.prepare_f5(company, 1, 2024, use_sql_aggregation=False)
+        
+        assert sql.to_dict() == python.to_dict()
+        assert sql.box_1 == Decimal('43.88')
+        assert sql.box_2 == Decimal('40.00')
+        assert sql.box_3 == Decimal('15.00')
+        assert sql.box_6 == Decimal('3.95')
+    
+    def test_groups_by_code_and_rate(self):
+        """Test aggregation rows are keyed by GST code and rate epoch."""
+        from datetime import datetime
+        from django.utils import timezone
+        from apps.accounts.tests.factories import CompanyFactory
+        from apps.commerce.models import Order
+        
+        company = CompanyFactory()
+        created_at = timezone.make_aware(datetime(2023, 8, 1, 12, 0))
+        self._make_order(company, created_at, [
+            ('SR', Decimal('100.00'), 1),
+            ('ZR', Decimal('50.00'), 1),
+        ])
+        
+        rows = GSTEngine.aggregate_f5_supplies(
+            Order.objects.filter(company=company),
+            date(2023, 7, 1),
+            date(2023, 9, 30),
+        )
+        by_code = {row['gst_code']: row for row in rows}
+        
+        assert by_code['SR']['gst_rate'] == Decimal('0.08')
+        assert by_code['SR']['output_tax'] == Decimal('8.00')
+        assert by_code['ZR']['supplies'] == Decimal('50.00')
@@ -131,6 +131,20 @@ class TestJournalEntryModel:
         entry = JournalEntryFactory()
         number = JournalEntry.generate_entry_number(entry.company)
         assert number.startswith('JE-')
+    
+    def test_generate_entry_number_is_sequential(self):
+        """Test consecutive entry numbers have no gaps."""
+        entry = JournalEntryFactory()
+        first = JournalEntry.generate_entry_number(entry.company)
+        second = JournalEntry.generate_entry_number(entry.company)
+        assert int(second.split('-')[-1]) == int(first.split('-')[-1]) + 1
+    
+    def test_generate_entry_number_continues_existing(self):
+        """Test a new sequence continues after existing entry numbers."""
+        year = date.today().year
+        entry = JournalEntryFactory(entry_number=f"JE-{year}-00041")
+        number = JournalEntry.generate_entry_number(entry.company)
+        assert number == f"JE-{year}-00042"
 
 
 class TestJournalLineModel:
@@ -269,6 +283,14 @@ class TestInvoiceModel:
         invoice = InvoiceFactory(status='draft')
         invoice.mark_sent()
         assert invoice.status == 'sent'
+    
+    def test_generate_invoice_number_is_sequential(self):
+        """Test consecutive invoice numbers have no gaps."""
+        invoice = InvoiceFactory()
+        first = Invoice.generate_invoice_number(invoice.company)
+        second = Invoice.generate_invoice_number(invoice.company)
+        assert first.startswith('INV-')
+        assert int(second.split('-')[-1]) == int(first.split('-')[-1]) + 1
 
 
 class TestPaymentModel:
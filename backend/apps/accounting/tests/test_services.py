@@ -1,23 +1,33 @@
 """
 Tests for accounting services.
 """
+import csv
+import json
 import pytest
 from decimal import Decimal
-from datetime import date
-from unittest.mock import MagicMock
+from datetime import date, timedelta
+from unittest.mock import MagicMock, patch
 
 from django.db import transaction
 
-from apps.accounting.services import LedgerService, InvoiceService, PaymentService
-from apps.accounting.models import Account, JournalEntry, Invoice, Payment
+from apps.accounting.services import (
+    LedgerService, InvoiceService, PaymentService,
+    FinancialReportService, ReportPeriod, LedgerPipelineService, PostingService,
+    LedgerExportService,
+)
+from apps.accounting.models import (
+    Account, AccountPeriodBalance, ARAgingSnapshot, JournalEntry, Invoice,
+    LedgerEvent, Payment,
+)
 from apps.accounting.tests.factories import (
     AccountFactory, AssetAccountFactory, LiabilityAccountFactory,
-    RevenueAccountFactory,
+    RevenueAccountFactory, ExpenseAccountFactory, EquityAccountFactory,
     JournalEntryFactory,
     InvoiceFactory,
     PaymentFactory, CompletedPaymentFactory,
 )
 from apps.accounts.tests.factories import CompanyFactory
+from apps.commerce.tests.factories import CustomerFactory, OrderFactory
 
 
 pytestmark = pytest.mark.django_db
@@ -194,6 +204,484 @@ class TestLedgerService:
         assert totals['credit'] == Decimal('1000.00')  # 500 + 500
 
 
+class TestPeriodBalances:
+    """Tests for period balance snapshots and as-of balances."""
+    
+    def _post(self, company, debit_account, credit_account, amount, entry_date):
+        entry = LedgerService.create_journal_entry(
+            company=company,
+            entry_date=entry_date,
+            lines=[
+                {'account_id': debit_account.id, 'debit_amount': amount},
+                {'account_id': credit_account.id, 'credit_amount': amount},
+            ],
+        )
+        LedgerService.post_entry(entry)
+        return entry
+    
+    def test_as_of_balance_from_snapshots(self):
+        """Test as-of balances combine snapshots and the month's delta."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        
+        self._post(company, cash, revenue, Decimal('100.00'), date(2024, 1, 15))
+        self._post(company, cash, revenue, Decimal('50.00'), date(2024, 3, 10))
+        # Back-dated entry must roll into later closings
+        self._post(company, cash, revenue, Decimal('25.00'), date(2024, 2, 5))
+        
+        assert LedgerService.get_account_balance(cash, date(2023, 12, 31)) == Decimal('0.00')
+        assert LedgerService.get_account_balance(cash, date(2024, 1, 31)) == Decimal('100.00')
+        assert LedgerService.get_account_balance(cash, date(2024, 2, 4)) == Decimal('100.00')
+        assert LedgerService.get_account_balance(cash, date(2024, 2, 29)) == Decimal('125.00')
+        assert LedgerService.get_account_balance(cash, date(2024, 3, 10)) == Decimal('175.00')
+        assert LedgerService.get_account_balance(revenue, date(2024, 6, 1)) == Decimal('175.00')
+        
+        march = AccountPeriodBalance.objects.get(account=cash, period_start=date(2024, 3, 1))
+        assert march.period_debit == Decimal('50.00')
+        assert march.closing_debit == Decimal('175.00')
+    
+    def test_void_removes_from_snapshots(self):
+        """Test voiding reverses snapshot totals."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        
+        self._post(company, cash, revenue, Decimal('100.00'), date(2024, 1, 15))
+        entry = self._post(company, cash, revenue, Decimal('40.00'), date(2024, 1, 20))
+        entry.refresh_from_db()
+        LedgerService.void_entry(entry)
+        
+        assert LedgerService.get_account_balance(cash, date(2024, 1, 31)) == Decimal('100.00')
+    
+    def test_rebuild_matches_maintained_snapshots(self):
+        """Test a rebuild reproduces incrementally maintained rows."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        
+        for month, amount in [(1, '10.00'), (4, '20.00'), (2, '30.00')]:
+            self._post(company, cash, revenue, Decimal(amount), date(2024, month, 1))
+        
+        def snapshot_rows():
+            return list(AccountPeriodBalance.objects.filter(company=company).order_by(
+                'account_id', 'period_start',
+            ).values_list(
+                'account_id', 'period_start', 'period_debit', 'period_credit',
+                'closing_debit', 'closing_credit',
+            ))
+        
+        maintained = snapshot_rows()
+        assert LedgerService.rebuild_period_balances(company) == 6
+        assert snapshot_rows() == maintained
+    
+    def test_trial_balance_as_of_date(self):
+        """Test the as-of trial balance uses posted totals."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        
+        self._post(company, cash, revenue, Decimal('100.00'), date(2024, 1, 15))
+        self._post(company, cash, revenue, Decimal('50.00'), date(2024, 5, 15))
+        
+        trial_balance = LedgerService.get_trial_balance(company, date(2024, 2, 1))
+        
+        assert trial_balance[-1]['debit'] == Decimal('100.00')
+        assert trial_balance[-1]['credit'] == Decimal('100.00')
+
+
+class TestPostingService:
+    """Tests for the bulk posting engine."""
+    
+    def _entry(self, company, cash, revenue, amounts, entry_date=date(2024, 3, 1)):
+        lines = [{'account_id': cash.id, 'debit_amount': sum(amounts)}]
+        lines += [{'account_id': revenue.id, 'credit_amount': amount} for amount in amounts]
+        return LedgerService.create_journal_entry(
+            company=company, entry_date=entry_date, lines=lines,
+        )
+    
+    def test_post_many_lines_constant_queries(self, django_assert_max_num_queries):
+        """Test a 200-line entry posts with a fixed number of statements."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        entry = self._entry(company, cash, revenue, [Decimal('1.50')] * 199)
+        
+        with django_assert_max_num_queries(12):
+            LedgerService.post_entry(entry)
+        
+        cash.refresh_from_db()
+        revenue.refresh_from_db()
+        assert cash.current_balance == Decimal('298.50')
+        assert revenue.current_balance == Decimal('298.50')
+        assert LedgerService.get_account_balance(cash, date(2024, 3, 31)) == Decimal('298.50')
+    
+    def test_post_entries_batch(self):
+        """Test a batch posts every entry in one transaction."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        entries = [
+            self._entry(company, cash, revenue, [Decimal('10.00')], date(2024, month, 5))
+            for month in (1, 2, 3)
+        ]
+        
+        assert LedgerService.post_entries(entries) == 3
+        
+        cash.refresh_from_db()
+        assert cash.current_balance == Decimal('30.00')
+        assert JournalEntry.objects.filter(
+            pk__in=[e.pk for e in entries], status='posted',
+        ).count() == 3
+        assert LedgerService.get_account_balance(cash, date(2024, 2, 29)) == Decimal('20.00')
+    
+    def test_post_entries_all_or_nothing(self):
+        """Test one non-draft entry rejects the whole batch."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        posted = self._entry(company, cash, revenue, [Decimal('10.00')])
+        LedgerService.post_entry(posted)
+        draft = self._entry(company, cash, revenue, [Decimal('5.00')])
+        
+        with pytest.raises(ValueError, match=posted.entry_number):
+            LedgerService.post_entries([draft, posted])
+        
+        draft.refresh_from_db()
+        cash.refresh_from_db()
+        assert draft.status == 'draft'
+        assert cash.current_balance == Decimal('10.00')
+    
+    def test_reconcile_balances_fixes_drift(self, django_assert_max_num_queries):
+        """Test only drifted accounts are reported and rewritten."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        LedgerService.post_entry(self._entry(company, cash, revenue, [Decimal('40.00')]))
+        Account.objects.filter(pk=cash.pk).update(current_balance=Decimal('55.00'))
+        
+        with django_assert_max_num_queries(6):
+            report = PostingService.reconcile_balances(company.id)
+        
+        assert report['accounts_checked'] == 2
+        assert [row['account_code'] for row in report['drift']] == ['1000']
+        assert report['drift'][0]['difference'] == '-15.00'
+        cash.refresh_from_db()
+        assert cash.current_balance == Decimal('40.00')
+    
+    def test_reconcile_balances_report_only(self):
+        """Test fix=False leaves balances untouched."""
+        company = CompanyFactory()
+        cash = AssetAccountFactory(company=company, code='1000')
+        Account.objects.filter(pk=cash.pk).update(current_balance=Decimal('5.00'))
+        
+        report = PostingService.reconcile_balances(company.id, fix=False)
+        
+        assert report['has_drift'] is True
+        assert report['fixed'] is False
+        cash.refresh_from_db()
+        assert cash.current_balance == Decimal('5.00')
+
+
+class TestLedgerPipelineService:
+    """Tests for the order-to-ledger pipeline."""
+    
+    def _chart(self, company):
+        return {
+            'receivable': AssetAccountFactory(company=company, code='1100'),
+            'revenue': RevenueAccountFactory(company=company, code='4000'),
+            'gst_payable': LiabilityAccountFactory(company=company, code='2100'),
+        }
+    
+    def test_confirm_enqueues_event(self):
+        """Test confirming an order queues ledger work instead of posting."""
+        order = OrderFactory(status='pending')
+        
+        order.confirm()
+        
+        assert LedgerEvent.objects.filter(
+            reference_type='order', reference_id=order.id, processed_at__isnull=True,
+        ).count() == 1
+        assert not JournalEntry.objects.filter(reference_id=order.id).exists()
+    
+    def test_confirm_survives_broker_outage(self, django_capture_on_commit_callbacks):
+        """Test a failing drain schedule does not fail the committed confirm."""
+        from django.core.cache import cache
+        from apps.accounting.services.ledger_pipeline_service import DRAIN_SCHEDULED_KEY
+        from apps.accounting.tasks import process_ledger_events
+        
+        cache.delete(DRAIN_SCHEDULED_KEY)
+        order = OrderFactory(status='pending')
+        
+        with patch.object(process_ledger_events, 'apply_async', side_effect=ConnectionError("broker down")) as apply_async:
+            with django_capture_on_commit_callbacks(execute=True):
+                order.confirm()
+        
+        apply_async.assert_called_once()
+        order.refresh_from_db()
+        assert order.status == 'confirmed'
+        assert LedgerEvent.objects.filter(reference_id=order.id, processed_at__isnull=True).count() == 1
+    
+    def test_drain_creates_balanced_entries(self):
+        """Test a drained batch bulk-creates one entry per order."""
+        company = CompanyFactory()
+        chart = self._chart(company)
+        orders = [OrderFactory(company=company, status='pending') for _ in range(3)]
+        for order in orders:
+            order.confirm()
+        
+        result = LedgerPipelineService.drain_events()
+        
+        assert result == {'processed': 3, 'failed': 0}
+        entries = JournalEntry.objects.filter(reference_type='order', company=company)
+        assert entries.count() == 3
+        entry = entries.get(reference_id=orders[0].id)
+        assert entry.total_debit == entry.total_credit == Decimal('114.45')
+        assert entry.lines.get(account=chart['revenue']).credit_amount == Decimal('105.00')
+        assert entry.lines.get(account=chart['gst_payable']).credit_amount == Decimal('9.45')
+        assert not LedgerEvent.objects.filter(processed_at__isnull=True).exists()
+    
+    def test_replay_is_idempotent(self):
+        """Test replayed events do not create a second entry."""
+        company = CompanyFactory()
+        self._chart(company)
+        order = OrderFactory(company=company, status='pending')
+        order.confirm()
+        LedgerPipelineService.drain_events()
+        
+        LedgerPipelineService.enqueue(company.id, 'order', order.id)
+        LedgerPipelineService.enqueue(company.id, 'order', order.id)
+        LedgerPipelineService.drain_events()
+        
+        assert JournalEntry.objects.filter(reference_id=order.id).count() == 1
+    
+    def test_cancel_voids_posted_entry(self):
+        """Test cancelling an order voids its entry and reverses balances."""
+        company = CompanyFactory()
+        chart = self._chart(company)
+        order = OrderFactory(company=company, status='pending')
+        order.confirm()
+        LedgerPipelineService.drain_events()
+        entry = JournalEntry.objects.get(reference_id=order.id)
+        LedgerService.post_entry(entry)
+        
+        order.cancel(reason='Customer request')
+        LedgerPipelineService.drain_events()
+        
+        entry.refresh_from_db()
+        chart['receivable'].refresh_from_db()
+        assert entry.status == 'voided'
+        assert chart['receivable'].current_balance == Decimal('0.00')
+    
+    def test_missing_chart_records_failure(self):
+        """Test orders of a company without the chart are retried later."""
+        order = OrderFactory(status='pending')
+        order.confirm()
+        
+        result = LedgerPipelineService.drain_events()
+        
+        assert result == {'processed': 0, 'failed': 1}
+        event = LedgerEvent.objects.get(reference_id=order.id)
+        assert event.processed_at is None
+        assert event.attempts == 1
+        assert 'Required account not found' in event.last_error
+    
+    def test_batch_error_charges_only_failing_event(self):
+        """Test an exception in a batch is retried per event before charging attempts."""
+        company = CompanyFactory()
+        self._chart(company)
+        orders = [OrderFactory(company=company, status='pending') for _ in range(3)]
+        for order in orders:
+            order.confirm()
+        bad_order = orders[1]
+        create_entries = LedgerPipelineService._create_order_entries
+        
+        def failing_create(batch):
+            if any(order.id == bad_order.id for order in batch):
+                raise RuntimeError("entry insert failed")
+            return create_entries(batch)
+        
+        with patch.object(LedgerPipelineService, '_create_order_entries', side_effect=failing_create):
+            result = LedgerPipelineService.drain_events()
+        
+        assert result == {'processed': 2, 'failed': 1}
+        assert JournalEntry.objects.filter(reference_type='order', company=company).count() == 2
+        assert LedgerEvent.objects.get(reference_id=bad_order.id).attempts == 1
+        for order in (orders[0], orders[2]):
+            event = LedgerEvent.objects.get(reference_id=order.id)
+            assert event.processed_at is not None
+            assert event.attempts == 0
+
+
+class TestFinancialReportService:
+    """Tests for the single-query financial report engine."""
+    
+    def _post(self, company, debit_account, credit_account, amount, entry_date):
+        entry = LedgerService.create_journal_entry(
+            company=company,
+            entry_date=entry_date,
+            lines=[
+                {'account_id': debit_account.id, 'debit_amount': amount},
+                {'account_id': credit_account.id, 'credit_amount': amount},
+            ],
+        )
+        LedgerService.post_entry(entry)
+    
+    @pytest.fixture
+    def ledger(self):
+        company = CompanyFactory()
+        accounts = {
+            'assets': AssetAccountFactory(company=company, code='1000'),
+            'bank': AssetAccountFactory(company=company, code='1010'),
+            'capital': EquityAccountFactory(company=company, code='3000'),
+            'revenue': RevenueAccountFactory(company=company, code='4000'),
+            'expense': ExpenseAccountFactory(company=company, code='6000'),
+        }
+        accounts['bank'].parent = accounts['assets']
+        accounts['bank'].save()
+        
+        self._post(company, accounts['bank'], accounts['capital'], Decimal('1000.00'), date(2023, 1, 2))
+        self._post(company, accounts['bank'], accounts['revenue'], Decimal('300.00'), date(2023, 6, 1))
+        self._post(company, accounts['bank'], accounts['revenue'], Decimal('500.00'), date(2024, 6, 1))
+        self._post(company, accounts['expense'], accounts['bank'], Decimal('200.00'), date(2024, 7, 1))
+        return company, accounts
+    
+    def test_reports_are_single_query(self, ledger, django_assert_num_queries):
+        """Test comparative reports cost one query."""
+        company, _ = ledger
+        periods = FinancialReportService.comparative_periods(date(2024, 12, 31), compare_years=2)
+        
+        with django_assert_num_queries(1):
+            FinancialReportService.balance_sheet(company, periods)
+        with django_assert_num_queries(1):
+            FinancialReportService.profit_and_loss(company, periods)
+        with django_assert_num_queries(1):
+            FinancialReportService.trial_balance(company, periods)
+    
+    def test_balance_sheet_rolls_up_and_balances(self, ledger):
+        """Test parent accounts include children and columns balance."""
+        company, accounts = ledger
+        periods = FinancialReportService.comparative_periods(date(2024, 12, 31), compare_years=1)
+        
+        report = FinancialReportService.balance_sheet(company, periods)
+        
+        parent = report['assets'][0]
+        assert parent['account_id'] == accounts['assets'].id
+        assert parent['total_closing'] == [Decimal('1600.00'), Decimal('1300.00')]
+        assert report['assets'][1]['depth'] == 1
+        assert report['totals']['assets'] == report['totals']['liabilities_and_equity']
+        assert report['totals']['current_earnings'] == [Decimal('600.00'), Decimal('300.00')]
+    
+    def test_profit_and_loss_periods(self, ledger):
+        """Test P&L covers each period's activity only."""
+        company, _ = ledger
+        periods = FinancialReportService.comparative_periods(date(2024, 12, 31), compare_years=1)
+        
+        report = FinancialReportService.profit_and_loss(company, periods)
+        
+        assert report['totals']['revenue'] == [Decimal('500.00'), Decimal('300.00')]
+        assert report['totals']['expenses'] == [Decimal('200.00'), Decimal('0.00')]
+        assert report['totals']['net_profit'] == [Decimal('300.00'), Decimal('300.00')]
+    
+    def test_profit_and_loss_start_without_end(self, ledger):
+        """Test a start date without an end date still bounds P&L activity."""
+        company, _ = ledger
+        periods = FinancialReportService.comparative_periods(None, start=date(2024, 1, 1))
+        
+        report = FinancialReportService.profit_and_loss(company, periods)
+        
+        assert report['periods'] == ['2024-01-01 onwards']
+        assert report['totals']['revenue'] == [Decimal('500.00')]
+        assert report['totals']['expenses'] == [Decimal('200.00')]
+    
+    def test_trial_balance_matches_ledger_service(self, ledger):
+        """Test the engine agrees with the as-of trial balance."""
+        company, _ = ledger
+        as_of = date(2024, 6, 30)
+        
+        report = FinancialReportService.trial_balance(company, [ReportPeriod(end=as_of)])
+        legacy = LedgerService.get_trial_balance(company, as_of)
+        
+        assert report['totals']['debit'] == [legacy[-1]['debit']]
+        assert report['totals']['credit'] == [legacy[-1]['credit']]
+        assert len(report['lines']) == len(legacy) - 1
+
+
+class TestLedgerExportService:
+    """Tests for the streaming general ledger export."""
+    
+    @pytest.fixture
+    def ledger(self):
+        company = CompanyFactory()
+        bank = AssetAccountFactory(company=company, code='1010')
+        revenue = RevenueAccountFactory(company=company, code='4000')
+        expense = ExpenseAccountFactory(company=company, code='6000')
+        
+        for debit_account, credit_account, amount, entry_date, reference_type in (
+            (bank, revenue, Decimal('300.00'), date(2024, 1, 15), 'order'),
+            (expense, bank, Decimal('120.00'), date(2024, 2, 10), 'manual'),
+            (bank, revenue, Decimal('50.00'), date(2024, 3, 5), 'order'),
+        ):
+            entry = LedgerService.create_journal_entry(
+                company=company,
+                entry_date=entry_date,
+                reference_type=reference_type,
+                lines=[
+                    {'account_id': debit_account.id, 'debit_amount': amount},
+                    {'account_id': credit_account.id, 'credit_amount': amount},
+                ],
+            )
+            LedgerService.post_entry(entry)
+        
+        # Drafts are excluded by default
+        LedgerService.create_journal_entry(
+            company=company,
+            entry_date=date(2024, 1, 20),
+            lines=[
+                {'account_id': bank.id, 'debit_amount': Decimal('10.00')},
+                {'account_id': revenue.id, 'credit_amount': Decimal('10.00')},
+            ],
+        )
+        return company
+    
+    def test_csv_export(self, ledger):
+        """Test CSV has a header and one row per posted line in date order."""
+        rows = list(csv.DictReader(''.join(LedgerExportService.stream(ledger, 'csv')).splitlines()))
+        
+        assert len(rows) == 6
+        assert [row['entry_date'] for row in rows[::2]] == ['2024-01-15', '2024-02-10', '2024-03-05']
+        assert {row['status'] for row in rows} == {'posted'}
+        assert rows[0]['account_code'] == '1010'
+        assert rows[0]['debit'] == '300.00'
+    
+    def test_jsonl_export_filters(self, ledger):
+        """Test period, account and reference type filters."""
+        chunks = LedgerExportService.stream(
+            ledger,
+            'jsonl',
+            start_date=date(2024, 1, 1),
+            end_date=date(2024, 2, 29),
+            account_codes=['4000'],
+            reference_type='order',
+        )
+        rows = [json.loads(chunk) for chunk in chunks]
+        
+        assert len(rows) == 1
+        assert rows[0]['account_code'] == '4000'
+        assert rows[0]['credit'] == '300.00'
+        assert rows[0]['reference_type'] == 'order'
+    
+    def test_export_query_count_is_constant(self, ledger, django_assert_max_num_queries):
+        """Test rows are read in chunks, not one query per entry."""
+        with django_assert_max_num_queries(2):
+            list(LedgerExportService.stream(ledger, 'csv', chunk_size=2, status=None))
+    
+    def test_unsupported_format(self, ledger):
+        """Test an unknown format is rejected before querying."""
+        with pytest.raises(ValueError, match="Unsupported export format"):
+            LedgerExportService.stream(ledger, 'xlsx')
+
+
 class TestInvoiceService:
     """Tests for InvoiceService."""
     
@@ -232,6 +720,17 @@ class TestInvoiceService:
         invoice.refresh_from_db()
         assert invoice.status == 'sent'
     
+    def test_failed_create_does_not_burn_invoice_number(self):
+        """Test the number is allocated in the insert's transaction."""
+        company = CompanyFactory()
+        
+        with patch.object(Invoice.objects, 'create', side_effect=ValueError("insert failed")):
+            with pytest.raises(ValueError):
+                InvoiceService.create_manual(company, subtotal=Decimal('100.00'))
+        
+        invoice = InvoiceService.create_manual(company, subtotal=Decimal('100.00'))
+        assert invoice.invoice_number.endswith('-0001')
+    
     def test_check_overdue_invoices(self):
         """Test checking and updating overdue invoices."""
         company = CompanyFactory()
@@ -251,6 +750,34 @@ class TestInvoiceService:
         assert overdue_invoice.status == 'overdue'
         assert count == 1
     
+    def test_mark_overdue_invoices_all_companies(self, django_assert_num_queries):
+        """Test one statement marks every company's overdue invoices and audits them."""
+        from apps.compliance.models import AuditLog
+        
+        company_a = CompanyFactory()
+        company_b = CompanyFactory()
+        overdue = [
+            InvoiceFactory(company=company, status='sent', due_date=date.today() - timedelta(days=3))
+            for company in (company_a, company_a, company_b)
+        ]
+        not_due = InvoiceFactory(company=company_a, status='sent', due_date=date.today() + timedelta(days=3))
+        draft = InvoiceFactory(company=company_b, status='draft', due_date=date.today() - timedelta(days=3))
+        
+        # UPDATE ... RETURNING + audit bulk insert (inside the savepoint pair)
+        with django_assert_num_queries(4):
+            marked = InvoiceService.mark_overdue_invoices()
+        
+        assert set(marked[company_a.id]) == {overdue[0].id, overdue[1].id}
+        assert marked[company_b.id] == [overdue[2].id]
+        not_due.refresh_from_db()
+        draft.refresh_from_db()
+        assert not_due.status == 'sent'
+        assert draft.status == 'draft'
+        
+        logs = AuditLog.objects.filter(resource_type='accounting.invoice', action='UPDATE')
+        assert {log.resource_id for log in logs} == {invoice.id for invoice in overdue}
+        assert all(log.new_values == {'status': 'overdue'} for log in logs)
+    
     def test_get_aging_summary(self):
         """Test aging summary generation."""
         company = CompanyFactory()
@@ -278,6 +805,93 @@ class TestInvoiceService:
         assert aging['current'] == Decimal('100.00')
         assert aging['1_30'] == Decimal('200.00')
         assert aging['total'] == Decimal('300.00')
+    
+    def test_get_aging_summary_single_query(self, django_assert_num_queries):
+        """Test aging is one aggregate and ignores paid amounts and drafts."""
+        company = CompanyFactory()
+        InvoiceFactory(
+            company=company,
+            status='overdue',
+            due_date=date.today() - timedelta(days=45),
+            total_amount=Decimal('300.00'),
+            amount_paid=Decimal('100.00'),
+        )
+        InvoiceFactory(
+            company=company,
+            status='draft',
+            due_date=date.today() - timedelta(days=120),
+            total_amount=Decimal('999.00'),
+        )
+        
+        with django_assert_num_queries(1):
+            aging = InvoiceService.get_aging_summary(company)
+        
+        assert aging['31_60'] == Decimal('200.00')
+        assert aging['90_plus'] == Decimal('0.00')
+        assert aging['total'] == Decimal('200.00')
+    
+    def test_get_aging_by_customer(self):
+        """Test aging drill-down groups by customer."""
+        company = CompanyFactory()
+        customer = CustomerFactory(company=company)
+        for days in (10, 100):
+            InvoiceFactory(
+                company=company,
+                customer=customer,
+                status='sent',
+                due_date=date.today() - timedelta(days=days),
+                total_amount=Decimal('50.00'),
+                amount_paid=Decimal('0.00'),
+            )
+        
+        rows = InvoiceService.get_aging_by_customer(company)
+        
+        assert len(rows) == 1
+        assert rows[0]['customer_id'] == customer.id
+        assert rows[0]['days_1_30'] == Decimal('50.00')
+        assert rows[0]['days_90_plus'] == Decimal('50.00')
+        assert rows[0]['invoice_count'] == 2
+    
+    def test_snapshot_aging_upserts(self):
+        """Test snapshots are written per company and replaced on re-run."""
+        company = CompanyFactory()
+        invoice = InvoiceFactory(
+            company=company,
+            status='sent',
+            due_date=date.today(),
+            total_amount=Decimal('80.00'),
+            amount_paid=Decimal('0.00'),
+        )
+        InvoiceService.snapshot_aging()
+        Invoice.objects.filter(pk=invoice.pk).update(amount_paid=Decimal('30.00'))
+        
+        InvoiceService.snapshot_aging()
+        
+        snapshot = ARAgingSnapshot.objects.get(company=company, snapshot_date=date.today())
+        assert snapshot.current == Decimal('50.00')
+        assert snapshot.invoice_count == 1
+        assert InvoiceService.get_aging_history(company) == [snapshot]
+    
+    def test_snapshot_aging_writes_zero_rows(self):
+        """Test companies with nothing outstanding get a zero row on re-run."""
+        company = CompanyFactory()
+        invoice = InvoiceFactory(
+            company=company,
+            status='sent',
+            due_date=date.today(),
+            total_amount=Decimal('80.00'),
+            amount_paid=Decimal('0.00'),
+        )
+        idle_company = CompanyFactory()
+        InvoiceService.snapshot_aging()
+        Invoice.objects.filter(pk=invoice.pk).update(status='paid', amount_paid=Decimal('80.00'))
+        
+        InvoiceService.snapshot_aging()
+        
+        for each in (company, idle_company):
+            snapshot = ARAgingSnapshot.objects.get(company=each, snapshot_date=date.today())
+            assert snapshot.total == Decimal('0.00')
+            assert snapshot.invoice_count == 0
 
 
 class TestPaymentService:
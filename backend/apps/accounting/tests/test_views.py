@@ -13,11 +13,12 @@ from rest_framework.test import APIClient
 from apps.accounting.models import Account, JournalEntry, Invoice, Payment
 from apps.accounting.tests.factories import (
     AccountFactory, AssetAccountFactory, RevenueAccountFactory,
-    JournalEntryFactory,
+    JournalEntryFactory, JournalLineFactory,
     InvoiceFactory,
     PaymentFactory,
 )
 from apps.accounts.tests.factories import CompanyFactory, UserFactory
+from core.testing import assert_constant_queries
 
 
 pytestmark = pytest.mark.django_db
@@ -83,6 +84,26 @@ class TestAccountViewSet:
         # Root should have children
         roots = response.data
         assert len(roots) >= 1
+    
+    def test_tree_action_rollup(self, api_client, django_assert_max_num_queries):
+        """Test rolled-up tree costs the same few queries at any depth."""
+        company = api_client.user.company
+        parent = AccountFactory(company=company, code='1000', current_balance=Decimal('1.00'))
+        for level in range(1, 8):
+            parent = AccountFactory(
+                company=company,
+                code=f'1{level}00',
+                parent=parent,
+                current_balance=Decimal('1.00'),
+            )
+        
+        # Chart load and balances (plus auth)
+        with django_assert_max_num_queries(4):
+            response = api_client.get('/api/v1/accounting/accounts/tree/?rollup=true')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data[0]['total_balance'] == '8.00'
+        assert 'total_balance' not in api_client.get('/api/v1/accounting/accounts/tree/').data[0]
 
 
 class TestJournalEntryViewSet:
@@ -105,6 +126,20 @@ class TestJournalEntryViewSet:
         
         assert response.status_code == status.HTTP_200_OK
     
+    @pytest.mark.slow
+    def test_list_query_count_is_constant(self, api_client):
+        """Test lines, accounts and creators are not queried per entry."""
+        company = api_client.user.company
+        account = AccountFactory(company=company)
+        
+        def create_entries(count):
+            for entry in JournalEntryFactory.create_batch(count, company=company, created_by=api_client.user):
+                JournalLineFactory(journal_entry=entry, account=account)
+        
+        assert_constant_queries(
+            api_client, '/api/v1/accounting/journals/?pagination=keyset&page_size=200', create_entries
+        )
+    
     def test_create_journal_entry(self, api_client):
         """Test creating journal entry via API."""
         debit_account = AssetAccountFactory(
@@ -218,6 +253,27 @@ class TestInvoiceViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert 'current' in response.data
         assert 'total' in response.data
+    
+    def test_aging_by_customer_action(self, api_client):
+        """Test per-customer aging drill-down."""
+        InvoiceFactory(
+            company=api_client.user.company,
+            status='sent',
+            total_amount=Decimal('75.00'),
+            amount_paid=Decimal('0.00'),
+        )
+        
+        response = api_client.get('/api/v1/accounting/invoices/aging-by-customer/')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert Decimal(response.data[0]['total']) == Decimal('75.00')
+    
+    def test_aging_history_action(self, api_client):
+        """Test aging history reads snapshots."""
+        response = api_client.get('/api/v1/accounting/invoices/aging-history/?days=30')
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data == []
 
 
 class TestPaymentViewSet:
@@ -326,3 +382,59 @@ class TestGSTF5ViewSet:
         
         assert response.status_code == status.HTTP_200_OK
         assert 'is_valid' in response.data
+
+
+class TestReportViewSet:
+    """Tests for ReportViewSet."""
+    
+    @pytest.fixture
+    def api_client(self):
+        """Create authenticated API client."""
+        user = UserFactory()
+        client = APIClient()
+        client.force_authenticate(user=user)
+        client.user = user
+        return client
+    
+    def test_trial_balance_with_comparatives(self, api_client):
+        """Test the trial balance has a column pair per compared year."""
+        response = api_client.get(
+            '/api/v1/accounting/reports/trial-balance/?as_of_date=2024-12-31&compare_years=1'
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['periods'] == ['2024-12-31', '2023-12-31']
+        assert len(response.data['totals']['debit']) == 2
+    
+    def test_trial_balance_comparatives_need_as_of_date(self, api_client):
+        """Test compare_years without as_of_date is rejected."""
+        response = api_client.get('/api/v1/accounting/reports/trial-balance/?compare_years=1')
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+    
+    def test_general_ledger_export(self, api_client):
+        """Test general ledger streams as a CSV attachment."""
+        JournalEntryFactory(
+            company=api_client.user.company,
+            status='posted',
+            entry_date=date(2024, 3, 1),
+        )
+        
+        response = api_client.get(
+            '/api/v1/accounting/reports/general-ledger/?file_format=csv&start_date=2024-01-01'
+        )
+        
+        assert response.status_code == status.HTTP_200_OK
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv'
+        assert 'attachment' in response['Content-Disposition']
+        body = b''.join(response.streaming_content).decode()
+        assert body.startswith('entry_date,entry_number')
+    
+    def test_general_ledger_export_invalid_period(self, api_client):
+        """Test an inverted period is rejected."""
+        response = api_client.get(
+            '/api/v1/accounting/reports/general-ledger/?start_date=2024-12-31&end_date=2024-01-01'
+        )
+        
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
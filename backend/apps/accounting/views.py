@@ -5,11 +5,16 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
+from django.db.models import Sum
+from django.http import StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from core.eager_loading import EagerLoadingMixin
 from core.permissions import IsCompanyMember
 
+from apps.accounting.chart_cache import get_chart
 from apps.accounting.models import Account, JournalEntry, Invoice, Payment
 from apps.accounting.serializers import (
     AccountSerializer, AccountListSerializer, AccountTreeSerializer,
@@ -17,13 +22,19 @@ from apps.accounting.serializers import (
     InvoiceSerializer, InvoiceListSerializer,
     PaymentSerializer, PaymentListSerializer,
     GSTF5Serializer, GSTF5PrepareRequestSerializer,
-    TrialBalanceLineSerializer, AgingSummarySerializer,
+    TrialBalanceRequestSerializer, AgingSummarySerializer,
+    CustomerAgingSerializer, ARAgingSnapshotSerializer,
+    FinancialReportRequestSerializer, LedgerExportRequestSerializer,
 )
-from apps.accounting.services import LedgerService, InvoiceService, PaymentService
+from apps.accounting.services import (
+    LedgerService, InvoiceService, PaymentService, FinancialReportService,
+    LedgerExportService,
+)
+from apps.accounting.services.ledger_export_service import EXPORT_CONTENT_TYPES
 from apps.accounting.gst import GSTEngine
 
 
-class AccountViewSet(viewsets.ModelViewSet):
+class AccountViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Chart of Accounts.
     
@@ -33,7 +44,7 @@ class AccountViewSet(viewsets.ModelViewSet):
     - GET /accounts/{id}/ - Retrieve account
     - PUT /accounts/{id}/ - Update account
     - DELETE /accounts/{id}/ - Delete account
-    - GET /accounts/tree/ - Get hierarchical tree
+    - GET /accounts/tree/?rollup=true - Get hierarchical tree (with rolled-up balances)
     """
     
     permission_classes = [IsAuthenticated, IsCompanyMember]
@@ -63,31 +74,42 @@ class AccountViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def tree(self, request):
-        """Get hierarchical account tree."""
-        # Get root accounts (no parent)
-        roots = self.get_queryset().filter(
-            parent__isnull=True, is_active=True
+        """
+        Get hierarchical account tree.
+        
+        ?rollup=true adds total_balance: each account's balance plus
+        its descendants'.
+        """
+        company = request.user.company
+        roll_up = request.query_params.get('rollup', '').lower() in ('1', 'true', 'yes')
+        # Structure comes from the chart cache; balances from one query
+        balances = dict(
+            Account.objects.filter(company=company).values_list('id', 'current_balance')
         )
-        serializer = AccountTreeSerializer(roots, many=True)
+        tree = get_chart(company.id).tree_with_balances(balances, roll_up=roll_up)
+        serializer = AccountTreeSerializer(tree, many=True)
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
     def balances(self, request):
         """Get account balances summary."""
-        accounts = self.get_queryset().filter(is_active=True)
+        totals = Account.objects.filter(
+            company=request.user.company, is_active=True,
+        ).values('account_type').annotate(
+            total=Sum('current_balance'),
+        ).order_by()
         
         summary = {
-            'asset': sum(a.current_balance for a in accounts if a.account_type == 'asset'),
-            'liability': sum(a.current_balance for a in accounts if a.account_type == 'liability'),
-            'equity': sum(a.current_balance for a in accounts if a.account_type == 'equity'),
-            'revenue': sum(a.current_balance for a in accounts if a.account_type == 'revenue'),
-            'expense': sum(a.current_balance for a in accounts if a.account_type == 'expense'),
+            account_type: 0
+            for account_type in ('asset', 'liability', 'equity', 'revenue', 'expense')
         }
+        for row in totals:
+            summary[row['account_type']] = row['total']
         
         return Response(summary)
 
 
-class JournalEntryViewSet(viewsets.ModelViewSet):
+class JournalEntryViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Journal Entries.
     
@@ -173,7 +195,7 @@ class JournalEntryViewSet(viewsets.ModelViewSet):
             )
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Invoices.
     
@@ -185,6 +207,8 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     - POST /invoices/{id}/send/ - Mark as sent
     - POST /invoices/{id}/void/ - Void invoice
     - GET /invoices/aging/ - Aging summary
+    - GET /invoices/aging-by-customer/ - Aging per customer
+    - GET /invoices/aging-history/?days=90 - Daily aging snapshots
     """
     
     permission_classes = [IsAuthenticated, IsCompanyMember]
@@ -209,8 +233,9 @@ class InvoiceViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Set company and generate number on create."""
         company = self.request.user.company
-        invoice_number = Invoice.generate_invoice_number(company)
-        serializer.save(company=company, invoice_number=invoice_number)
+        with transaction.atomic():
+            invoice_number = Invoice.generate_invoice_number(company)
+            serializer.save(company=company, invoice_number=invoice_number)
     
     @action(detail=True, methods=['post'])
     def send(self, request, pk=None):
@@ -240,9 +265,32 @@ class InvoiceViewSet(viewsets.ModelViewSet):
         aging = InvoiceService.get_aging_summary(company)
         serializer = AgingSummarySerializer(aging)
         return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], url_path='aging-by-customer')
+    def aging_by_customer(self, request):
+        """Get accounts receivable aging per customer."""
+        company = request.user.company
+        customers = InvoiceService.get_aging_by_customer(company)
+        serializer = CustomerAgingSerializer(customers, many=True)
+        return Response(serializer.data)
+    
+    @action(detail=False, methods=['get'], url_path='aging-history')
+    def aging_history(self, request):
+        """Get daily aging snapshots for trend charts."""
+        try:
+            days = min(int(request.query_params.get('days', 90)), 730)
+        except ValueError:
+            return Response(
+                {'error': 'days must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        snapshots = InvoiceService.get_aging_history(request.user.company, days=days)
+        serializer = ARAgingSnapshotSerializer(snapshots, many=True)
+        return Response(serializer.data)
 
 
-class PaymentViewSet(viewsets.ModelViewSet):
+class PaymentViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Payments.
     
@@ -324,6 +372,7 @@ class GSTF5ViewSet(viewsets.ViewSet):
     
     Endpoints:
     - POST /gst/f5/prepare/ - Prepare F5 return data
+    - GET /gst/f5/preview/ - Running F5 totals from the accumulator
     - POST /gst/f5/validate/ - Validate F5 return
     """
     
@@ -343,6 +392,22 @@ class GSTF5ViewSet(viewsets.ViewSet):
         
         return Response(f5_return.to_dict())
     
+    @action(detail=False, methods=['get'])
+    def preview(self, request):
+        """Get running F5 totals for a quarter without recomputing."""
+        serializer = GSTF5PrepareRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        
+        from apps.compliance.services import F5AccumulatorService
+        
+        f5_return = F5AccumulatorService.get_preview(
+            request.user.company,
+            serializer.validated_data['quarter'],
+            serializer.validated_data['year'],
+        )
+        
+        return Response(f5_return.to_dict())
+    
     @action(detail=False, methods=['post'])
     def validate(self, request):
         """Validate GST F5 return data."""
@@ -381,22 +446,87 @@ class ReportViewSet(viewsets.ViewSet):
     ViewSet for accounting reports.
     
     Endpoints:
-    - GET /reports/trial-balance/ - Trial balance
+    - GET /reports/trial-balance/ - Trial balance (with comparatives)
+    - GET /reports/balance-sheet/ - Balance sheet (with comparatives)
+    - GET /reports/profit-and-loss/ - Profit and loss (with comparatives)
+    - GET /reports/general-ledger/ - Streamed general ledger (CSV or JSONL)
     """
     
     permission_classes = [IsAuthenticated, IsCompanyMember]
     
     @action(detail=False, methods=['get'], url_path='trial-balance')
     def trial_balance(self, request):
-        """Generate trial balance report."""
-        company = request.user.company
-        as_of_date = request.query_params.get('as_of_date')
+        """Generate trial balance as of as_of_date (with comparatives)."""
+        serializer = TrialBalanceRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
         
-        if as_of_date:
-            from datetime import datetime
-            as_of_date = datetime.strptime(as_of_date, '%Y-%m-%d').date()
+        periods = FinancialReportService.comparative_periods(
+            end=serializer.validated_data.get('as_of_date'),
+            compare_years=serializer.validated_data['compare_years'],
+        )
         
-        trial_balance = LedgerService.get_trial_balance(company, as_of_date)
-        serializer = TrialBalanceLineSerializer(trial_balance, many=True)
+        return Response(
+            FinancialReportService.trial_balance(request.user.company, periods)
+        )
+    
+    @action(detail=False, methods=['get'], url_path='balance-sheet')
+    def balance_sheet(self, request):
+        """Generate balance sheet as of end_date."""
+        serializer = FinancialReportRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
         
-        return Response(serializer.data)
+        periods = FinancialReportService.comparative_periods(
+            end=serializer.validated_data.get('end_date'),
+            compare_years=serializer.validated_data['compare_years'],
+        )
+        
+        return Response(
+            FinancialReportService.balance_sheet(request.user.company, periods)
+        )
+    
+    @action(detail=False, methods=['get'], url_path='profit-and-loss')
+    def profit_and_loss(self, request):
+        """Generate profit and loss for start_date..end_date."""
+        serializer = FinancialReportRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        
+        periods = FinancialReportService.comparative_periods(
+            end=serializer.validated_data.get('end_date'),
+            start=serializer.validated_data.get('start_date'),
+            compare_years=serializer.validated_data['compare_years'],
+        )
+        
+        return Response(
+            FinancialReportService.profit_and_loss(request.user.company, periods)
+        )
+    
+    @action(detail=False, methods=['get'], url_path='general-ledger')
+    def general_ledger(self, request):
+        """
+        Stream journal lines as CSV or JSONL.
+        
+        Query parameters: start_date, end_date, account (repeatable),
+        reference_type, status (default posted; 'all' for every status)
+        and file_format (csv or jsonl).
+        """
+        serializer = LedgerExportRequestSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        
+        data = serializer.validated_data
+        company = request.user.company
+        file_format = data['file_format']
+        filters = {
+            'start_date': data.get('start_date'),
+            'end_date': data.get('end_date'),
+            'account_codes': data.get('account'),
+            'reference_type': data.get('reference_type'),
+            'status': None if data['status'] == 'all' else data['status'],
+        }
+        
+        response = StreamingHttpResponse(
+            LedgerExportService.stream(company, file_format, **filters),
+            content_type=EXPORT_CONTENT_TYPES[file_format],
+        )
+        filename = LedgerExportService.filename(company, file_format, filters)
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
@@ -9,6 +9,7 @@ Provides serialization for:
 """
 from rest_framework import serializers
 from django.contrib.auth import authenticate
+from django.db.models import Count
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError as DjangoValidationError
 
@@ -39,9 +40,15 @@ class CompanySerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Count users in the list query."""
+        return queryset.annotate(users_total=Count('users', distinct=True))
+    
     def get_user_count(self, obj):
         """Get count of users in this company."""
-        return obj.users.count()
+        users_total = getattr(obj, 'users_total', None)
+        return obj.users.count() if users_total is None else users_total
     
     def validate_uen(self, value):
         """Validate Singapore UEN format."""
@@ -135,9 +142,15 @@ class UserSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'email', 'company', 'last_login', 'created_at', 'updated_at']
     
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Prefetch role assignments with their roles."""
+        return queryset.prefetch_related('user_roles__role')
+    
     def get_roles_list(self, obj):
         """Get list of role names."""
-        return list(obj.roles.values_list('name', flat=True))
+        # Reads prefetched user_roles when present
+        return sorted(user_role.role.name for user_role in obj.user_roles.all())
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -259,9 +272,15 @@ class RoleSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'is_system', 'created_at', 'updated_at']
     
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Count assignments in the list query."""
+        return queryset.annotate(user_roles_total=Count('user_roles', distinct=True))
+    
     def get_user_count(self, obj):
         """Get count of users with this role."""
-        return obj.user_roles.count()
+        user_roles_total = getattr(obj, 'user_roles_total', None)
+        return obj.user_roles.count() if user_roles_total is None else user_roles_total
 
 
 class UserRoleSerializer(serializers.ModelSerializer):
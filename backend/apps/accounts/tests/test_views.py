@@ -17,6 +17,7 @@ from apps.accounts.tests.factories import (
     CompanyFactory, UserFactory, SuperUserFactory,
     RoleFactory, UserRoleFactory
 )
+from core.testing import assert_constant_queries
 
 
 pytestmark = pytest.mark.django_db
@@ -187,6 +188,19 @@ class TestUserEndpoints:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data['results']) == 2
     
+    @pytest.mark.slow
+    def test_list_users_query_count_is_constant(self, api_client, authenticated_user):
+        """Test listing users does not query per user or per role."""
+        role = RoleFactory(company=authenticated_user.company)
+        
+        def create_users(count):
+            for user in UserFactory.create_batch(count, company=authenticated_user.company, password='!'):
+                UserRoleFactory(user=user, role=role)
+        
+        assert_constant_queries(
+            api_client, '/api/v1/accounts/users/?pagination=keyset&page_size=200', create_users
+        )
+    
     def test_get_user_profile(self, api_client, authenticated_user):
         """Test getting user profile."""
         response = api_client.get('/api/v1/accounts/users/me/')
@@ -306,6 +320,17 @@ class TestRoleEndpoints:
         
         assert response.status_code == status.HTTP_200_OK
     
+    @pytest.mark.slow
+    def test_list_roles_query_count_is_constant(self, api_client, authenticated_user):
+        """Test user_count does not query per role."""
+        def create_roles(count):
+            for role in RoleFactory.create_batch(count, company=authenticated_user.company):
+                UserRoleFactory(user=authenticated_user, role=role)
+        
+        assert_constant_queries(
+            api_client, '/api/v1/accounts/roles/?pagination=keyset&page_size=200', create_roles
+        )
+    
     def test_create_role(self, api_client, authenticated_user):
         """Test creating a new role."""
         response = api_client.post(
@@ -14,6 +14,7 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.views import APIView
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
+from core.eager_loading import EagerLoadingMixin
 from core.permissions import IsCompanyMember, IsAdminUser, HasAnyRole
 from .models import Company, User, Role, UserRole
 from .serializers import (
@@ -30,7 +31,7 @@ from .services import AuthService, UserService, CompanyService
 # COMPANY VIEWSET
 # =============================================================================
 
-class CompanyViewSet(viewsets.ModelViewSet):
+class CompanyViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Company CRUD operations.
     
@@ -88,7 +89,7 @@ class CompanyViewSet(viewsets.ModelViewSet):
 # USER VIEWSET
 # =============================================================================
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for User CRUD operations.
     
@@ -197,7 +198,7 @@ class UserViewSet(viewsets.ModelViewSet):
 # ROLE VIEWSET
 # =============================================================================
 
-class RoleViewSet(viewsets.ModelViewSet):
+class RoleViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for Role CRUD operations.
     
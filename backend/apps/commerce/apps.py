@@ -13,4 +13,4 @@ class CommerceConfig(AppConfig):
     
     def ready(self):
         """Import signals when app is ready."""
-        pass  # Will add signals in future if needed
+        import apps.commerce.signals  # noqa: F401
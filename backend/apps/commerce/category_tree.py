@@ -0,0 +1,102 @@
+"""
+Per-company category tree cache.
+
+The storefront tree is assembled in memory from one flat fetch of the
+company's active categories and cached (Django cache) as ready-to-render
+nodes. Category saves and deletes drop the cached tree after commit
+(see signals).
+
+Usage:
+    tree = get_tree(company.id)
+"""
+import logging
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+logger = logging.getLogger(__name__)
+
+# How long a company's tree stays cached
+CATEGORY_TREE_CACHE_TIMEOUT = getattr(settings, 'COMMERCE_CATEGORY_TREE_CACHE_TIMEOUT_SECONDS', 3600)
+
+# Category fields in each tree node (plus children)
+TREE_FIELDS = ('id', 'parent_id', 'name', 'slug', 'image_url', 'sort_order', 'is_active')
+
+
+def tree_key(company_id) -> str:
+    """Cache key of a company's category tree."""
+    return f"commerce:category_tree:{company_id}"
+
+
+def build_tree(rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Assemble nested nodes from flat category rows.
+    
+    Rows must be in display order (sort_order, name). Rows whose parent
+    is not among them (inactive or deleted) are left out with their
+    subtree.
+    
+    Args:
+        rows: Dicts with TREE_FIELDS
+    
+    Returns:
+        Top-level nodes, each with a children list
+    """
+    nodes = {}
+    for row in rows:
+        nodes[row['id']] = {
+            'id': str(row['id']),
+            'name': row['name'],
+            'slug': row['slug'],
+            'image_url': row['image_url'],
+            'sort_order': row['sort_order'],
+            'is_active': row['is_active'],
+            'children': [],
+            '_parent_id': row['parent_id'],
+        }
+    
+    roots = []
+    for node in nodes.values():
+        parent_id = node.pop('_parent_id')
+        if parent_id is None:
+            roots.append(node)
+        elif parent_id in nodes:
+            nodes[parent_id]['children'].append(node)
+    return roots
+
+
+def get_tree(company_id) -> List[Dict[str, Any]]:
+    """
+    Get a company's active category tree.
+    
+    Args:
+        company_id: Company UUID
+    
+    Returns:
+        Top-level nodes with nested children (same shape as
+        CategoryTreeSerializer)
+    """
+    key = tree_key(company_id)
+    tree = cache.get(key)
+    if tree is None:
+        from apps.commerce.models import Category
+        
+        tree = build_tree(
+            Category.objects.filter(company_id=company_id, is_active=True)
+            .order_by('sort_order', 'name')
+            .values(*TREE_FIELDS)
+        )
+        cache.set(key, tree, CATEGORY_TREE_CACHE_TIMEOUT)
+        logger.debug(f"Built category tree for company {company_id}")
+    return tree
+
+
+def invalidate_tree(company_id) -> None:
+    """
+    Drop a company's cached tree.
+    
+    Call after the Category change has committed.
+    """
+    cache.delete(tree_key(company_id))
@@ -0,0 +1,46 @@
+from django.db import migrations, models
+
+
+def populate_paths(apps, schema_editor):
+    """Compute path and depth for existing categories from parent."""
+    Category = apps.get_model('commerce', 'Category')
+    
+    rows = list(Category.objects.values_list('id', 'parent_id'))
+    children = {}
+    for category_id, parent_id in rows:
+        children.setdefault(parent_id, []).append(category_id)
+    
+    updated = []
+    pending = [(category_id, '') for category_id in children.get(None, [])]
+    while pending:
+        category_id, parent_path = pending.pop()
+        path = f"{parent_path}{category_id.hex}/"
+        updated.append(Category(pk=category_id, path=path, depth=path.count('/') - 1))
+        pending.extend((child_id, path) for child_id in children.get(category_id, []))
+    
+    Category.objects.bulk_update(updated, ['path', 'depth'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0002_models'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='path',
+            field=models.CharField(default='', editable=False, help_text="Ancestor and own ids, root first (e.g. 'ab12.../cd34.../')", max_length=1000),
+        ),
+        migrations.AddField(
+            model_name='category',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Depth in the hierarchy (0 for top-level)'),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(fields=['path'], name='categories_path_idx', opclasses=['varchar_pattern_ops']),
+        ),
+    ]
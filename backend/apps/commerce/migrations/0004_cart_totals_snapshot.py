@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('commerce', '0003_category_path'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='totals_snapshot',
+            field=models.JSONField(blank=True, default=dict, editable=False, help_text='Totals in cents as of totals_version'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='totals_version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text="Incremented whenever the cart's items change"),
+        ),
+    ]
@@ -5,6 +5,8 @@ Implements shopping cart functionality with:
 - Guest carts via session_id
 - 7-day default expiry
 - Cart statuses: active, merged, converted, abandoned
+- Totals snapshot, recomputed when items change, so reads don't
+  recalculate
 """
 from datetime import timedelta
 from decimal import Decimal
@@ -24,6 +26,20 @@ CART_STATUS_CHOICES = [
 ]
 
 
+# GST rates are expressed in basis points for integer-cent arithmetic
+RATE_SCALE = 10000
+
+
+def _gst_cents(line_cents: int, gst_rate: Decimal) -> int:
+    """GST on a line in cents, rounded half up (as GSTEngine.calculate)."""
+    basis_points = int(gst_rate * RATE_SCALE)
+    return (line_cents * basis_points * 2 + RATE_SCALE) // (RATE_SCALE * 2)
+
+
+def _cents_to_amount(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
 def default_cart_expiry():
     """Default cart expiry: 7 days from now."""
     return timezone.now() + timedelta(days=7)
@@ -45,6 +61,8 @@ class Cart(SoftDeleteModel):
         session_id: Session ID for guest carts
         status: active, merged, converted, or abandoned
         expires_at: Automatic expiry timestamp
+        totals_snapshot: Totals as of totals_version (integer cents)
+        totals_version: Bumped on every item change
     """
     
     company = models.ForeignKey(
@@ -95,6 +113,20 @@ class Cart(SoftDeleteModel):
         help_text="When cart was converted to order"
     )
     
+    # Precomputed totals, see refresh_totals()
+    totals_snapshot = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text="Totals in cents as of totals_version"
+    )
+    
+    totals_version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="Incremented whenever the cart's items change"
+    )
+    
     class Meta:
         db_table = '"commerce"."carts"'
         verbose_name = 'Cart'
@@ -131,37 +163,117 @@ class Cart(SoftDeleteModel):
     @property
     def item_count(self) -> int:
         """Get total number of items (sum of quantities)."""
+        if self.has_current_totals:
+            return self.totals_snapshot['item_count']
         return sum(item.quantity for item in self.items.all())
     
     @property
     def unique_item_count(self) -> int:
         """Get number of distinct products in cart."""
+        if self.has_current_totals:
+            return self.totals_snapshot['unique_item_count']
         return self.items.count()
     
+    def _items_for_totals(self):
+        """Items with products, from the prefetch when there is one."""
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            return self.items.all()
+        return self.items.select_related('product')
+    
+    def _compute_totals(self, items=None) -> dict:
+        """Totals in integer cents, in one pass over the items."""
+        subtotal_cents = 0
+        gst_cents = 0
+        item_count = 0
+        unique_item_count = 0
+        
+        for item in self._items_for_totals() if items is None else items:
+            item_count += item.quantity
+            unique_item_count += 1
+            if item.is_saved_for_later:
+                continue
+            
+            line_cents = item.quantity * int(item.unit_price * 100)
+            subtotal_cents += line_cents
+            if item.product.gst_code == 'SR':
+                gst_cents += _gst_cents(line_cents, item.product.gst_rate)
+        
+        return {
+            'subtotal_cents': subtotal_cents,
+            'gst_cents': gst_cents,
+            'item_count': item_count,
+            'unique_item_count': unique_item_count,
+        }
+    
+    @staticmethod
+    def _totals_from_cents(snapshot: dict) -> dict:
+        subtotal_cents = snapshot['subtotal_cents']
+        gst_cents = snapshot['gst_cents']
+        return {
+            'subtotal': _cents_to_amount(subtotal_cents),
+            'gst_amount': _cents_to_amount(gst_cents),
+            'total': _cents_to_amount(subtotal_cents + gst_cents),
+            'item_count': snapshot['item_count'],
+        }
+    
     def calculate_totals(self) -> dict:
         """
-        Calculate cart totals including GST.
+        Calculate cart totals including GST from the items.
+        
+        GST is computed per line in integer cents (rounded half up) for
+        SR-coded products. Saved-for-later items count towards
+        item_count but not the amounts.
         
         Returns:
             Dict with subtotal, gst_amount, total, and item_count
         """
-        subtotal = Decimal('0.00')
-        gst_amount = Decimal('0.00')
+        return self._totals_from_cents(self._compute_totals())
+    
+    @property
+    def has_current_totals(self) -> bool:
+        """Check if the totals snapshot matches totals_version."""
+        return self.totals_snapshot.get('version') == self.totals_version
+    
+    def get_totals(self) -> dict:
+        """
+        Get cart totals from the snapshot.
         
-        for item in self.items.filter(is_saved_for_later=False):
-            line_total = item.line_total
-            subtotal += line_total
-            
-            # Calculate GST based on product's GST code
-            if item.product.gst_code == 'SR':
-                gst_amount += round(line_total * item.product.gst_rate, 2)
+        Carts whose snapshot predates the current version (e.g. carts
+        created before snapshots existed) are recomputed and stored once.
         
-        return {
-            'subtotal': subtotal,
-            'gst_amount': gst_amount,
-            'total': subtotal + gst_amount,
-            'item_count': self.item_count,
-        }
+        Returns:
+            Dict with subtotal, gst_amount, total, and item_count
+        """
+        if not self.has_current_totals:
+            self.snapshot_totals()
+            self.save(update_fields=['totals_snapshot'])
+        return self._totals_from_cents(self.totals_snapshot)
+    
+    def snapshot_totals(self, items=None):
+        """
+        Compute the totals snapshot for the current version (not saved).
+        
+        Args:
+            items: CartItems to total (default: the cart's items)
+        """
+        self.totals_snapshot = {**self._compute_totals(items), 'version': self.totals_version}
+    
+    def refresh_totals(self):
+        """
+        Recompute the totals snapshot after an item change.
+        
+        Locks the cart row so concurrent item changes store their
+        snapshots one after the other, each computed from the items
+        committed before it. Must run inside a transaction.
+        """
+        version = Cart.objects.select_for_update().values_list(
+            'totals_version', flat=True
+        ).get(pk=self.pk) + 1
+        
+        self.__dict__.get('_prefetched_objects_cache', {}).pop('items', None)
+        self.totals_version = version
+        self.snapshot_totals()
+        self.save(update_fields=['totals_snapshot', 'totals_version', 'updated_at'])
     
     def extend_expiry(self, days: int = 7):
         """
@@ -273,6 +385,14 @@ class CartItem(models.Model):
         """Calculate line total (quantity * unit_price)."""
         return self.quantity * self.unit_price
     
+    @property
+    def line_gst(self) -> Decimal:
+        """GST on the line total, as included in the cart totals."""
+        if self.product.gst_code != 'SR':
+            return Decimal('0.00')
+        line_cents = self.quantity * int(self.unit_price * 100)
+        return _cents_to_amount(_gst_cents(line_cents, self.product.gst_rate))
+    
     @property
     def effective_price(self) -> Decimal:
         """
@@ -290,7 +410,7 @@ class CartItem(models.Model):
         
         Args:
             new_quantity: New quantity (must be > 0)
-            
+        
         Raises:
             ValueError: If quantity <= 0
         """
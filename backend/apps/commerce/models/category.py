@@ -1,9 +1,18 @@
 """
 Category model for product categorization.
 
-Implements hierarchical categories with self-referential parent FK.
+Implements hierarchical categories with self-referential parent FK and
+a materialized path: each category stores the ids of its ancestors and
+itself (e.g. "<root hex>/<child hex>/"), so ancestor, descendant and
+breadcrumb reads are one query each. The path and depth are maintained
+on save; moving a category rewrites its subtree in one UPDATE.
 """
-from django.db import models
+import uuid
+from typing import Dict, List
+
+from django.db import models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Substr
 
 from core.models import SoftDeleteModel
 
@@ -24,6 +33,8 @@ class Category(SoftDeleteModel):
         image_url: Optional category image
         sort_order: Display ordering within parent
         is_active: Whether category is visible
+        path: Materialized path of ancestor ids and own id
+        depth: 0 for top-level, 1 for first-level child, etc.
     """
     
     company = models.ForeignKey(
@@ -87,6 +98,20 @@ class Category(SoftDeleteModel):
         help_text="Whether category is visible to customers"
     )
     
+    # Tree (maintained on save)
+    path = models.CharField(
+        max_length=1000,
+        editable=False,
+        default='',
+        help_text="Ancestor and own ids, root first (e.g. 'ab12.../cd34.../')"
+    )
+    
+    depth = models.PositiveSmallIntegerField(
+        editable=False,
+        default=0,
+        help_text="Depth in the hierarchy (0 for top-level)"
+    )
+    
     class Meta:
         db_table = '"commerce"."categories"'
         verbose_name = 'Category'
@@ -97,11 +122,103 @@ class Category(SoftDeleteModel):
             models.Index(fields=['company']),
             models.Index(fields=['parent']),
             models.Index(fields=['is_active']),
+            models.Index(
+                fields=['path'],
+                name='categories_path_idx',
+                opclasses=['varchar_pattern_ops'],
+            ),
         ]
     
     def __str__(self):
         return self.name
     
+    @staticmethod
+    def build_path(parent_path: str, category_id) -> str:
+        """Path of a category under a parent path ('' for top-level)."""
+        return f"{parent_path}{uuid.UUID(str(category_id)).hex}/"
+    
+    @property
+    def ancestor_ids(self) -> List[uuid.UUID]:
+        """Ancestor ids from root to immediate parent (read from path)."""
+        return [uuid.UUID(segment) for segment in self.path.split('/')[:-2]]
+    
+    def save(self, *args, **kwargs):
+        """Save, keeping path and depth in step with parent."""
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'parent' not in update_fields and self.path:
+            super().save(*args, **kwargs)
+            return
+        
+        old_path = self.path
+        parent_path = ''
+        if self.parent_id is not None:
+            parent_path = (
+                Category.all_objects.filter(pk=self.parent_id)
+                .values_list('path', flat=True).first()
+            ) or ''
+            if old_path and parent_path.startswith(old_path):
+                raise ValueError("A category cannot be moved under itself or its descendants")
+        
+        self.path = self.build_path(parent_path, self.pk)
+        self.depth = self.path.count('/') - 1
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | {'path', 'depth'}
+        
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if old_path and old_path != self.path:
+                self._move_subtree(old_path)
+    
+    def _move_subtree(self, old_path: str) -> None:
+        """Rewrite descendants' paths after this category moved from old_path."""
+        Category.all_objects.filter(
+            company_id=self.company_id,
+            path__startswith=old_path,
+        ).exclude(pk=self.pk).update(
+            path=Concat(Value(self.path), Substr('path', len(old_path) + 1)),
+            depth=F('depth') + (self.depth - (old_path.count('/') - 1)),
+        )
+    
+    def hard_delete(self, using=None, keep_parents=False):
+        """Permanently delete; children become top-level (SET_NULL)."""
+        with transaction.atomic():
+            super().hard_delete(using=using, keep_parents=keep_parents)
+            Category.rebuild_paths(self.company_id)
+    
+    @classmethod
+    def rebuild_paths(cls, company_id) -> int:
+        """
+        Recompute path and depth for a company's categories from parent.
+        
+        One flat fetch and one bulk update; used after bulk changes that
+        bypass save() (e.g. a parent deleted with SET_NULL).
+        
+        Returns:
+            Number of categories whose path changed
+        """
+        rows = list(
+            cls.all_objects.filter(company_id=company_id)
+            .values_list('id', 'parent_id', 'path')
+        )
+        children: Dict = {}
+        for category_id, parent_id, _ in rows:
+            children.setdefault(parent_id, []).append(category_id)
+        
+        paths: Dict = {}
+        pending = [(category_id, '') for category_id in children.get(None, [])]
+        while pending:
+            category_id, parent_path = pending.pop()
+            paths[category_id] = cls.build_path(parent_path, category_id)
+            pending.extend((child_id, paths[category_id]) for child_id in children.get(category_id, []))
+        
+        changed = [
+            cls(pk=category_id, path=paths[category_id], depth=paths[category_id].count('/') - 1)
+            for category_id, _, path in rows
+            if category_id in paths and paths[category_id] != path
+        ]
+        cls.all_objects.bulk_update(changed, ['path', 'depth'], batch_size=500)
+        return len(changed)
+    
     def get_ancestors(self):
         """
         Get all ancestor categories from parent to root.
@@ -109,24 +226,24 @@ class Category(SoftDeleteModel):
         Returns:
             List of Category objects from immediate parent to root
         """
-        ancestors = []
-        current = self.parent
-        while current is not None:
-            ancestors.append(current)
-            current = current.parent
-        return ancestors
+        ancestors = {
+            category.pk: category
+            for category in Category.objects.filter(pk__in=self.ancestor_ids)
+        }
+        return [ancestors[pk] for pk in reversed(self.ancestor_ids) if pk in ancestors]
     
     def get_descendants(self):
         """
         Get all descendant categories (children, grandchildren, etc).
         
         Returns:
-            QuerySet of all descendant Category objects
+            QuerySet of all descendant Category objects, in tree order
         """
-        descendants = list(self.children.all())
-        for child in self.children.all():
-            descendants.extend(child.get_descendants())
-        return descendants
+        return Category.objects.filter(
+            company_id=self.company_id,
+            path__startswith=self.path,
+            depth__gt=self.depth,
+        ).order_by('path')
     
     def get_breadcrumb_path(self):
         """
@@ -140,16 +257,6 @@ class Category(SoftDeleteModel):
         path.append(self)
         return path
     
-    @property
-    def depth(self) -> int:
-        """
-        Get depth level of this category in the hierarchy.
-        
-        Returns:
-            0 for top-level, 1 for first-level child, etc.
-        """
-        return len(self.get_ancestors())
-    
     @property
     def is_leaf(self) -> bool:
         """Check if this category has no children."""
@@ -10,7 +10,7 @@ Order implements:
 """
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from core.models import SoftDeleteModel
@@ -316,8 +316,12 @@ class Order(SoftDeleteModel):
         """
         if not self.can_transition_to('confirmed'):
             raise ValueError(f"Cannot confirm order in {self.status} status")
+        previous_status = self.status
         self.status = 'confirmed'
-        self.save(update_fields=['status', 'updated_at'])
+        with transaction.atomic():
+            self.save(update_fields=['status', 'updated_at'])
+            self._record_f5_transition(previous_status)
+            self._enqueue_ledger_sync()
     
     def process(self):
         """
@@ -379,11 +383,15 @@ class Order(SoftDeleteModel):
         """
         if not self.can_transition_to('cancelled'):
             raise ValueError(f"Cannot cancel order in {self.status} status")
+        previous_status = self.status
         self.status = 'cancelled'
         self.cancelled_at = timezone.now()
         if reason:
             self.internal_notes = f"{self.internal_notes}\nCancelled: {reason}".strip()
-        self.save(update_fields=['status', 'cancelled_at', 'internal_notes', 'updated_at'])
+        with transaction.atomic():
+            self.save(update_fields=['status', 'cancelled_at', 'internal_notes', 'updated_at'])
+            self._record_f5_transition(previous_status)
+            self._enqueue_ledger_sync()
     
     def mark_paid(self, payment_reference: str = ''):
         """
@@ -398,6 +406,24 @@ class Order(SoftDeleteModel):
             self.payment_reference = payment_reference
         self.save(update_fields=['payment_status', 'paid_at', 'payment_reference', 'updated_at'])
     
+    def save(self, *args, **kwargs):
+        """Save; orders created in an F5-reportable status are accumulated."""
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._record_f5_transition(previous_status='')
+    
+    def _record_f5_transition(self, previous_status: str):
+        """Update the quarter's F5 accumulator for a status change."""
+        from apps.compliance.services import F5AccumulatorService
+        F5AccumulatorService.record_order_status_change(self, previous_status)
+    
+    def _enqueue_ledger_sync(self):
+        """Queue journal entry creation/voiding for this order (after commit)."""
+        from apps.accounting.services import LedgerPipelineService
+        LedgerPipelineService.enqueue(self.company_id, 'order', self.pk)
+    
     def calculate_gst_reporting(self):
         """
         Calculate GST amounts for F5 reporting.
@@ -415,7 +441,11 @@ class Order(SoftDeleteModel):
         
         self.gst_box_1_amount = box_1
         self.gst_box_6_amount = box_6
-        self.save(update_fields=['gst_box_1_amount', 'gst_box_6_amount', 'updated_at'])
+        with transaction.atomic():
+            self.save(update_fields=['gst_box_1_amount', 'gst_box_6_amount', 'updated_at'])
+            
+            from apps.compliance.services import F5AccumulatorService
+            F5AccumulatorService.refresh_order_contribution(self)
     
     @property
     def is_paid(self) -> bool:
@@ -9,6 +9,7 @@ Implements serializers for all commerce models with:
 """
 from decimal import Decimal
 
+from django.db.models import Count
 from rest_framework import serializers
 
 from apps.commerce.models import (
@@ -46,10 +47,23 @@ class CategorySerializer(serializers.ModelSerializer):
             'created_at', 'updated_at',
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'depth']
+    
+    def validate_parent(self, parent):
+        """Reject moving a category under itself or its descendants."""
+        if parent is not None and self.instance is not None and self.instance.path:
+            if parent.path.startswith(self.instance.path):
+                raise serializers.ValidationError(
+                    "A category cannot be moved under itself or its descendants"
+                )
+        return parent
 
 
 class CategoryTreeSerializer(serializers.ModelSerializer):
-    """Recursive category serializer for tree structure."""
+    """
+    Serializer for the category tree.
+    
+    Serializes the node dicts built by category_tree.build_tree.
+    """
     
     children = serializers.SerializerMethodField()
     
@@ -61,9 +75,8 @@ class CategoryTreeSerializer(serializers.ModelSerializer):
         ]
     
     def get_children(self, obj):
-        """Recursively serialize children."""
-        children = obj.children.filter(is_active=True).order_by('sort_order', 'name')
-        return CategoryTreeSerializer(children, many=True).data
+        """Get nested children."""
+        return CategoryTreeSerializer(obj['children'], many=True).data
 
 
 # =============================================================================
@@ -297,8 +310,18 @@ class CartSerializer(serializers.ModelSerializer):
         ]
     
     def get_totals(self, obj):
-        """Calculate cart totals."""
-        return obj.calculate_totals()
+        """Get cart totals from the cart's snapshot."""
+        return obj.get_totals()
+
+
+class GuestCartSerializer(CartSerializer):
+    """Cart serializer for an unsaved guest cart, with its items in context['items']."""
+    
+    items = serializers.SerializerMethodField()
+    
+    def get_items(self, obj):
+        """Serialize the items passed in the context."""
+        return CartItemSerializer(self.context['items'], many=True, context=self.context).data
 
 
 class AddCartItemSerializer(serializers.Serializer):
@@ -353,8 +376,14 @@ class OrderListSerializer(serializers.ModelSerializer):
             'order_date',
         ]
     
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Count items in the list query."""
+        return queryset.annotate(items_total=Count('items'))
+    
     def get_item_count(self, obj):
-        return obj.items.count()
+        items_total = getattr(obj, 'items_total', None)
+        return obj.items.count() if items_total is None else items_total
 
 
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -3,7 +3,8 @@ Commerce services package.
 """
 from apps.commerce.services.product_service import ProductService
 from apps.commerce.services.cart_service import CartService
+from apps.commerce.services.guest_cart_store import GuestCartStore
 from apps.commerce.services.order_service import OrderService
 
 
-__all__ = ['ProductService', 'CartService', 'OrderService']
+__all__ = ['ProductService', 'CartService', 'GuestCartStore', 'OrderService']
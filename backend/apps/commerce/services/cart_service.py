@@ -4,13 +4,11 @@ Cart service for business logic.
 Handles:
 - Cart creation for guest/customer
 - Add/remove items with price snapshot
-- Cart totals calculation
-- Guest cart merge on login
+- Cart totals calculation (snapshot refreshed on item changes)
+- Guest cart merge on login (guest carts are kept in GuestCartStore)
 - Checkout to order
 """
-from decimal import Decimal
 from typing import Optional
-import uuid
 
 from django.db import transaction
 from django.utils import timezone
@@ -18,6 +16,8 @@ from django.utils import timezone
 from apps.commerce.models import (
     Cart, CartItem, Product, ProductVariant, Customer, Order, OrderItem
 )
+from apps.commerce.services.guest_cart_store import GuestCartStore
+from apps.commerce.services.order_service import OrderService
 
 
 class CartService:
@@ -125,10 +125,12 @@ class CartService:
         
         # Extend cart expiry on activity
         cart.extend_expiry()
+        cart.refresh_totals()
         
         return cart_item
     
     @staticmethod
+    @transaction.atomic
     def update_item_quantity(cart_item: CartItem, quantity: int) -> CartItem:
         """
         Update cart item quantity.
@@ -145,9 +147,11 @@ class CartService:
         """
         cart_item.update_quantity(quantity)
         cart_item.cart.extend_expiry()
+        cart_item.cart.refresh_totals()
         return cart_item
     
     @staticmethod
+    @transaction.atomic
     def remove_item(cart_item: CartItem) -> None:
         """
         Remove item from cart.
@@ -158,11 +162,14 @@ class CartService:
         cart = cart_item.cart
         cart_item.delete()
         cart.extend_expiry()
+        cart.refresh_totals()
     
     @staticmethod
     def calculate_totals(cart: Cart) -> dict:
         """
-        Calculate cart totals with GST.
+        Get cart totals with GST.
+        
+        Served from the cart's totals snapshot (see Cart.get_totals).
         
         Args:
             cart: Cart instance
@@ -170,7 +177,7 @@ class CartService:
         Returns:
             Dict with subtotal, gst_amount, total, item_count
         """
-        return cart.calculate_totals()
+        return cart.get_totals()
     
     @staticmethod
     @transaction.atomic
@@ -178,6 +185,9 @@ class CartService:
         """
         Merge guest cart into customer cart on login.
         
+        A guest cart in GuestCartStore is persisted first; otherwise an
+        active guest Cart row for the session is used.
+        
         Args:
             guest_session_id: Session ID of guest cart
             customer: Customer to merge into
@@ -185,7 +195,7 @@ class CartService:
         Returns:
             Customer cart with merged items, or None if no guest cart
         """
-        guest_cart = Cart.objects.filter(
+        guest_cart = GuestCartStore.persist_session(guest_session_id) or Cart.objects.filter(
             session_id=guest_session_id,
             status='active'
         ).first()
@@ -213,6 +223,8 @@ class CartService:
                 guest_item.cart = customer_cart
                 guest_item.save(update_fields=['cart', 'updated_at'])
         
+        customer_cart.refresh_totals()
+        
         # Mark guest cart as merged
         guest_cart.status = 'merged'
         guest_cart.save(update_fields=['status', 'updated_at'])
@@ -249,16 +261,17 @@ class CartService:
         if cart.is_expired:
             raise ValueError("Cart has expired")
         
-        active_items = cart.items.filter(is_saved_for_later=False)
-        if not active_items.exists():
+        active_items = list(
+            cart.items.filter(is_saved_for_later=False).select_related('product', 'variant')
+        )
+        if not active_items:
             raise ValueError("Cart is empty")
         
-        # Calculate totals
+        # Calculate totals from the items, not the snapshot, so the order
+        # matches the lines created below
         totals = cart.calculate_totals()
         
-        # Generate order number (using timestamp + random for now)
-        # TODO: Use core.sequences for proper order numbering
-        order_number = f"ORD-{timezone.now().strftime('%Y%m%d')}-{uuid.uuid4().hex[:8].upper()}"
+        order_number = OrderService.generate_order_number(cart.company)
         
         # Create order
         order = Order.objects.create(
@@ -279,12 +292,9 @@ class CartService:
         for cart_item in active_items:
             product = cart_item.product
             
-            # Calculate line GST
+            # Calculate line GST (same rounding as the cart totals)
             line_subtotal = cart_item.line_total
-            if product.gst_code == 'SR':
-                line_gst = round(line_subtotal * product.gst_rate, 2)
-            else:
-                line_gst = Decimal('0.00')
+            line_gst = cart_item.line_gst
             
             OrderItem.objects.create(
                 order=order,
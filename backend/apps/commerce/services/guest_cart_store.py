@@ -0,0 +1,311 @@
+"""
+Guest cart store.
+
+Guest carts live in the cache (Redis) instead of the carts tables: one
+entry per session holding the cart and its items, expiring with the
+cart (7 days after the last change). Reads and item changes on a guest
+cart never write to the database. A guest cart is persisted as a Cart
+with CartItems only when it is needed there: on checkout, or when it is
+merged into a customer's cart on login.
+
+Each change rewrites the session's entry (last write wins), which is
+safe because one session's cart requests come from one browser.
+
+Usage:
+    data = GuestCartStore.get_or_create(company.id, session_id)
+    GuestCartStore.add_item(data, product, quantity=2)
+    cart, items = GuestCartStore.to_cart(data)  # for GuestCartSerializer
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from apps.commerce.models import Cart, CartItem, Product, ProductVariant
+from apps.commerce.models.cart import default_cart_expiry
+
+
+logger = logging.getLogger(__name__)
+
+
+class GuestCartStore:
+    """
+    Cache-backed store for guest (session) carts.
+    
+    Carts are plain dicts (id, company_id, session_id, timestamps and
+    items keyed by item id) so they pickle into a single cache entry.
+    """
+    
+    @staticmethod
+    def key(session_id: str) -> str:
+        """Cache key of a session's guest cart."""
+        return f"commerce:guest_cart:{session_id}"
+    
+    @staticmethod
+    def load(session_id: str, company_id=None) -> Optional[Dict[str, Any]]:
+        """
+        Load a session's guest cart.
+        
+        Args:
+            session_id: Session key
+            company_id: If given, ignore a cart of another company
+        
+        Returns:
+            Cart dict, or None if the session has no live cart
+        """
+        data = cache.get(GuestCartStore.key(session_id))
+        if data is None or (company_id is not None and data['company_id'] != company_id):
+            return None
+        return data
+    
+    @staticmethod
+    def save(data: Dict[str, Any]) -> None:
+        """Store a guest cart, extending its expiry from now."""
+        now = timezone.now()
+        data['updated_at'] = now
+        data['expires_at'] = default_cart_expiry()
+        timeout = int((data['expires_at'] - now).total_seconds())
+        cache.set(GuestCartStore.key(data['session_id']), data, timeout)
+    
+    @staticmethod
+    def get_or_create(company_id, session_id: str) -> Dict[str, Any]:
+        """
+        Get a session's guest cart, creating an empty one if needed.
+        
+        Args:
+            company_id: Company UUID
+            session_id: Session key
+        
+        Returns:
+            Cart dict
+        """
+        data = GuestCartStore.load(session_id, company_id)
+        if data is None:
+            now = timezone.now()
+            data = {
+                'id': uuid.uuid4(),
+                'company_id': company_id,
+                'session_id': session_id,
+                'created_at': now,
+                'items': {},
+            }
+            GuestCartStore.save(data)
+        return data
+    
+    @staticmethod
+    def _to_item(cart: Cart, item_id: str, item: Dict[str, Any], product, variant) -> CartItem:
+        return CartItem(
+            id=uuid.UUID(item_id),
+            cart=cart,
+            product=product,
+            variant=variant,
+            quantity=item['quantity'],
+            unit_price=item['unit_price'],
+            is_saved_for_later=item['is_saved_for_later'],
+            created_at=item['created_at'],
+            updated_at=item['updated_at'],
+        )
+    
+    @staticmethod
+    def _cart(data: Dict[str, Any]) -> Cart:
+        return Cart(
+            id=data['id'],
+            company_id=data['company_id'],
+            session_id=data['session_id'],
+            status='active',
+            expires_at=data['expires_at'],
+            created_at=data['created_at'],
+            updated_at=data['updated_at'],
+        )
+    
+    @staticmethod
+    def _get_item(data: Dict[str, Any], item_id) -> Dict[str, Any]:
+        item = data['items'].get(str(item_id))
+        if item is None:
+            raise CartItem.DoesNotExist(f"Cart item {item_id} not found")
+        return item
+    
+    @staticmethod
+    def add_item(
+        data: Dict[str, Any],
+        product: Product,
+        variant: Optional[ProductVariant] = None,
+        quantity: int = 1
+    ) -> CartItem:
+        """
+        Add item to a guest cart with price snapshot.
+        
+        If item already exists, updates quantity.
+        
+        Args:
+            data: Guest cart dict
+            product: Product to add
+            variant: Optional variant
+            quantity: Quantity to add
+        
+        Returns:
+            Unsaved CartItem
+        """
+        variant_id = variant.id if variant else None
+        now = timezone.now()
+        
+        for item_id, item in data['items'].items():
+            if item['product_id'] == product.id and item['variant_id'] == variant_id:
+                item['quantity'] += quantity
+                item['updated_at'] = now
+                break
+        else:
+            item_id = str(uuid.uuid4())
+            item = data['items'][item_id] = {
+                'product_id': product.id,
+                'variant_id': variant_id,
+                'quantity': quantity,
+                'unit_price': variant.effective_price if variant else product.base_price,
+                'is_saved_for_later': False,
+                'created_at': now,
+                'updated_at': now,
+            }
+        
+        GuestCartStore.save(data)
+        return GuestCartStore._to_item(GuestCartStore._cart(data), item_id, item, product, variant)
+    
+    @staticmethod
+    def update_item_quantity(data: Dict[str, Any], item_id, quantity: int) -> CartItem:
+        """
+        Update a guest cart item's quantity.
+        
+        Args:
+            data: Guest cart dict
+            item_id: Cart item id
+            quantity: New quantity (must be > 0)
+        
+        Returns:
+            Unsaved CartItem
+        
+        Raises:
+            CartItem.DoesNotExist: If the cart has no such item
+            ValueError: If quantity <= 0
+        """
+        item = GuestCartStore._get_item(data, item_id)
+        if quantity <= 0:
+            raise ValueError("Quantity must be greater than 0")
+        item['quantity'] = quantity
+        item['updated_at'] = timezone.now()
+        GuestCartStore.save(data)
+        
+        product = Product.objects.get(id=item['product_id'])
+        variant = ProductVariant.objects.filter(id=item['variant_id']).first() if item['variant_id'] else None
+        return GuestCartStore._to_item(GuestCartStore._cart(data), str(item_id), item, product, variant)
+    
+    @staticmethod
+    def remove_item(data: Dict[str, Any], item_id) -> None:
+        """
+        Remove an item from a guest cart.
+        
+        Raises:
+            CartItem.DoesNotExist: If the cart has no such item
+        """
+        GuestCartStore._get_item(data, item_id)
+        del data['items'][str(item_id)]
+        GuestCartStore.save(data)
+    
+    @staticmethod
+    def _live_items(data: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any], Product, Optional[ProductVariant]]]:
+        """
+        Items whose product still exists, with their products and variants.
+        
+        Products and variants are read in one query each. An item whose
+        variant is gone keeps its price snapshot without the variant.
+        """
+        items = data['items']
+        products = Product.objects.in_bulk({item['product_id'] for item in items.values()})
+        variant_ids = {item['variant_id'] for item in items.values() if item['variant_id']}
+        variants = ProductVariant.objects.in_bulk(variant_ids) if variant_ids else {}
+        return [
+            (item_id, item, products[item['product_id']], variants.get(item['variant_id']))
+            for item_id, item in items.items()
+            if item['product_id'] in products
+        ]
+    
+    @staticmethod
+    def to_cart(data: Dict[str, Any]) -> Tuple[Cart, List[CartItem]]:
+        """
+        Build an unsaved Cart and its items for serialization.
+        
+        The totals snapshot is computed in memory from the items, so
+        serializing the cart with GuestCartSerializer does not query.
+        
+        Args:
+            data: Guest cart dict
+        
+        Returns:
+            Tuple of (unsaved Cart, unsaved CartItems)
+        """
+        cart = GuestCartStore._cart(data)
+        cart_items = [
+            GuestCartStore._to_item(cart, item_id, item, product, variant)
+            for item_id, item, product, variant in GuestCartStore._live_items(data)
+        ]
+        cart.snapshot_totals(cart_items)
+        return cart, cart_items
+    
+    @staticmethod
+    @transaction.atomic
+    def persist(data: Dict[str, Any]) -> Cart:
+        """
+        Save a guest cart to the carts tables.
+        
+        Items whose product has been deleted since they were added are
+        dropped, as they are from to_cart. The cache entry is dropped
+        once the transaction commits.
+        
+        Args:
+            data: Guest cart dict
+        
+        Returns:
+            Saved Cart (same id as the guest cart)
+        """
+        cart = Cart.objects.create(
+            id=data['id'],
+            company_id=data['company_id'],
+            session_id=data['session_id'],
+            expires_at=data['expires_at'],
+        )
+        cart_items = CartItem.objects.bulk_create([
+            CartItem(
+                id=uuid.UUID(item_id),
+                cart=cart,
+                product=product,
+                variant=variant,
+                quantity=item['quantity'],
+                unit_price=item['unit_price'],
+                is_saved_for_later=item['is_saved_for_later'],
+            )
+            for item_id, item, product, variant in GuestCartStore._live_items(data)
+        ])
+        cart.refresh_totals()
+        
+        key = GuestCartStore.key(data['session_id'])
+        transaction.on_commit(lambda: cache.delete(key))
+        logger.info(f"Persisted guest cart {cart.id} with {len(cart_items)} items")
+        return cart
+    
+    @staticmethod
+    def persist_session(session_id: str, company_id=None) -> Optional[Cart]:
+        """
+        Persist a session's guest cart, if it has one.
+        
+        Args:
+            session_id: Session key
+            company_id: If given, ignore a cart of another company
+        
+        Returns:
+            Saved Cart, or None if the session has no live cart
+        """
+        data = GuestCartStore.load(session_id, company_id)
+        if data is None:
+            return None
+        return GuestCartStore.persist(data)
@@ -8,12 +8,12 @@ Handles:
 - Order number generation
 """
 from decimal import Decimal
-import uuid
 
 from django.db import transaction
 from django.utils import timezone
 
 from apps.commerce.models import Order, OrderItem, Cart
+from core.sequences import next_number
 
 
 class OrderService:
@@ -166,6 +166,8 @@ class OrderService:
         Returns:
             Refunded Order instance
         """
+        previous_status = order.status
+        
         if items:
             # Partial refund - mark specific items
             refund_amount = Decimal('0.00')
@@ -184,6 +186,11 @@ class OrderService:
             order.internal_notes = f"{order.internal_notes}\nFull refund - {reason}".strip()
         
         order.save()
+        
+        from apps.compliance.services import F5AccumulatorService
+        F5AccumulatorService.record_order_status_change(order, previous_status)
+        if order.status != previous_status:
+            order._enqueue_ledger_sync()
         # TODO: Emit event for payment refund (Phase 5)
         return order
     
@@ -210,17 +217,18 @@ class OrderService:
         
         Format: ORD-{YYYYMMDD}-{SEQUENCE}
         
+        Uses the FAST core.sequences mode: numbers come from a block
+        reserved per worker, so they are unique but may skip.
+        
         Args:
             company: Company instance
             
         Returns:
             Generated order number string
-            
-        TODO: Use core.sequences for proper concurrent-safe numbering
         """
-        date_part = timezone.now().strftime('%Y%m%d')
-        random_part = uuid.uuid4().hex[:8].upper()
-        return f"ORD-{date_part}-{random_part}"
+        date_part = timezone.localdate().strftime('%Y%m%d')
+        sequence = next_number(company.id, 'order', period_key=date_part)
+        return f"ORD-{date_part}-{sequence:06d}"
     
     @staticmethod
     def get_orders_for_gst_period(
@@ -0,0 +1,25 @@
+"""
+Commerce signals.
+
+Drops the per-company category tree cache when categories change.
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.commerce.category_tree import invalidate_tree
+from apps.commerce.models import Category
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    """Drop the cached tree once the save commits."""
+    company_id = instance.company_id
+    transaction.on_commit(lambda: invalidate_tree(company_id))
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    """Drop the cached tree once the delete commits."""
+    company_id = instance.company_id
+    transaction.on_commit(lambda: invalidate_tree(company_id))
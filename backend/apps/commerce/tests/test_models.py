@@ -77,6 +77,66 @@ class TestCategoryModel:
         assert child.depth == 1
         assert grandchild.depth == 2
     
+    def test_materialized_path(self):
+        """Test path and depth are maintained on save."""
+        root = CategoryFactory()
+        child = CategoryFactory(company=root.company, parent=root)
+        
+        assert root.path == f"{root.id.hex}/"
+        assert child.path == f"{root.id.hex}/{child.id.hex}/"
+        assert child.ancestor_ids == [root.id]
+    
+    def test_single_query_reads(self, django_assert_num_queries):
+        """Test ancestors, descendants and breadcrumbs cost one query each."""
+        root = CategoryFactory()
+        level1 = CategoryFactory(company=root.company, parent=root)
+        level2 = CategoryFactory(company=root.company, parent=level1)
+        level3 = CategoryFactory(company=root.company, parent=level2)
+        CategoryFactory(company=root.company)  # unrelated root
+        
+        with django_assert_num_queries(1):
+            assert level3.get_ancestors() == [level2, level1, root]
+        with django_assert_num_queries(1):
+            assert list(root.get_descendants()) == [level1, level2, level3]
+        with django_assert_num_queries(1):
+            assert level3.get_breadcrumb_path() == [root, level1, level2, level3]
+    
+    def test_move_rewrites_subtree(self):
+        """Test moving a category updates its descendants' paths."""
+        root_a = CategoryFactory()
+        root_b = CategoryFactory(company=root_a.company)
+        child = CategoryFactory(company=root_a.company, parent=root_a)
+        grandchild = CategoryFactory(company=root_a.company, parent=child)
+        
+        child.parent = root_b
+        child.save()
+        grandchild.refresh_from_db()
+        
+        assert grandchild.path == f"{root_b.id.hex}/{child.id.hex}/{grandchild.id.hex}/"
+        assert grandchild.depth == 2
+        assert list(root_a.get_descendants()) == []
+    
+    def test_move_under_descendant_rejected(self):
+        """Test a category cannot become its own descendant."""
+        root = CategoryFactory()
+        child = CategoryFactory(company=root.company, parent=root)
+        
+        root.parent = child
+        with pytest.raises(ValueError):
+            root.save()
+    
+    def test_hard_delete_reroots_children(self):
+        """Test children of a hard-deleted category become top-level."""
+        root = CategoryFactory()
+        child = CategoryFactory(company=root.company, parent=root)
+        grandchild = CategoryFactory(company=root.company, parent=child)
+        
+        root.hard_delete()
+        grandchild.refresh_from_db()
+        
+        assert grandchild.path == f"{child.id.hex}/{grandchild.id.hex}/"
+        assert grandchild.depth == 1
+    
     def test_slug_uniqueness_per_company(self):
         """Test that slug must be unique within company."""
         cat1 = CategoryFactory(slug="test-slug")
@@ -259,6 +319,43 @@ class TestCartModel:
         assert totals['subtotal'] == Decimal('100.00')
         assert totals['gst_amount'] == Decimal('9.00')
         assert totals['total'] == Decimal('109.00')
+    
+    def test_calculate_totals_rounds_gst_half_up_per_line(self):
+        """Test GST is rounded half up per line and saved items are excluded."""
+        cart = CartFactory()
+        product = ProductFactory(company=cart.company, gst_code='SR', gst_rate=Decimal('0.09'))
+        other = ProductFactory(company=cart.company, gst_code='SR', gst_rate=Decimal('0.09'))
+        saved = ProductFactory(company=cart.company)
+        # 0.50 * 9% = 0.045 -> 0.05
+        CartItemFactory(cart=cart, product=product, quantity=1, unit_price=Decimal('0.50'))
+        CartItemFactory(cart=cart, product=other, quantity=1, unit_price=Decimal('0.50'))
+        CartItemFactory(
+            cart=cart, product=saved, quantity=3,
+            unit_price=Decimal('10.00'), is_saved_for_later=True,
+        )
+        
+        totals = cart.calculate_totals()
+        assert totals['subtotal'] == Decimal('1.00')
+        assert totals['gst_amount'] == Decimal('0.10')
+        assert totals['total'] == Decimal('1.10')
+        assert totals['item_count'] == 5
+    
+    def test_get_totals_stores_snapshot(self, django_assert_num_queries):
+        """Test get_totals computes once and then serves the snapshot."""
+        cart = CartFactory()
+        product = ProductFactory(company=cart.company, gst_code='SR', gst_rate=Decimal('0.09'))
+        CartItemFactory(cart=cart, product=product, quantity=2, unit_price=Decimal('50.00'))
+        
+        assert cart.has_current_totals is False
+        assert cart.get_totals()['total'] == Decimal('109.00')
+        assert cart.has_current_totals is True
+        
+        cart = Cart.objects.get(pk=cart.pk)
+        with django_assert_num_queries(0):
+            totals = cart.get_totals()
+            assert cart.item_count == 2
+            assert cart.unique_item_count == 1
+        assert totals['gst_amount'] == Decimal('9.00')
 
 
 # =============================================================================
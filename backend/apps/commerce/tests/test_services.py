@@ -14,7 +14,7 @@ from unittest.mock import patch
 from django.utils import timezone
 
 from apps.commerce.models import Cart, Order
-from apps.commerce.services import ProductService, CartService, OrderService
+from apps.commerce.services import ProductService, CartService, GuestCartStore, OrderService
 from apps.commerce.tests.factories import (
     CategoryFactory, ProductFactory, ProductVariantFactory,
     CustomerFactory, CustomerAddressFactory,
@@ -173,6 +173,31 @@ class TestCartService:
         assert cart.items.count() == 1
         assert cart.items.first().quantity == 5
     
+    def test_item_changes_refresh_totals_snapshot(self, django_assert_num_queries):
+        """Test add/update/remove keep the totals snapshot current."""
+        cart = CartFactory()
+        product = ProductFactory(
+            company=cart.company, base_price=Decimal('20.00'),
+            gst_code='SR', gst_rate=Decimal('0.09'),
+        )
+        
+        cart_item = CartService.add_item(cart, product, quantity=1)
+        assert cart.totals_version == 1
+        
+        CartService.update_item_quantity(cart_item, 3)
+        cart.refresh_from_db()
+        assert cart.totals_version == 2
+        with django_assert_num_queries(0):
+            totals = CartService.calculate_totals(cart)
+        assert totals['subtotal'] == Decimal('60.00')
+        assert totals['gst_amount'] == Decimal('5.40')
+        assert totals['item_count'] == 3
+        
+        CartService.remove_item(cart_item)
+        cart.refresh_from_db()
+        assert cart.totals_version == 3
+        assert CartService.calculate_totals(cart)['total'] == Decimal('0.00')
+    
     def test_merge_guest_cart(self):
         """Test merging guest cart on login."""
         company = CompanyFactory()
@@ -196,6 +221,43 @@ class TestCartService:
         guest_cart.refresh_from_db()
         assert guest_cart.status == 'merged'
     
+    def test_merge_guest_cart_from_store(self, django_capture_on_commit_callbacks):
+        """Test a guest cart in the store is persisted and merged on login."""
+        company = CompanyFactory()
+        customer = CustomerFactory(company=company)
+        product = ProductFactory(company=company, base_price=Decimal('10.00'))
+        
+        guest_cart = GuestCartStore.get_or_create(company.id, 'store_session_123')
+        GuestCartStore.add_item(guest_cart, product, quantity=2)
+        assert not Cart.objects.filter(session_id='store_session_123').exists()
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            merged_cart = CartService.merge_guest_cart('store_session_123', customer)
+        
+        assert merged_cart.customer == customer
+        assert merged_cart.item_count == 2
+        assert Cart.objects.get(id=guest_cart['id']).status == 'merged'
+        assert GuestCartStore.load('store_session_123') is None
+    
+    def test_persist_guest_cart_skips_deleted_products(self):
+        """Test items whose product was deleted are left out of the saved cart."""
+        company = CompanyFactory()
+        kept = ProductFactory(company=company, base_price=Decimal('10.00'))
+        removed = ProductFactory(company=company, base_price=Decimal('20.00'))
+        guest_cart = GuestCartStore.get_or_create(company.id, 'store_session_456')
+        GuestCartStore.add_item(guest_cart, kept, quantity=2)
+        GuestCartStore.add_item(guest_cart, removed, quantity=1)
+        removed.hard_delete()
+        
+        cart, items = GuestCartStore.to_cart(guest_cart)
+        assert [item.product for item in items] == [kept]
+        assert cart.item_count == 2
+        
+        cart = GuestCartStore.persist(guest_cart)
+        
+        assert list(cart.items.values_list('product_id', flat=True)) == [kept.id]
+        assert cart.get_totals()['subtotal'] == Decimal('20.00')
+    
     def test_checkout_creates_order(self):
         """Test checkout creates order from cart."""
         cart = CartFactory()
@@ -261,6 +323,15 @@ class TestCartService:
 class TestOrderService:
     """Tests for OrderService."""
     
+    def test_generate_order_number_unique(self):
+        """Test order numbers are unique within a company."""
+        company = CompanyFactory()
+        
+        numbers = [OrderService.generate_order_number(company) for _ in range(5)]
+        
+        assert len(set(numbers)) == 5
+        assert all(number.startswith('ORD-') for number in numbers)
+    
     def test_confirm_order(self):
         """Test order confirmation."""
         order = OrderFactory(status='pending')
@@ -15,13 +15,15 @@ from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from apps.commerce.models import Cart, Order
+from apps.commerce.models import Cart, CartItem, Order
+from apps.commerce.services import CartService
 from apps.commerce.tests.factories import (
     CategoryFactory, ProductFactory,
     CustomerFactory, CartFactory, CartItemFactory,
-    OrderFactory,
+    OrderFactory, OrderItemFactory,
 )
 from apps.accounts.tests.factories import CompanyFactory, UserFactory
+from core.testing import assert_constant_queries
 
 
 pytestmark = pytest.mark.django_db
@@ -59,6 +61,30 @@ class TestCategoryViewSet:
         assert response.data[0]['name'] == 'Parent'
         assert len(response.data[0]['children']) == 1
     
+    def test_category_tree_is_cached(self, django_assert_max_num_queries, django_capture_on_commit_callbacks):
+        """Test the tree is built from one fetch, cached and dropped on writes."""
+        from django.core.cache import cache
+        from apps.commerce.category_tree import tree_key
+        
+        cache.delete(tree_key(self.company.id))
+        parent = CategoryFactory(company=self.company, name="Parent")
+        for index in range(20):
+            child = CategoryFactory(company=self.company, parent=parent, name=f"Child {index}")
+            CategoryFactory(company=self.company, parent=child, name=f"Grandchild {index}")
+        
+        # Auth and session queries aside, the tree itself is one query
+        with django_assert_max_num_queries(3):
+            response = self.client.get('/api/v1/commerce/categories/tree/')
+        assert len(response.data[0]['children']) == 20
+        assert cache.get(tree_key(self.company.id)) is not None
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            CategoryFactory(company=self.company, name="New Root")
+        assert cache.get(tree_key(self.company.id)) is None
+        
+        response = self.client.get('/api/v1/commerce/categories/tree/')
+        assert len(response.data) == 2
+    
     def test_company_isolation(self):
         """Test that categories from other companies are not visible."""
         other_company = CompanyFactory()
@@ -140,6 +166,25 @@ class TestCartViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert 'items' in response.data
     
+    def test_current_cart_serves_totals_snapshot(self):
+        """Test cart reads use the stored totals, whatever the item count."""
+        customer = CustomerFactory(company=self.company, user=self.user)
+        url = '/api/v1/commerce/cart/current/'
+        self.client.get(url)
+        cart = Cart.objects.get(customer=customer)
+        
+        def add_items(count):
+            for _ in range(count):
+                product = ProductFactory(company=self.company, base_price=Decimal('10.00'))
+                CartService.add_item(cart, product, quantity=2)
+        
+        assert_constant_queries(self.client, url, add_items, row_counts=(1, 20))
+        
+        response = self.client.get(url)
+        assert response.data['item_count'] == 40
+        assert response.data['unique_item_count'] == 20
+        assert response.data['totals']['subtotal'] == Decimal('400.00')
+    
     def test_add_item_to_cart(self):
         """Test adding item to cart."""
         product = ProductFactory(company=self.company, base_price=Decimal('50.00'))
@@ -154,6 +199,43 @@ class TestCartViewSet:
         assert response.status_code == status.HTTP_201_CREATED
         assert response.data['quantity'] == 2
         assert str(response.data['product']) == str(product.id)
+    
+    def test_guest_cart_does_not_write_to_database(self):
+        """Test guest cart reads and changes stay in the guest cart store."""
+        product = ProductFactory(company=self.company, base_price=Decimal('50.00'))
+        self.client.get('/api/v1/commerce/cart/current/')
+        
+        response = self.client.post(
+            '/api/v1/commerce/cart/add_item/', {'product_id': str(product.id), 'quantity': 1}
+        )
+        item_id = response.data['id']
+        self.client.post(f'/api/v1/commerce/cart/update_item/{item_id}/', {'quantity': 3})
+        
+        response = self.client.get('/api/v1/commerce/cart/current/')
+        
+        assert not Cart.objects.filter(company=self.company).exists()
+        assert not CartItem.objects.filter(product=product).exists()
+        assert response.data['item_count'] == 3
+        assert response.data['totals']['subtotal'] == Decimal('150.00')
+        
+        response = self.client.delete(f'/api/v1/commerce/cart/remove_item/{item_id}/')
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert self.client.get('/api/v1/commerce/cart/current/').data['items'] == []
+    
+    def test_guest_cart_checkout_persists_cart(self, django_capture_on_commit_callbacks):
+        """Test checking out a guest cart saves it and creates the order."""
+        product = ProductFactory(company=self.company, base_price=Decimal('50.00'))
+        self.client.post(
+            '/api/v1/commerce/cart/add_item/', {'product_id': str(product.id), 'quantity': 2}
+        )
+        cart_id = self.client.get('/api/v1/commerce/cart/current/').data['id']
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post('/api/v1/commerce/cart/checkout/', {'cart_id': cart_id})
+        
+        assert response.status_code == status.HTTP_201_CREATED
+        assert Cart.objects.get(id=cart_id).status == 'converted'
+        assert self.client.get('/api/v1/commerce/cart/current/').data['id'] != str(cart_id)
 
 
 class TestOrderViewSet:
@@ -230,3 +312,61 @@ class TestOrderViewSet:
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data['results']) == 1
         assert response.data['results'][0]['id'] == str(my_order.id)
+    
+    def test_keyset_pagination(self):
+        """Test ?pagination=keyset walks every order once, without a count."""
+        from datetime import timedelta
+        from django.utils import timezone
+        
+        now = timezone.now()
+        # Two orders share an order_date to exercise the id tie-breaker
+        dates = [now, now - timedelta(days=1), now - timedelta(days=1), now - timedelta(days=2)]
+        orders = [OrderFactory(company=self.company, order_date=order_date) for order_date in dates]
+        
+        seen = []
+        url = '/api/v1/commerce/orders/?pagination=keyset&page_size=3'
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert 'count' not in response.data
+        assert response.data['previous'] is None
+        seen += [row['id'] for row in response.data['results']]
+        
+        next_response = self.client.get(response.data['next'])
+        seen += [row['id'] for row in next_response.data['results']]
+        assert next_response.data['next'] is None
+        
+        assert len(seen) == 4
+        assert set(seen) == {str(order.id) for order in orders}
+        assert seen[0] == str(orders[0].id)
+        assert seen[-1] == str(orders[-1].id)
+        
+        previous_response = self.client.get(next_response.data['previous'])
+        assert [row['id'] for row in previous_response.data['results']] == seen[:3]
+    
+    @pytest.mark.slow
+    def test_list_orders_query_count_is_constant(self):
+        """Test customer names and item counts do not query per order."""
+        customer = CustomerFactory(company=self.company)
+        product = ProductFactory(company=self.company)
+        
+        def create_orders(count):
+            for order in OrderFactory.create_batch(count, company=self.company, customer=customer):
+                OrderItemFactory(order=order, product=product)
+        
+        assert_constant_queries(
+            self.client, '/api/v1/commerce/orders/?pagination=keyset&page_size=200', create_orders
+        )
+    
+    def test_keyset_pagination_invalid_cursor(self):
+        """Test a malformed cursor returns 404."""
+        response = self.client.get('/api/v1/commerce/orders/?cursor=not-a-cursor')
+        
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+    
+    def test_page_number_pagination_unchanged(self):
+        """Test clients not opting in still get page number pages."""
+        OrderFactory(company=self.company)
+        
+        response = self.client.get('/api/v1/commerce/orders/')
+        
+        assert response.data['count'] == 1
@@ -6,6 +6,7 @@ Implements ViewSets with:
 - Permission checks
 - Custom actions for status transitions
 """
+from django.db import transaction
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -13,7 +14,9 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from core.eager_loading import EagerLoadingMixin, prefetch_instances
 from core.permissions import IsCompanyMember
+from apps.commerce.category_tree import get_tree
 from apps.commerce.models import (
     Category, Product, ProductVariant,
     Customer, CustomerAddress,
@@ -24,14 +27,15 @@ from apps.commerce.serializers import (
     ProductListSerializer, ProductDetailSerializer, ProductCreateUpdateSerializer,
     ProductVariantSerializer,
     CustomerSerializer, CustomerAddressSerializer,
-    CartSerializer, CartItemSerializer, AddCartItemSerializer, UpdateCartItemSerializer,
+    CartSerializer, GuestCartSerializer, CartItemSerializer,
+    AddCartItemSerializer, UpdateCartItemSerializer,
     OrderListSerializer, OrderDetailSerializer, OrderCreateSerializer,
     ShipOrderSerializer, CancelOrderSerializer,
 )
-from apps.commerce.services import ProductService, CartService, OrderService
+from apps.commerce.services import ProductService, CartService, GuestCartStore, OrderService
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for product categories."""
     
     serializer_class = CategorySerializer
@@ -52,13 +56,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def tree(self, request):
-        """Get category tree structure."""
-        root_categories = self.get_queryset().filter(parent__isnull=True, is_active=True)
-        serializer = CategoryTreeSerializer(root_categories, many=True)
+        """Get category tree structure (cached per company)."""
+        serializer = CategoryTreeSerializer(get_tree(request.user.company.id), many=True)
         return Response(serializer.data)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for products."""
     
     permission_classes = [IsAuthenticated, IsCompanyMember]
@@ -101,7 +104,7 @@ class ProductViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for customers."""
     
     serializer_class = CustomerSerializer
@@ -158,31 +161,44 @@ class CartViewSet(viewsets.GenericViewSet):
         """Filter carts by user's company."""
         return Cart.objects.filter(company=self.request.user.company)
     
-    def get_cart(self, request):
-        """Get or create cart for current user/session."""
-        # Try to get customer for logged-in user
-        customer = None
+    def get_customer(self, request):
+        """Get the logged-in user's customer profile, if any."""
         if hasattr(request.user, 'customer_profiles'):
-            customer = request.user.customer_profiles.filter(
+            return request.user.customer_profiles.filter(
                 company=request.user.company
             ).first()
-        
+        return None
+    
+    def get_session_id(self, request):
+        """Get the session key, creating the session if needed."""
         session_id = request.session.session_key
         if not session_id:
             request.session.create()
             session_id = request.session.session_key
-        
+        return session_id
+    
+    def get_cart(self, request, customer):
+        """Get or create the customer's cart."""
         return CartService.get_or_create_cart(
             company=request.user.company,
-            customer=customer,
-            session_id=session_id if not customer else None
+            customer=customer
         )
     
+    def get_guest_cart(self, request):
+        """Get or create the session's cart in GuestCartStore."""
+        return GuestCartStore.get_or_create(request.user.company.id, self.get_session_id(request))
+    
     @action(detail=False, methods=['get'])
     def current(self, request):
         """Get current cart."""
-        cart = self.get_cart(request)
-        serializer = CartSerializer(cart)
+        customer = self.get_customer(request)
+        if customer is None:
+            cart, items = GuestCartStore.to_cart(self.get_guest_cart(request))
+            serializer = GuestCartSerializer(cart, context={'items': items})
+        else:
+            cart = self.get_cart(request, customer)
+            prefetch_instances([cart], CartSerializer)
+            serializer = CartSerializer(cart)
         return Response(serializer.data)
     
     @action(detail=False, methods=['post'])
@@ -191,8 +207,6 @@ class CartViewSet(viewsets.GenericViewSet):
         serializer = AddCartItemSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        cart = self.get_cart(request)
-        
         product = Product.objects.get(
             id=serializer.validated_data['product_id'],
             company=request.user.company
@@ -203,12 +217,19 @@ class CartViewSet(viewsets.GenericViewSet):
         if variant_id:
             variant = ProductVariant.objects.get(id=variant_id, product=product)
         
-        cart_item = CartService.add_item(
-            cart=cart,
-            product=product,
-            variant=variant,
-            quantity=serializer.validated_data.get('quantity', 1)
-        )
+        quantity = serializer.validated_data.get('quantity', 1)
+        customer = self.get_customer(request)
+        if customer is None:
+            cart_item = GuestCartStore.add_item(
+                self.get_guest_cart(request), product, variant=variant, quantity=quantity
+            )
+        else:
+            cart_item = CartService.add_item(
+                cart=self.get_cart(request, customer),
+                product=product,
+                variant=variant,
+                quantity=quantity
+            )
         
         return Response(CartItemSerializer(cart_item).data, status=status.HTTP_201_CREATED)
     
@@ -218,34 +239,55 @@ class CartViewSet(viewsets.GenericViewSet):
         serializer = UpdateCartItemSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        cart = self.get_cart(request)
-        cart_item = CartItem.objects.get(id=item_id, cart=cart)
-        
-        CartService.update_item_quantity(
-            cart_item=cart_item,
-            quantity=serializer.validated_data['quantity']
-        )
+        customer = self.get_customer(request)
+        if customer is None:
+            cart_item = GuestCartStore.update_item_quantity(
+                self.get_guest_cart(request), item_id, serializer.validated_data['quantity']
+            )
+        else:
+            cart = self.get_cart(request, customer)
+            cart_item = CartItem.objects.get(id=item_id, cart=cart)
+            
+            CartService.update_item_quantity(
+                cart_item=cart_item,
+                quantity=serializer.validated_data['quantity']
+            )
         
         return Response(CartItemSerializer(cart_item).data)
     
     @action(detail=False, methods=['delete'], url_path='remove_item/(?P<item_id>[^/.]+)')
     def remove_item(self, request, item_id=None):
         """Remove item from cart."""
-        cart = self.get_cart(request)
-        cart_item = CartItem.objects.get(id=item_id, cart=cart)
-        CartService.remove_item(cart_item)
+        customer = self.get_customer(request)
+        if customer is None:
+            GuestCartStore.remove_item(self.get_guest_cart(request), item_id)
+        else:
+            cart = self.get_cart(request, customer)
+            cart_item = CartItem.objects.get(id=item_id, cart=cart)
+            CartService.remove_item(cart_item)
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     @action(detail=False, methods=['post'])
+    @transaction.atomic
     def checkout(self, request):
         """Checkout cart to create order."""
         serializer = OrderCreateSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        cart = Cart.objects.get(
-            id=serializer.validated_data['cart_id'],
-            company=request.user.company
-        )
+        cart_id = serializer.validated_data['cart_id']
+        guest_cart = None
+        if request.session.session_key:
+            guest_cart = GuestCartStore.load(request.session.session_key, request.user.company.id)
+        
+        if guest_cart is not None and guest_cart['id'] == cart_id:
+            # Persisted in the checkout transaction, so a failed checkout
+            # leaves the guest cart in the store
+            cart = GuestCartStore.persist(guest_cart)
+        else:
+            cart = Cart.objects.get(
+                id=cart_id,
+                company=request.user.company
+            )
         
         # Get addresses
         shipping_address = serializer.validated_data.get('shipping_address')
@@ -272,7 +314,7 @@ class CartViewSet(viewsets.GenericViewSet):
         return Response(OrderDetailSerializer(order).data, status=status.HTTP_201_CREATED)
 
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for orders."""
     
     permission_classes = [IsAuthenticated, IsCompanyMember]
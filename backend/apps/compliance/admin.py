@@ -4,7 +4,9 @@ Compliance Django admin configuration.
 from django.contrib import admin
 from django.utils.html import format_html
 
-from apps.compliance.models import GSTReturn, DataConsent, DataAccessRequest, AuditLog
+from apps.compliance.models import (
+    GSTReturn, F5Accumulator, DataConsent, DataAccessRequest, AuditLog,
+)
 
 
 @admin.register(GSTReturn)
@@ -55,6 +57,27 @@ class GSTReturnAdmin(admin.ModelAdmin):
     status_badge.short_description = 'Status'
 
 
+@admin.register(F5Accumulator)
+class F5AccumulatorAdmin(admin.ModelAdmin):
+    """Read-only admin for running F5 totals."""
+    
+    list_display = [
+        'company', 'quarter', 'year', 'box_4', 'box_8',
+        'document_count', 'last_reconciled_at',
+    ]
+    list_filter = ['year', 'quarter']
+    search_fields = ['company__name']
+    readonly_fields = [
+        'id', 'company', 'quarter', 'year',
+        'box_1', 'box_2', 'box_3', 'box_4',
+        'box_5', 'box_6', 'box_7', 'box_8',
+        'document_count', 'last_reconciled_at', 'created_at', 'updated_at',
+    ]
+    
+    def has_add_permission(self, request):
+        return False
+
+
 @admin.register(DataConsent)
 class DataConsentAdmin(admin.ModelAdmin):
     """Read-only admin for consent records."""
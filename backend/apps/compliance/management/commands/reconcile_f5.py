@@ -0,0 +1,52 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.accounts.models import Company
+from apps.compliance.services import F5AccumulatorService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild F5 accumulators from source orders and report drift.'
+
+    def add_arguments(self, parser):
+        today = date.today()
+        parser.add_argument('--year', type=int, default=today.year)
+        parser.add_argument('--quarter', type=int, default=(today.month - 1) // 3 + 1)
+        parser.add_argument('--company', help='Company UEN (default: all companies)')
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Overwrite drifted accumulators with rebuilt values',
+        )
+
+    def handle(self, *args, **options):
+        quarter = options['quarter']
+        year = options['year']
+        if quarter not in (1, 2, 3, 4):
+            raise CommandError('--quarter must be between 1 and 4')
+
+        companies = Company.objects.all()
+        if options['company']:
+            companies = companies.filter(uen=str(options['company']).upper())
+            if not companies.exists():
+                raise CommandError(f"Company {options['company']} not found")
+
+        drifted = 0
+        for company in companies.iterator():
+            report = F5AccumulatorService.reconcile(
+                company, quarter, year, fix=options['fix']
+            )
+            if not report['has_drift']:
+                continue
+
+            drifted += 1
+            self.stdout.write(self.style.WARNING(
+                f"{company.uen} Q{quarter}/{year}: {report['drift']} "
+                f"(documents: {report['document_drift']})"
+            ))
+
+        action = 'Fixed' if options['fix'] else 'Found'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} drift in {drifted} accumulator(s) for Q{quarter}/{year}.'
+        ))
@@ -0,0 +1,101 @@
+"""
+Add F5Accumulator for incremental F5 box totals.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('compliance', '0002_initial'),
+        ('accounts', '0002_alter_company_options_alter_role_options_and_more'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='F5Accumulator',
+            fields=[
+                ('id', models.UUIDField(
+                    default=uuid.uuid4,
+                    editable=False,
+                    primary_key=True,
+                    serialize=False
+                )),
+                ('quarter', models.IntegerField(
+                    choices=[(1, 'Q1'), (2, 'Q2'), (3, 'Q3'), (4, 'Q4')]
+                )),
+                ('year', models.IntegerField()),
+                ('box_1', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Standard-rated supplies',
+                    max_digits=14
+                )),
+                ('box_2', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Zero-rated supplies',
+                    max_digits=14
+                )),
+                ('box_3', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Exempt supplies',
+                    max_digits=14
+                )),
+                ('box_4', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Total supplies (computed: 1+2+3)',
+                    max_digits=14
+                )),
+                ('box_5', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Total taxable purchases',
+                    max_digits=14
+                )),
+                ('box_6', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Output tax due',
+                    max_digits=14
+                )),
+                ('box_7', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Input tax claimable',
+                    max_digits=14
+                )),
+                ('box_8', models.DecimalField(
+                    decimal_places=2,
+                    default=Decimal('0.00'),
+                    help_text='Net GST payable/refundable (computed: 6-7)',
+                    max_digits=14
+                )),
+                ('document_count', models.IntegerField(
+                    default=0,
+                    help_text='Net number of source documents accumulated'
+                )),
+                ('last_reconciled_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='f5_accumulators',
+                    to='accounts.company'
+                )),
+            ],
+            options={
+                'verbose_name': 'F5 Accumulator',
+                'verbose_name_plural': 'F5 Accumulators',
+                'db_table': '"compliance"."f5_accumulators"',
+                'ordering': ['-year', '-quarter'],
+                'unique_together': {('company', 'year', 'quarter')},
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+"""
+Add F5OrderContribution to reverse exactly what each order accumulated.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    
+    dependencies = [
+        ('compliance', '0003_f5accumulator'),
+        ('accounts', '0002_alter_company_options_alter_role_options_and_more'),
+    ]
+    
+    operations = [
+        migrations.CreateModel(
+            name='F5OrderContribution',
+            fields=[
+                ('id', models.UUIDField(
+                    default=uuid.uuid4,
+                    editable=False,
+                    primary_key=True,
+                    serialize=False
+                )),
+                ('order_id', models.UUIDField(
+                    help_text='Order whose values are accumulated',
+                    unique=True
+                )),
+                ('quarter', models.IntegerField(
+                    choices=[(1, 'Q1'), (2, 'Q2'), (3, 'Q3'), (4, 'Q4')]
+                )),
+                ('year', models.IntegerField()),
+                ('box_1', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('box_2', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('box_3', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('box_6', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(
+                    on_delete=django.db.models.deletion.CASCADE,
+                    related_name='f5_order_contributions',
+                    to='accounts.company'
+                )),
+            ],
+            options={
+                'verbose_name': 'F5 Order Contribution',
+                'verbose_name_plural': 'F5 Order Contributions',
+                'db_table': '"compliance"."f5_order_contributions"',
+                'indexes': [models.Index(fields=['company', 'year', 'quarter'], name='f5_contribution_period_idx')],
+            },
+        ),
+    ]
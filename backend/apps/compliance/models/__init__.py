@@ -3,11 +3,14 @@ Compliance models.
 
 Provides models for:
 - GSTReturn: F5 quarterly filing
+- F5Accumulator: Running F5 box totals per quarter
+- F5OrderContribution: Box values each order added to its accumulator
 - DataConsent: PDPA consent audit trail
 - DataAccessRequest: PDPA access/deletion requests
 - AuditLog: Change tracking
 """
 from apps.compliance.models.gst_return import GSTReturn
+from apps.compliance.models.f5_accumulator import F5Accumulator, F5OrderContribution
 from apps.compliance.models.data_consent import DataConsent
 from apps.compliance.models.data_access_request import DataAccessRequest
 from apps.compliance.models.audit_log import AuditLog
@@ -15,6 +18,8 @@ from apps.compliance.models.audit_log import AuditLog
 
 __all__ = [
     'GSTReturn',
+    'F5Accumulator',
+    'F5OrderContribution',
     'DataConsent',
     'DataAccessRequest',
     'AuditLog',
@@ -0,0 +1,179 @@
+"""
+F5 accumulator model for incremental GST F5 box totals.
+
+Matches schema: compliance.f5_accumulators
+One row per company per quarter, updated transactionally as
+orders enter or leave F5-reportable statuses. F5OrderContribution
+records what each order added, so leaving reverses exactly that.
+"""
+import uuid
+from decimal import Decimal
+
+from django.db import models
+
+
+# Order statuses that count towards F5 supplies (mirrors GSTEngine.prepare_f5)
+F5_REPORTABLE_ORDER_STATUSES = ['confirmed', 'processing', 'shipped', 'delivered']
+
+# Box fields maintained incrementally (4 and 8 are derived)
+F5_ACCUMULATED_BOXES = ['box_1', 'box_2', 'box_3', 'box_5', 'box_6', 'box_7']
+
+# Box fields an order contributes to
+F5_ORDER_BOXES = ['box_1', 'box_2', 'box_3', 'box_6']
+
+
+class F5Accumulator(models.Model):
+    """
+    Running F5 box totals for a company quarter.
+    
+    Boxes 1, 2, 3, 5, 6 and 7 are adjusted by signed deltas when
+    source documents change status; boxes 4 and 8 are recomputed
+    on every adjustment so a preview is a single-row read.
+    """
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    company = models.ForeignKey(
+        'accounts.Company',
+        on_delete=models.CASCADE,
+        related_name='f5_accumulators'
+    )
+    
+    # Period
+    quarter = models.IntegerField(
+        choices=[(i, f'Q{i}') for i in range(1, 5)]
+    )
+    year = models.IntegerField()
+    
+    # F5 Box Values (all DECIMAL(14,2))
+    box_1 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Standard-rated supplies'
+    )
+    box_2 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Zero-rated supplies'
+    )
+    box_3 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Exempt supplies'
+    )
+    box_4 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Total supplies (computed: 1+2+3)'
+    )
+    box_5 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Total taxable purchases'
+    )
+    box_6 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Output tax due'
+    )
+    box_7 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Input tax claimable'
+    )
+    box_8 = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text='Net GST payable/refundable (computed: 6-7)'
+    )
+    
+    # Bookkeeping
+    document_count = models.IntegerField(
+        default=0,
+        help_text='Net number of source documents accumulated'
+    )
+    last_reconciled_at = models.DateTimeField(null=True, blank=True)
+    
+    # Audit
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = '"compliance"."f5_accumulators"'
+        verbose_name = 'F5 Accumulator'
+        verbose_name_plural = 'F5 Accumulators'
+        ordering = ['-year', '-quarter']
+        unique_together = [('company', 'year', 'quarter')]
+    
+    def __str__(self):
+        return f"F5 accumulator Q{self.quarter}/{self.year} - {self.company_id}"
+    
+    def box_values(self) -> dict:
+        """Get accumulated box values keyed by box name."""
+        return {box: getattr(self, box) for box in F5_ACCUMULATED_BOXES}
+
+
+class F5OrderContribution(models.Model):
+    """
+    Box values an order has added to its quarter's accumulator.
+    
+    Created when the order enters an F5-reportable status, adjusted
+    when its stored F5 fields are recalculated, and deleted (after its
+    values are subtracted) when the order leaves.
+    """
+    
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False
+    )
+    company = models.ForeignKey(
+        'accounts.Company',
+        on_delete=models.CASCADE,
+        related_name='f5_order_contributions'
+    )
+    order_id = models.UUIDField(
+        unique=True,
+        help_text='Order whose values are accumulated'
+    )
+    
+    # Accumulator the values were added to
+    quarter = models.IntegerField(
+        choices=[(i, f'Q{i}') for i in range(1, 5)]
+    )
+    year = models.IntegerField()
+    
+    box_1 = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    box_2 = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    box_3 = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    box_6 = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    
+    # Audit
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = '"compliance"."f5_order_contributions"'
+        verbose_name = 'F5 Order Contribution'
+        verbose_name_plural = 'F5 Order Contributions'
+        indexes = [
+            models.Index(fields=['company', 'year', 'quarter'], name='f5_contribution_period_idx'),
+        ]
+    
+    def __str__(self):
+        return f"F5 contribution of order {self.order_id} to Q{self.quarter}/{self.year}"
+    
+    def box_values(self) -> dict:
+        """Get contributed box values keyed by box name."""
+        return {box: getattr(self, box) for box in F5_ORDER_BOXES}
@@ -2,10 +2,12 @@
 from apps.compliance.services.pdpa_service import PDPAService
 from apps.compliance.services.audit_service import AuditService
 from apps.compliance.services.gst_return_service import GSTReturnService
+from apps.compliance.services.f5_accumulator_service import F5AccumulatorService
 
 
 __all__ = [
     'PDPAService',
     'AuditService',
     'GSTReturnService',
+    'F5AccumulatorService',
 ]
@@ -77,6 +77,46 @@ class AuditService:
         
         return audit_log
     
+    @staticmethod
+    def log_bulk_update(
+        resource_type: str,
+        rows,
+        old_values: dict,
+        new_values: dict,
+        user=None,
+    ) -> int:
+        """
+        Log the same change to many rows with one bulk insert.
+        
+        For set-based UPDATEs, which do not fire model signals.
+        
+        Args:
+            resource_type: Model name (e.g., 'accounting.invoice')
+            rows: Iterable of (company_id, resource_id) pairs
+            old_values: Previous values (same for every row)
+            new_values: New values (same for every row)
+            user: User who made the change (None for system jobs)
+            
+        Returns:
+            Number of audit logs created
+        """
+        logs = AuditLog.objects.bulk_create([
+            AuditLog(
+                company_id=company_id,
+                user=user,
+                action='UPDATE',
+                resource_type=resource_type,
+                resource_id=resource_id,
+                old_values=old_values,
+                new_values=new_values,
+            )
+            for company_id, resource_id in rows
+        ], batch_size=1000)
+        
+        logger.debug(f"Audit log: bulk UPDATE {resource_type} x{len(logs)}")
+        
+        return len(logs)
+    
     @staticmethod
     def log_model_create(
         instance,
@@ -0,0 +1,384 @@
+"""
+F5 accumulator service for incremental GST F5 totals.
+
+Provides:
+- Transactional box updates on order status transitions, reversed
+  from the recorded per-order contribution
+- O(1) F5 preview from the accumulator row
+- Reconciliation against source orders with drift reporting
+"""
+import logging
+from decimal import Decimal
+from typing import Dict
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from apps.compliance.models import F5Accumulator, F5OrderContribution
+from apps.compliance.models.f5_accumulator import (
+    F5_ACCUMULATED_BOXES,
+    F5_ORDER_BOXES,
+    F5_REPORTABLE_ORDER_STATUSES,
+)
+from apps.accounting.gst import GSTEngine
+from apps.accounting.gst.engine import F5Return
+
+
+logger = logging.getLogger(__name__)
+
+
+class F5AccumulatorService:
+    """
+    Service for maintaining running F5 box totals.
+    
+    An order contributes to its quarter's accumulator while its status
+    is F5-reportable (confirmed through delivered). Entering that set
+    adds the order's box values and records them as an
+    F5OrderContribution; leaving subtracts the recorded values, so a
+    later change to the order's F5 fields cannot make the totals drift.
+    All updates run inside the caller's transaction.
+    """
+    
+    @staticmethod
+    def record_order_status_change(order, previous_status: str) -> bool:
+        """
+        Apply an order's F5 contribution after a status change.
+        
+        Must be called inside the transaction that saved the new status.
+        
+        Args:
+            order: Order with its new status already set
+            previous_status: Status before the transition
+            
+        Returns:
+            True if the accumulator was updated
+        """
+        was_reportable = previous_status in F5_REPORTABLE_ORDER_STATUSES
+        is_reportable = order.status in F5_REPORTABLE_ORDER_STATUSES
+        
+        if was_reportable == is_reportable:
+            return False
+        
+        if is_reportable:
+            values = F5AccumulatorService.get_order_box_values(order)
+            quarter, year = F5AccumulatorService._get_order_quarter(order)
+            F5OrderContribution.objects.update_or_create(
+                order_id=order.pk,
+                defaults={
+                    'company_id': order.company_id,
+                    'quarter': quarter,
+                    'year': year,
+                    **{box: values[box] for box in F5_ORDER_BOXES},
+                },
+            )
+            sign = 1
+        else:
+            contribution = F5OrderContribution.objects.select_for_update().filter(
+                order_id=order.pk
+            ).first()
+            if contribution is not None:
+                values = contribution.box_values()
+                quarter, year = contribution.quarter, contribution.year
+                contribution.delete()
+            else:
+                # Accumulated before contributions were recorded
+                values = F5AccumulatorService.get_order_box_values(order)
+                quarter, year = F5AccumulatorService._get_order_quarter(order)
+            sign = -1
+        
+        F5AccumulatorService.apply_deltas(
+            company_id=order.company_id,
+            quarter=quarter,
+            year=year,
+            deltas={box: value * sign for box, value in values.items()},
+            document_delta=sign,
+        )
+        return True
+    
+    @staticmethod
+    def refresh_order_contribution(order) -> bool:
+        """
+        Re-apply an accumulated order after its F5 fields changed.
+        
+        Adds the difference between the order's current box values and
+        its recorded contribution. Must be called inside the transaction
+        that saved the change.
+        
+        Args:
+            order: Order with its updated F5 fields
+            
+        Returns:
+            True if the accumulator was updated
+        """
+        if order.status not in F5_REPORTABLE_ORDER_STATUSES:
+            return False
+        
+        contribution = F5OrderContribution.objects.select_for_update().filter(
+            order_id=order.pk
+        ).first()
+        if contribution is None:
+            return False
+        
+        values = F5AccumulatorService.get_order_box_values(order)
+        deltas = {box: values[box] - getattr(contribution, box) for box in F5_ORDER_BOXES}
+        if not any(deltas.values()):
+            return False
+        
+        F5AccumulatorService.apply_deltas(
+            company_id=order.company_id,
+            quarter=contribution.quarter,
+            year=contribution.year,
+            deltas=deltas,
+        )
+        for box in F5_ORDER_BOXES:
+            setattr(contribution, box, values[box])
+        contribution.save(update_fields=[*F5_ORDER_BOXES, 'updated_at'])
+        return True
+    
+    @staticmethod
+    def get_order_box_values(order) -> Dict[str, Decimal]:
+        """
+        Get the F5 box values an order contributes.
+        
+        Uses the order's stored F5 fields when present, otherwise
+        classifies items by product GST code like GSTEngine.prepare_f5.
+        
+        Args:
+            order: Order instance
+            
+        Returns:
+            Dict of box name to amount
+        """
+        values = {box: Decimal('0.00') for box in F5_ACCUMULATED_BOXES}
+        
+        if order.gst_box_1_amount is not None or order.gst_box_6_amount is not None:
+            values['box_1'] = order.gst_box_1_amount or Decimal('0.00')
+            values['box_6'] = order.gst_box_6_amount or Decimal('0.00')
+            return values
+        
+        transaction_date = timezone.localtime(order.created_at).date()
+        for item in order.items.select_related('product'):
+            gst_code = item.product.gst_code if item.product else 'SR'
+            item_total = item.unit_price * item.quantity
+            
+            if gst_code == 'SR':
+                values['box_1'] += item_total
+                values['box_6'] += GSTEngine.calculate(
+                    item_total, 'SR', transaction_date
+                ).gst_amount
+            elif gst_code == 'ZR':
+                values['box_2'] += item_total
+            elif gst_code == 'ES':
+                values['box_3'] += item_total
+        
+        return values
+    
+    @staticmethod
+    def apply_deltas(
+        company_id,
+        quarter: int,
+        year: int,
+        deltas: Dict[str, Decimal],
+        document_delta: int = 0,
+    ) -> None:
+        """
+        Add signed box deltas to a quarter's accumulator.
+        
+        Uses a single UPDATE with F() expressions so concurrent
+        transitions never overwrite each other.
+        
+        Args:
+            company_id: Company UUID
+            quarter: Quarter (1-4)
+            year: Year
+            deltas: Box name to signed amount
+            document_delta: Change in accumulated document count
+        """
+        delta = {box: deltas.get(box, Decimal('0.00')) for box in F5_ACCUMULATED_BOXES}
+        
+        with transaction.atomic():
+            accumulator, _ = F5Accumulator.objects.get_or_create(
+                company_id=company_id,
+                quarter=quarter,
+                year=year,
+            )
+            
+            # SET expressions see pre-update values, so derived boxes
+            # are computed from the same deltas
+            F5Accumulator.objects.filter(pk=accumulator.pk).update(
+                **{box: F(box) + value for box, value in delta.items()},
+                box_4=(
+                    F('box_1') + F('box_2') + F('box_3')
+                    + delta['box_1'] + delta['box_2'] + delta['box_3']
+                ),
+                box_8=F('box_6') - F('box_7') + delta['box_6'] - delta['box_7'],
+                document_count=F('document_count') + document_delta,
+                updated_at=timezone.now(),
+            )
+    
+    @staticmethod
+    def get_preview(company, quarter: int, year: int) -> F5Return:
+        """
+        Get F5 box values from the accumulator.
+        
+        Args:
+            company: Company instance
+            quarter: Quarter (1-4)
+            year: Year
+            
+        Returns:
+            F5Return built from the accumulator row (zeros if none)
+        """
+        from apps.compliance.services.gst_return_service import GSTReturnService
+        
+        period_start, period_end = GSTReturnService._get_quarter_dates(quarter, year)
+        accumulator = F5Accumulator.objects.filter(
+            company=company,
+            quarter=quarter,
+            year=year,
+        ).first()
+        
+        if accumulator is None:
+            accumulator = F5Accumulator(company=company, quarter=quarter, year=year)
+        
+        return F5Return(
+            company_id=str(company.id),
+            year=year,
+            quarter=quarter,
+            period_start=period_start,
+            period_end=period_end,
+            box_1=accumulator.box_1,
+            box_2=accumulator.box_2,
+            box_3=accumulator.box_3,
+            box_4=accumulator.box_4,
+            box_5=accumulator.box_5,
+            box_6=accumulator.box_6,
+            box_7=accumulator.box_7,
+            box_8=accumulator.box_8,
+        )
+    
+    @staticmethod
+    def compute_from_source(company, quarter: int, year: int) -> dict:
+        """
+        Rebuild a quarter's box values from source orders.
+        
+        Orders with stored F5 fields are summed directly; the rest are
+        aggregated from items in one grouped query.
+        
+        Args:
+            company: Company instance
+            quarter: Quarter (1-4)
+            year: Year
+            
+        Returns:
+            Dict of box values plus document_count
+        """
+        from apps.commerce.models import Order
+        from apps.compliance.services.gst_return_service import GSTReturnService
+        
+        period_start, period_end = GSTReturnService._get_quarter_dates(quarter, year)
+        values = {box: Decimal('0.00') for box in F5_ACCUMULATED_BOXES}
+        
+        orders = Order.objects.filter(
+            company=company,
+            created_at__date__gte=period_start,
+            created_at__date__lte=period_end,
+            status__in=F5_REPORTABLE_ORDER_STATUSES,
+        )
+        has_f5_fields = (
+            Q(gst_box_1_amount__isnull=False) | Q(gst_box_6_amount__isnull=False)
+        )
+        
+        stored = orders.filter(has_f5_fields).aggregate(
+            box_1=Sum('gst_box_1_amount'),
+            box_6=Sum('gst_box_6_amount'),
+            document_count=Count('id'),
+        )
+        values['box_1'] += stored['box_1'] or Decimal('0.00')
+        values['box_6'] += stored['box_6'] or Decimal('0.00')
+        document_count = stored['document_count']
+        
+        itemized = orders.exclude(has_f5_fields)
+        for row in GSTEngine.aggregate_f5_supplies(itemized, period_start, period_end):
+            if row['gst_code'] == 'SR':
+                values['box_1'] += row['supplies']
+                values['box_6'] += row['output_tax']
+            elif row['gst_code'] == 'ZR':
+                values['box_2'] += row['supplies']
+            elif row['gst_code'] == 'ES':
+                values['box_3'] += row['supplies']
+        document_count += itemized.count()
+        
+        values['document_count'] = document_count
+        return values
+    
+    @staticmethod
+    def reconcile(company, quarter: int, year: int, fix: bool = False) -> dict:
+        """
+        Compare a quarter's accumulator with source orders.
+        
+        The accumulator row is locked before source rows are read, so
+        transitions committed during reconciliation are applied on top
+        of the rebuilt values rather than lost.
+        
+        Args:
+            company: Company instance
+            quarter: Quarter (1-4)
+            year: Year
+            fix: If True, overwrite the accumulator with rebuilt values
+            
+        Returns:
+            Drift report dict with per-box differences (source - accumulated)
+        """
+        with transaction.atomic():
+            F5Accumulator.objects.get_or_create(
+                company=company,
+                quarter=quarter,
+                year=year,
+            )
+            accumulator = F5Accumulator.objects.select_for_update().get(
+                company=company,
+                quarter=quarter,
+                year=year,
+            )
+            
+            source = F5AccumulatorService.compute_from_source(company, quarter, year)
+            
+            drift = {}
+            for box in F5_ACCUMULATED_BOXES:
+                difference = source[box] - getattr(accumulator, box)
+                if difference != 0:
+                    drift[box] = difference
+            document_drift = source['document_count'] - accumulator.document_count
+            
+            if fix:
+                for box in F5_ACCUMULATED_BOXES:
+                    setattr(accumulator, box, source[box])
+                accumulator.box_4 = accumulator.box_1 + accumulator.box_2 + accumulator.box_3
+                accumulator.box_8 = accumulator.box_6 - accumulator.box_7
+                accumulator.document_count = source['document_count']
+                accumulator.last_reconciled_at = timezone.now()
+                accumulator.save()
+        
+        if drift or document_drift:
+            logger.warning(
+                f"F5 accumulator drift for company {company.id} "
+                f"Q{quarter}/{year}: {drift} (documents: {document_drift})"
+            )
+        
+        return {
+            'company_id': str(company.id),
+            'quarter': quarter,
+            'year': year,
+            'drift': {box: str(value) for box, value in drift.items()},
+            'document_drift': document_drift,
+            'has_drift': bool(drift or document_drift),
+            'fixed': fix,
+        }
+    
+    @staticmethod
+    def _get_order_quarter(order) -> tuple:
+        """Get (quarter, year) an order is reported in."""
+        order_date = timezone.localtime(order.created_at).date()
+        return (order_date.month - 1) // 3 + 1, order_date.year
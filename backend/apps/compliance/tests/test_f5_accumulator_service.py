@@ -0,0 +1,197 @@
+"""
+F5 Accumulator Service tests.
+"""
+import pytest
+from decimal import Decimal
+from datetime import datetime
+
+from django.utils import timezone
+
+from apps.commerce.models import Order
+from apps.commerce.services import OrderService
+from apps.commerce.tests.factories import OrderFactory, OrderItemFactory, ProductFactory
+from apps.compliance.models import F5Accumulator, F5OrderContribution
+from apps.compliance.services import F5AccumulatorService
+from apps.accounts.tests.factories import CompanyFactory
+
+
+def _make_order(company, status='pending', box_1=None, box_6=None):
+    """Create an order dated in Q1 2024."""
+    order = OrderFactory(
+        company=company,
+        status=status,
+        gst_box_1_amount=box_1,
+        gst_box_6_amount=box_6,
+    )
+    created_at = timezone.make_aware(datetime(2024, 2, 15, 12, 0))
+    Order.objects.filter(pk=order.pk).update(created_at=created_at)
+    order.refresh_from_db()
+    return order
+
+
+@pytest.mark.django_db
+class TestF5AccumulatorTransitions:
+    """Tests for accumulator updates on order transitions."""
+    
+    def test_confirm_adds_order_boxes(self):
+        """Test confirming an order adds its boxes."""
+        company = CompanyFactory()
+        order = _make_order(company, box_1=Decimal('100.00'), box_6=Decimal('9.00'))
+        
+        order.confirm()
+        
+        accumulator = F5Accumulator.objects.get(company=company, year=2024, quarter=1)
+        assert accumulator.box_1 == Decimal('100.00')
+        assert accumulator.box_6 == Decimal('9.00')
+        assert accumulator.box_4 == Decimal('100.00')
+        assert accumulator.box_8 == Decimal('9.00')
+        assert accumulator.document_count == 1
+    
+    def test_cancel_after_confirm_reverses(self):
+        """Test cancelling a confirmed order subtracts its boxes."""
+        company = CompanyFactory()
+        order = _make_order(company, box_1=Decimal('100.00'), box_6=Decimal('9.00'))
+        
+        order.confirm()
+        order.cancel(reason='Customer request')
+        
+        accumulator = F5Accumulator.objects.get(company=company, year=2024, quarter=1)
+        assert accumulator.box_1 == Decimal('0.00')
+        assert accumulator.box_8 == Decimal('0.00')
+        assert accumulator.document_count == 0
+    
+    def test_cancel_pending_is_noop(self):
+        """Test cancelling a pending order does not touch the accumulator."""
+        company = CompanyFactory()
+        order = _make_order(company, box_1=Decimal('100.00'), box_6=Decimal('9.00'))
+        
+        order.cancel()
+        
+        assert not F5Accumulator.objects.filter(company=company).exists()
+    
+    def test_full_refund_reverses(self):
+        """Test a full refund removes the order from the accumulator."""
+        company = CompanyFactory()
+        order = _make_order(company, box_1=Decimal('100.00'), box_6=Decimal('9.00'))
+        order.confirm()
+        Order.objects.filter(pk=order.pk).update(status='delivered')
+        order.refresh_from_db()
+        
+        OrderService.refund(order, reason='Damaged')
+        
+        accumulator = F5Accumulator.objects.get(company=company, year=2024, quarter=1)
+        assert accumulator.box_1 == Decimal('0.00')
+        assert accumulator.box_6 == Decimal('0.00')
+    
+    def test_cancel_after_gst_recalculation_reverses_exactly(self):
+        """Test confirm -> calculate_gst_reporting -> cancel leaves no residue."""
+        company = CompanyFactory()
+        order = _make_order(company)
+        OrderItemFactory(
+            order=order,
+            product=ProductFactory(company=company, gst_code='SR'),
+            unit_price=Decimal('100.00'),
+            quantity=1,
+        )
+        OrderItemFactory(
+            order=order,
+            product=ProductFactory(company=company, gst_code='ZR'),
+            unit_price=Decimal('20.00'),
+            quantity=2,
+            gst_code='ZR',
+            gst_amount=Decimal('0.00'),
+        )
+        
+        order.confirm()
+        order.calculate_gst_reporting()
+        
+        accumulator = F5Accumulator.objects.get(company=company, year=2024, quarter=1)
+        assert accumulator.box_1 == order.gst_box_1_amount
+        assert accumulator.box_6 == order.gst_box_6_amount
+        assert F5AccumulatorService.reconcile(company, 1, 2024)['has_drift'] is False
+        
+        order.cancel()
+        
+        accumulator.refresh_from_db()
+        assert all(value == Decimal('0.00') for value in accumulator.box_values().values())
+        assert accumulator.box_4 == Decimal('0.00')
+        assert accumulator.box_8 == Decimal('0.00')
+        assert accumulator.document_count == 0
+        assert not F5OrderContribution.objects.filter(order_id=order.pk).exists()
+    
+    def test_order_created_reportable_is_accumulated(self):
+        """Test an order created directly in a reportable status is added."""
+        company = CompanyFactory()
+        order = OrderFactory(
+            company=company,
+            status='confirmed',
+            gst_box_1_amount=Decimal('100.00'),
+            gst_box_6_amount=Decimal('9.00'),
+        )
+        
+        contribution = F5OrderContribution.objects.get(order_id=order.pk)
+        accumulator = F5Accumulator.objects.get(
+            company=company, year=contribution.year, quarter=contribution.quarter,
+        )
+        assert accumulator.box_1 == Decimal('100.00')
+        assert accumulator.document_count == 1
+    
+    def test_item_fallback(self):
+        """Test orders without F5 fields are classified from items."""
+        company = CompanyFactory()
+        order = _make_order(company)
+        OrderItemFactory(
+            order=order,
+            product=ProductFactory(company=company, gst_code='SR'),
+            unit_price=Decimal('33.33'),
+            quantity=1,
+        )
+        OrderItemFactory(
+            order=order,
+            product=ProductFactory(company=company, gst_code='ZR'),
+            unit_price=Decimal('20.00'),
+            quantity=2,
+        )
+        
+        order.confirm()
+        
+        preview = F5AccumulatorService.get_preview(company, 1, 2024)
+        assert preview.box_1 == Decimal('33.33')
+        assert preview.box_2 == Decimal('40.00')
+        assert preview.box_6 == Decimal('3.00')
+
+
+@pytest.mark.django_db
+class TestF5AccumulatorReconcile:
+    """Tests for accumulator reconciliation."""
+    
+    def test_no_drift_after_transitions(self):
+        """Test transitions keep the accumulator in sync with source."""
+        company = CompanyFactory()
+        _make_order(company, box_1=Decimal('100.00'), box_6=Decimal('9.00')).confirm()
+        _make_order(company, box_1=Decimal('50.00'), box_6=Decimal('4.50')).confirm()
+        
+        report = F5AccumulatorService.reconcile(company, 1, 2024)
+        
+        assert report['has_drift'] is False
+    
+    def test_detects_and_fixes_drift(self):
+        """Test drift is reported and fixed from source rows."""
+        company = CompanyFactory()
+        _make_order(
+            company, status='confirmed',
+            box_1=Decimal('100.00'), box_6=Decimal('9.00'),
+        )
+        
+        report = F5AccumulatorService.reconcile(company, 1, 2024, fix=True)
+        
+        assert report['has_drift'] is True
+        assert report['drift'] == {'box_1': '100.00', 'box_6': '9.00'}
+        assert report['document_drift'] == 1
+        
+        accumulator = F5Accumulator.objects.get(company=company, year=2024, quarter=1)
+        assert accumulator.box_1 == Decimal('100.00')
+        assert accumulator.box_8 == Decimal('9.00')
+        assert accumulator.last_reconciled_at is not None
+        
+        assert F5AccumulatorService.reconcile(company, 1, 2024)['has_drift'] is False
@@ -13,6 +13,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 
+from core.eager_loading import EagerLoadingMixin
 from apps.compliance.models import GSTReturn, DataConsent, DataAccessRequest, AuditLog
 from apps.compliance.serializers import (
     GSTReturnSerializer, GSTReturnListSerializer, GSTReturnCreateSerializer,
@@ -24,7 +25,7 @@ from apps.compliance.serializers import (
 from apps.compliance.services import PDPAService, GSTReturnService
 
 
-class GSTReturnViewSet(viewsets.ModelViewSet):
+class GSTReturnViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for GST F5 returns.
     
@@ -109,7 +110,7 @@ class GSTReturnViewSet(viewsets.ModelViewSet):
             )
 
 
-class DataAccessRequestViewSet(viewsets.ModelViewSet):
+class DataAccessRequestViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """
     ViewSet for PDPA data access requests.
     
@@ -206,7 +207,7 @@ class DataAccessRequestViewSet(viewsets.ModelViewSet):
             )
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     Read-only ViewSet for audit logs.
     
@@ -4,6 +4,16 @@ Redis distributed locking for inventory operations.
 Provides thread-safe, distributed locks for concurrent stock operations.
 Prevents race conditions during stock reservations and transfers.
 
+Each acquisition hands out a fencing token that increases monotonically
+per item. Writers store it on the InventoryItem so a holder whose lock
+expired cannot overwrite changes made by a newer holder.
+
+Backends:
+- RedisLockBackend: one EVALSHA per acquire/release/extend (atomic
+  compare-and-delete and compare-and-extend), and one for claiming all
+  keys of a MultiItemLock
+- CacheLockBackend: generic Django cache API fallback
+
 Usage:
     with InventoryLock(item_id) as lock:
         # perform inventory operation
@@ -12,9 +22,12 @@ Usage:
 import time
 import uuid
 import logging
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+from weakref import WeakKeyDictionary
 
 from django.core.cache import cache
+from django.core.cache.backends.redis import RedisCacheClient
+from django.core.exceptions import ImproperlyConfigured
 from django.conf import settings
 
 
@@ -27,6 +40,86 @@ DEFAULT_LOCK_TIMEOUT = getattr(settings, 'INVENTORY_LOCK_TIMEOUT_SECONDS', 15)
 MAX_RETRIES = getattr(settings, 'INVENTORY_LOCK_MAX_RETRIES', 3)
 RETRY_DELAY_MS = getattr(settings, 'INVENTORY_LOCK_RETRY_DELAY_MS', 100)
 
+# Lock backend: 'auto' (Redis scripts when the cache is Redis), 'redis' or 'cache'
+LOCK_BACKEND = getattr(settings, 'INVENTORY_LOCK_BACKEND', 'auto')
+
+# How long per-item lock contention counters are kept
+CONTENTION_TTL = getattr(settings, 'INVENTORY_LOCK_CONTENTION_TTL_SECONDS', 86400)
+
+# Release/extend results
+RELEASED = 1
+NOT_HELD = 0
+OWNER_MISMATCH = -1
+
+
+# Fencing tokens never go below the current time in microseconds, so a
+# lost counter key cannot hand out a token lower than one already issued
+ACQUIRE_SCRIPT = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'PX', ARGV[2]) then
+    local now = redis.call('TIME')
+    local floor = tonumber(now[1]) * 1000000 + tonumber(now[2])
+    local token = redis.call('INCR', KEYS[2])
+    if token < floor then
+        redis.call('SET', KEYS[2], floor)
+        token = floor
+    end
+    return token
+end
+return 0
+"""
+
+# All-or-nothing claim of N locks. KEYS holds N lock keys, then their N
+# fence counters, then their N contention counters. Returns {1, tokens...}
+# on success, or {0, indexes of held keys...} after counting contention.
+ACQUIRE_MANY_SCRIPT = """
+local n = tonumber(ARGV[3])
+local result = {0}
+for i = 1, n do
+    if redis.call('EXISTS', KEYS[i]) == 1 then
+        result[#result + 1] = i
+        if redis.call('INCR', KEYS[2 * n + i]) == 1 then
+            redis.call('EXPIRE', KEYS[2 * n + i], ARGV[4])
+        end
+    end
+end
+if #result > 1 then
+    return result
+end
+local now = redis.call('TIME')
+local floor = tonumber(now[1]) * 1000000 + tonumber(now[2])
+result[1] = 1
+for i = 1, n do
+    redis.call('SET', KEYS[i], ARGV[1], 'PX', ARGV[2])
+    local token = redis.call('INCR', KEYS[n + i])
+    if token < floor then
+        redis.call('SET', KEYS[n + i], floor)
+        token = floor
+    end
+    result[i + 1] = token
+end
+return result
+"""
+
+RELEASE_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+elseif not current then
+    return 0
+end
+return -1
+"""
+
+EXTEND_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+if current == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+elseif not current then
+    return 0
+end
+return -1
+"""
+
 
 class LockAcquisitionError(Exception):
     """Raised when lock cannot be acquired."""
@@ -38,6 +131,200 @@ class LockTimeoutError(Exception):
     pass
 
 
+def _now_microseconds() -> int:
+    """Current time in microseconds (fencing token floor)."""
+    return time.time_ns() // 1000
+
+
+def contention_key(item_id: str) -> str:
+    """Get the cache key of an item's lock contention counter."""
+    return f"inventory:contention:{item_id}"
+
+
+def get_lock_contention(item_ids: Iterable) -> Dict[str, int]:
+    """
+    Get recent lock contention counts per inventory item.
+    
+    Counts how often a MultiItemLock attempt found the item's lock
+    held, over the last INVENTORY_LOCK_CONTENTION_TTL_SECONDS.
+    
+    Args:
+        item_ids: Inventory item UUIDs
+        
+    Returns:
+        Dict of item ID to contention count (0 when never contended)
+    """
+    item_ids = [str(item_id) for item_id in item_ids]
+    counts = cache.get_many([contention_key(item_id) for item_id in item_ids])
+    return {
+        item_id: int(counts.get(contention_key(item_id), 0))
+        for item_id in item_ids
+    }
+
+
+class CacheLockBackend:
+    """
+    Lock operations over the generic Django cache API.
+    
+    Release and extend are get-then-write, so they are only safe on
+    backends without concurrent writers; prefer RedisLockBackend.
+    """
+    
+    def acquire(self, key: str, fence_key: str, owner: str, timeout: int) -> Optional[int]:
+        """Try to take the lock; returns a fencing token or None."""
+        if not cache.add(key, owner, timeout):
+            return None
+        
+        try:
+            return cache.incr(fence_key)
+        except ValueError:
+            # Counter missing (first use or evicted): seed above any issued token
+            cache.add(fence_key, _now_microseconds(), None)
+            return cache.incr(fence_key)
+    
+    def acquire_many(
+        self,
+        keys: List[str],
+        fence_keys: List[str],
+        contention_keys: List[str],
+        owner: str,
+        timeout: int,
+    ) -> Tuple[Optional[List[int]], List[int]]:
+        """
+        Take all locks or none.
+        
+        Returns:
+            Tuple of (fencing tokens or None, indexes of contended keys)
+        """
+        taken = []
+        for index, key in enumerate(keys):
+            if not cache.add(key, owner, timeout):
+                # Roll back the partial claim so the set backs off as a unit
+                for taken_key in taken:
+                    self.release(taken_key, owner)
+                cache.add(contention_keys[index], 0, CONTENTION_TTL)
+                try:
+                    cache.incr(contention_keys[index])
+                except ValueError:
+                    pass
+                return None, [index]
+            taken.append(key)
+        
+        tokens = []
+        for fence_key in fence_keys:
+            try:
+                tokens.append(cache.incr(fence_key))
+            except ValueError:
+                cache.add(fence_key, _now_microseconds(), None)
+                tokens.append(cache.incr(fence_key))
+        return tokens, []
+    
+    def release(self, key: str, owner: str) -> int:
+        """Delete the lock if held by owner."""
+        current_owner = cache.get(key)
+        if current_owner == owner:
+            cache.delete(key)
+            return RELEASED
+        if current_owner is None:
+            return NOT_HELD
+        return OWNER_MISMATCH
+    
+    def extend(self, key: str, owner: str, timeout: int) -> int:
+        """Reset the lock TTL if held by owner."""
+        current_owner = cache.get(key)
+        if current_owner != owner:
+            return NOT_HELD if current_owner is None else OWNER_MISMATCH
+        cache.set(key, owner, timeout)
+        return RELEASED
+
+
+class RedisLockBackend:
+    """
+    Lock operations as single Lua scripts on the Redis cache connection.
+    
+    Scripts are sent with EVALSHA (falling back to EVAL on NOSCRIPT),
+    so every operation is one round trip and compare-and-delete /
+    compare-and-extend cannot interleave with another client.
+    """
+    
+    def __init__(self, client):
+        self.client = client
+        self._acquire = client.register_script(ACQUIRE_SCRIPT)
+        self._release = client.register_script(RELEASE_SCRIPT)
+        self._extend = client.register_script(EXTEND_SCRIPT)
+        self._acquire_many = client.register_script(ACQUIRE_MANY_SCRIPT)
+    
+    def acquire(self, key: str, fence_key: str, owner: str, timeout: int) -> Optional[int]:
+        """Try to take the lock; returns a fencing token or None."""
+        token = self._acquire(
+            keys=[cache.make_key(key), cache.make_key(fence_key)],
+            args=[owner, int(timeout * 1000)],
+        )
+        return int(token) or None
+    
+    def acquire_many(
+        self,
+        keys: List[str],
+        fence_keys: List[str],
+        contention_keys: List[str],
+        owner: str,
+        timeout: int,
+    ) -> Tuple[Optional[List[int]], List[int]]:
+        """
+        Take all locks or none in one script call.
+        
+        Returns:
+            Tuple of (fencing tokens or None, indexes of contended keys)
+        """
+        result = self._acquire_many(
+            keys=[cache.make_key(key) for key in (*keys, *fence_keys, *contention_keys)],
+            args=[owner, int(timeout * 1000), len(keys), CONTENTION_TTL],
+        )
+        if int(result[0]) == 1:
+            return [int(token) for token in result[1:]], []
+        return None, [int(index) - 1 for index in result[1:]]
+    
+    def release(self, key: str, owner: str) -> int:
+        """Delete the lock if held by owner."""
+        return int(self._release(keys=[cache.make_key(key)], args=[owner]))
+    
+    def extend(self, key: str, owner: str, timeout: int) -> int:
+        """Reset the lock TTL if held by owner."""
+        return int(self._extend(
+            keys=[cache.make_key(key)],
+            args=[owner, int(timeout * 1000)],
+        ))
+
+
+# Script registrations per cache connection (RedisCacheClient is per thread)
+_redis_backends: 'WeakKeyDictionary[RedisCacheClient, RedisLockBackend]' = WeakKeyDictionary()
+
+
+def get_lock_backend():
+    """
+    Get the configured lock backend.
+    
+    With INVENTORY_LOCK_BACKEND = 'auto', Redis scripts are used when
+    the default cache is Django's RedisCache.
+    """
+    if LOCK_BACKEND == 'cache':
+        return CacheLockBackend()
+    
+    redis_cache_client = getattr(cache, '_cache', None)
+    if isinstance(redis_cache_client, RedisCacheClient):
+        backend = _redis_backends.get(redis_cache_client)
+        if backend is None:
+            backend = RedisLockBackend(redis_cache_client.get_client(write=True))
+            _redis_backends[redis_cache_client] = backend
+        return backend
+    
+    if LOCK_BACKEND == 'redis':
+        raise ImproperlyConfigured(
+            "INVENTORY_LOCK_BACKEND='redis' requires the Redis cache backend"
+        )
+    return CacheLockBackend()
+
+
 class InventoryLock:
     """
     Distributed lock for inventory operations using Redis.
@@ -49,6 +336,7 @@ class InventoryLock:
         item_id: UUID of the inventory item to lock
         timeout: Lock timeout in seconds
         owner: Unique identifier for this lock holder
+        fencing_token: Monotonic token for this acquisition (None until acquired)
     
     Example:
         with InventoryLock(item.id) as lock:
@@ -77,6 +365,7 @@ class InventoryLock:
         self.max_retries = max_retries
         self.retry_delay_ms = retry_delay_ms
         self.owner = str(uuid.uuid4())
+        self.fencing_token: Optional[int] = None
         self._acquired = False
     
     @property
@@ -84,6 +373,11 @@ class InventoryLock:
         """Get the Redis key for this lock."""
         return f"inventory:lock:{self.item_id}"
     
+    @property
+    def fence_key(self) -> str:
+        """Get the Redis key for this item's fencing token counter."""
+        return f"inventory:fence:{self.item_id}"
+    
     def acquire(self) -> bool:
         """
         Attempt to acquire the lock with retry logic.
@@ -96,13 +390,19 @@ class InventoryLock:
         Raises:
             LockAcquisitionError: If lock cannot be acquired after retries
         """
+        backend = get_lock_backend()
+        
         for attempt in range(self.max_retries + 1):
-            # Try to set the lock (nx=True means only if not exists)
-            success = cache.add(self.lock_key, self.owner, self.timeout)
+            # Try to set the lock (only if not exists) and draw a fencing token
+            token = backend.acquire(self.lock_key, self.fence_key, self.owner, self.timeout)
             
-            if success:
+            if token is not None:
+                self.fencing_token = token
                 self._acquired = True
-                logger.debug(f"Lock acquired: {self.lock_key} (owner: {self.owner})")
+                logger.debug(
+                    f"Lock acquired: {self.lock_key} "
+                    f"(owner: {self.owner}, token: {token})"
+                )
                 return True
             
             if attempt < self.max_retries:
@@ -131,26 +431,23 @@ class InventoryLock:
         if not self._acquired:
             return False
         
-        # Verify we're the owner before releasing
-        current_owner = cache.get(self.lock_key)
+        # Compare-and-delete so we never release someone else's lock
+        result = get_lock_backend().release(self.lock_key, self.owner)
+        self._acquired = False
         
-        if current_owner == self.owner:
-            cache.delete(self.lock_key)
-            self._acquired = False
+        if result == RELEASED:
             logger.debug(f"Lock released: {self.lock_key}")
             return True
-        elif current_owner is None:
+        elif result == NOT_HELD:
             # Lock already expired
             logger.warning(f"Lock already expired: {self.lock_key}")
-            self._acquired = False
             return False
         else:
-            # Someone else owns it now (shouldn't happen)
+            # Someone else owns it now (our lock expired and was re-taken)
             logger.error(
                 f"Lock owner mismatch on {self.lock_key}: "
-                f"expected {self.owner}, got {current_owner}"
+                f"expected {self.owner}"
             )
-            self._acquired = False
             return False
     
     def extend(self, additional_time: int = None) -> bool:
@@ -166,13 +463,11 @@ class InventoryLock:
         if not self._acquired:
             return False
         
-        current_owner = cache.get(self.lock_key)
-        if current_owner != self.owner:
+        # Compare-and-extend so an expired lock is never resurrected
+        extend_time = additional_time or self.timeout
+        if get_lock_backend().extend(self.lock_key, self.owner, extend_time) != RELEASED:
             return False
         
-        # Re-set with new timeout
-        extend_time = additional_time or self.timeout
-        cache.set(self.lock_key, self.owner, extend_time)
         logger.debug(f"Lock extended: {self.lock_key} by {extend_time}s")
         return True
     
@@ -191,8 +486,11 @@ class MultiItemLock:
     """
     Lock multiple inventory items atomically.
     
-    Used for transfers between locations.
-    Acquires locks in consistent order to prevent deadlocks.
+    Used for transfers between locations and multi-line reservations.
+    All locks are claimed in one all-or-nothing backend call (keys in
+    consistent order to prevent deadlocks); on contention the whole set
+    backs off and retries together, and each held key's contention
+    counter is incremented (see get_lock_contention).
     
     Example:
         with MultiItemLock([source_item.id, dest_item.id]) as locks:
@@ -204,31 +502,82 @@ class MultiItemLock:
         self,
         item_ids: list,
         timeout: int = DEFAULT_LOCK_TIMEOUT,
+        max_retries: int = MAX_RETRIES,
+        retry_delay_ms: int = RETRY_DELAY_MS,
     ):
         """
         Initialize multi-item lock.
         
         Args:
-            item_ids: List of inventory item UUIDs
+            item_ids: List of inventory item UUIDs (duplicates are ignored)
             timeout: Lock timeout per item
+            max_retries: Maximum retry attempts for the whole set (default 3)
+            retry_delay_ms: Initial retry delay in milliseconds (default 100)
         """
         # Sort to ensure consistent lock ordering (prevent deadlocks)
-        self.item_ids = sorted([str(iid) for iid in item_ids])
+        self.item_ids = sorted({str(iid) for iid in item_ids})
         self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay_ms = retry_delay_ms
+        self.owner = str(uuid.uuid4())
         self.locks: list[InventoryLock] = []
     
+    @property
+    def fencing_tokens(self) -> dict:
+        """Get fencing tokens of held locks keyed by item ID."""
+        return {lock.item_id: lock.fencing_token for lock in self.locks}
+    
     def acquire(self) -> bool:
-        """Acquire all locks in order."""
-        try:
-            for item_id in self.item_ids:
-                lock = InventoryLock(item_id, self.timeout)
-                lock.acquire()
-                self.locks.append(lock)
+        """
+        Acquire all locks in one call, retrying the set with backoff.
+        
+        Returns:
+            True if all locks acquired
+            
+        Raises:
+            LockAcquisitionError: If the set cannot be acquired after retries
+        """
+        if not self.item_ids:
             return True
-        except LockAcquisitionError:
-            # Release any acquired locks
-            self.release()
-            raise
+        
+        backend = get_lock_backend()
+        locks = [InventoryLock(item_id, self.timeout) for item_id in self.item_ids]
+        contended = []
+        
+        for attempt in range(self.max_retries + 1):
+            tokens, contended_indexes = backend.acquire_many(
+                [lock.lock_key for lock in locks],
+                [lock.fence_key for lock in locks],
+                [contention_key(lock.item_id) for lock in locks],
+                self.owner,
+                self.timeout,
+            )
+            
+            if tokens is not None:
+                for lock, token in zip(locks, tokens):
+                    lock.owner = self.owner
+                    lock.fencing_token = token
+                    lock._acquired = True
+                self.locks = locks
+                logger.debug(
+                    f"Locks acquired: {len(locks)} items (owner: {self.owner})"
+                )
+                return True
+            
+            contended = [self.item_ids[index] for index in contended_indexes]
+            if attempt < self.max_retries:
+                # Exponential backoff for the whole set
+                delay = (self.retry_delay_ms * (2 ** attempt)) / 1000.0
+                logger.debug(
+                    f"Lock contention on {', '.join(contended)}, "
+                    f"retry {attempt + 1}/{self.max_retries} after {delay:.2f}s"
+                )
+                time.sleep(delay)
+        
+        raise LockAcquisitionError(
+            f"Failed to acquire locks for inventory items {', '.join(contended)} "
+            f"after {self.max_retries} retries"
+        )
     
     def release(self):
         """Release all locks in reverse order."""
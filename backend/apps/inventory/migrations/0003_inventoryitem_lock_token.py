@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventoryitem',
+            name='lock_token',
+            field=models.PositiveBigIntegerField(default=0, help_text='Fencing token of the last writing lock holder'),
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_inventoryitem_lock_token'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventoryreservation',
+            index=models.Index(condition=models.Q(('status', 'pending')), fields=['expires_at'], name='reservations_pending_expiry'),
+        ),
+    ]
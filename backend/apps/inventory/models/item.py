@@ -4,6 +4,7 @@ InventoryItem model for stock tracking.
 Implements:
 - Stock quantities (available, reserved, net)
 - Optimistic locking with version field
+- Lock fencing with lock_token field
 - Reorder point tracking
 - net_qty computed as property (DB-generated column is read-only)
 """
@@ -31,6 +32,7 @@ class InventoryItem(BaseModel):
         available_qty: Total quantity in stock
         reserved_qty: Quantity reserved for pending orders
         version: Optimistic lock version number
+        lock_token: Fencing token of the last lock holder that wrote the row
     """
     
     company = models.ForeignKey(
@@ -118,6 +120,12 @@ class InventoryItem(BaseModel):
         help_text="Version for optimistic locking"
     )
     
+    # Fencing token of the last lock holder that wrote this row
+    lock_token = models.PositiveBigIntegerField(
+        default=0,
+        help_text="Fencing token of the last writing lock holder"
+    )
+    
     class Meta:
         db_table = '"inventory"."items"'
         verbose_name = 'Inventory Item'
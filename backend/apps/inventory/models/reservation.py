@@ -108,6 +108,11 @@ class InventoryReservation(models.Model):
         indexes = [
             models.Index(fields=['inventory_item']),
             models.Index(fields=['order_id']),
+            models.Index(
+                fields=['expires_at'],
+                condition=models.Q(status='pending'),
+                name='reservations_pending_expiry',
+            ),
         ]
         constraints = [
             models.CheckConstraint(
@@ -2,28 +2,52 @@
 Inventory service for stock operations.
 
 Provides business logic for:
-- Stock reservations with Redis locking
+- Stock reservations with Redis locking, or lock-free conditional
+  updates (selectable per company)
+- Whole-order batch reservations
 - Stock adjustments with audit trail
 - Transfers between locations
 - Low stock detection
 """
 import logging
+import uuid
 from decimal import Decimal
 from typing import Optional, List, Tuple, Dict, Any
 from datetime import timedelta
 
-from django.db import transaction
-from django.db.models import F, Sum
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import (
+    Case, F, IntegerField, PositiveBigIntegerField, Q, Sum, Value, When,
+)
+from django.db.models.functions import Greatest
 from django.utils import timezone
 
 from apps.inventory.models import (
     Location, InventoryItem, InventoryReservation, InventoryMovement,
 )
-from apps.inventory.locks import InventoryLock, MultiItemLock, LockAcquisitionError
+from apps.inventory.locks import (
+    InventoryLock, MultiItemLock, LockAcquisitionError, LockTimeoutError,
+)
 
 
 logger = logging.getLogger(__name__)
 
+# Reservation engines
+RESERVATION_MODE_LOCK = 'lock'
+RESERVATION_MODE_CONDITIONAL = 'conditional'
+RESERVATION_MODES = (RESERVATION_MODE_LOCK, RESERVATION_MODE_CONDITIONAL)
+
+# Default engine; companies override via the 'inventory_reservation_mode' setting
+DEFAULT_RESERVATION_MODE = getattr(
+    settings, 'INVENTORY_RESERVATION_MODE', RESERVATION_MODE_LOCK
+)
+
+# Expired reservations released per sweeper transaction
+RESERVATION_SWEEP_BATCH_SIZE = getattr(
+    settings, 'INVENTORY_RESERVATION_SWEEP_BATCH_SIZE', 1000
+)
+
 
 class InsufficientStockError(Exception):
     """Raised when there's not enough stock for an operation."""
@@ -40,36 +64,68 @@ class InventoryService:
     Service class for inventory operations.
     
     All stock-modifying operations use Redis distributed locks
-    to ensure thread safety in concurrent environments.
+    to ensure thread safety in concurrent environments. Item writes
+    carry the lock's fencing token so a holder whose lock expired
+    cannot overwrite a newer holder's changes.
     """
     
+    @staticmethod
+    def get_reservation_mode(company) -> str:
+        """
+        Get the reservation engine configured for a company.
+        
+        Args:
+            company: Company instance
+        
+        Returns:
+            RESERVATION_MODE_LOCK or RESERVATION_MODE_CONDITIONAL
+        """
+        mode = company.get_setting('inventory_reservation_mode', DEFAULT_RESERVATION_MODE)
+        if mode not in RESERVATION_MODES:
+            logger.warning(
+                f"Unknown inventory_reservation_mode {mode!r} for company "
+                f"{company.id}, using {RESERVATION_MODE_LOCK}"
+            )
+            return RESERVATION_MODE_LOCK
+        return mode
+    
     @staticmethod
     def reserve_stock(
         inventory_item: InventoryItem,
         quantity: int,
         order_id: str,
         expires_minutes: int = 30,
+        mode: Optional[str] = None,
     ) -> InventoryReservation:
         """
         Reserve stock for an order.
         
         Creates a reservation and increments reserved_qty on the item.
-        Uses Redis lock to prevent race conditions.
+        Uses Redis lock to prevent race conditions, or a single guarded
+        UPDATE when the company uses the conditional engine.
         
         Args:
             inventory_item: The InventoryItem to reserve from
             quantity: Amount to reserve
             order_id: UUID of the order
             expires_minutes: Minutes until reservation expires (default 30)
-            
+            mode: Reservation engine (default: the company's setting)
+        
         Returns:
             Created InventoryReservation
-            
+        
         Raises:
             InsufficientStockError: If not enough stock available
             LockAcquisitionError: If lock cannot be acquired
         """
-        with InventoryLock(inventory_item.id):
+        if mode is None:
+            mode = InventoryService.get_reservation_mode(inventory_item.company)
+        if mode == RESERVATION_MODE_CONDITIONAL:
+            return InventoryService.reserve_stock_conditional(
+                inventory_item, quantity, order_id, expires_minutes,
+            )
+        
+        with InventoryLock(inventory_item.id) as lock:
             # Refresh from DB to get latest quantities
             inventory_item.refresh_from_db()
             
@@ -90,13 +146,15 @@ class InventoryService:
                     expires_at=timezone.now() + timedelta(minutes=expires_minutes),
                 )
                 
-                # Update reserved quantity with optimistic lock
+                # Update reserved quantity with optimistic lock and fencing
                 updated = InventoryItem.objects.filter(
                     pk=inventory_item.pk,
-                    version=inventory_item.version
+                    version=inventory_item.version,
+                    lock_token__lte=lock.fencing_token,
                 ).update(
                     reserved_qty=F('reserved_qty') + quantity,
                     version=F('version') + 1,
+                    lock_token=lock.fencing_token,
                     last_movement_at=timezone.now(),
                 )
                 
@@ -121,6 +179,267 @@ class InventoryService:
                 
                 return reservation
     
+    @staticmethod
+    def reserve_stock_conditional(
+        inventory_item: InventoryItem,
+        quantity: int,
+        order_id: str,
+        expires_minutes: int = 30,
+    ) -> InventoryReservation:
+        """
+        Reserve stock without a distributed lock.
+        
+        The availability check and the increment are one
+        UPDATE ... WHERE available_qty - reserved_qty >= quantity RETURNING,
+        so the row lock PostgreSQL takes for the update serializes
+        concurrent reservations. The reservation and movement rows are
+        inserted in the same transaction.
+        
+        Args:
+            inventory_item: The InventoryItem to reserve from
+            quantity: Amount to reserve
+            order_id: UUID of the order
+            expires_minutes: Minutes until reservation expires (default 30)
+        
+        Returns:
+            Created InventoryReservation
+        
+        Raises:
+            InsufficientStockError: If not enough stock available
+        """
+        now = timezone.now()
+        qn = connection.ops.quote_name
+        
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {InventoryItem._meta.db_table} SET "
+                    f"{qn('reserved_qty')} = {qn('reserved_qty')} + %s, "
+                    f"{qn('version')} = {qn('version')} + 1, "
+                    f"{qn('last_movement_at')} = %s, "
+                    f"{qn('updated_at')} = %s "
+                    f"WHERE {qn('id')} = %s "
+                    f"AND {qn('available_qty')} - {qn('reserved_qty')} >= %s "
+                    f"RETURNING {qn('available_qty')}, {qn('reserved_qty')}, {qn('version')}",
+                    [quantity, now, now, inventory_item.pk, quantity],
+                )
+                row = cursor.fetchone()
+            
+            if row is None:
+                raise InsufficientStockError(
+                    f"Cannot reserve {quantity} units of {inventory_item.sku}"
+                )
+            
+            inventory_item.available_qty, inventory_item.reserved_qty, inventory_item.version = row
+            inventory_item.last_movement_at = now
+            
+            reservation = InventoryReservation.objects.create(
+                inventory_item=inventory_item,
+                order_id=order_id,
+                quantity=quantity,
+                status='pending',
+                expires_at=now + timedelta(minutes=expires_minutes),
+            )
+            
+            InventoryMovement.create_movement(
+                inventory_item=inventory_item,
+                movement_type='sale',
+                quantity=-quantity,
+                reference_type='reservation',
+                reference_id=reservation.id,
+                notes=f"Reserved for order {order_id}",
+            )
+            
+            logger.info(
+                f"Reserved {quantity}x {inventory_item.sku} for order {order_id} "
+                f"(conditional update)"
+            )
+            
+            return reservation
+    
+    @staticmethod
+    def reserve_order(
+        order_id: str,
+        lines: List[Tuple[InventoryItem, int]],
+        expires_minutes: int = 30,
+        mode: Optional[str] = None,
+    ) -> List[InventoryReservation]:
+        """
+        Reserve stock for every line of an order, all or nothing.
+        
+        The lock engine claims all item locks in one MultiItemLock call;
+        the conditional engine guards on stock instead. Either way the
+        items are updated by one UPDATE and the reservation and movement
+        rows are written with bulk_create, so the number of queries does
+        not grow with the number of lines.
+        
+        Args:
+            order_id: UUID of the order
+            lines: (InventoryItem, quantity) pairs; an item may repeat
+            expires_minutes: Minutes until reservations expire (default 30)
+            mode: Reservation engine (default: the company's setting)
+        
+        Returns:
+            Created InventoryReservations, one per line in input order
+        
+        Raises:
+            ValueError: If a quantity is not positive
+            InsufficientStockError: If any line cannot be reserved
+            LockAcquisitionError: If locks cannot be acquired
+        """
+        lines = [(item, int(quantity)) for item, quantity in lines]
+        if not lines:
+            return []
+        if any(quantity <= 0 for _, quantity in lines):
+            raise ValueError("Reservation quantities must be positive")
+        
+        # Total quantity per item, so repeated items are checked together
+        totals: Dict[Any, int] = {}
+        for item, quantity in lines:
+            totals[item.pk] = totals.get(item.pk, 0) + quantity
+        
+        if mode is None:
+            mode = InventoryService.get_reservation_mode(lines[0][0].company)
+        
+        items_query = InventoryItem.objects.select_related('product', 'variant')
+        
+        if mode == RESERVATION_MODE_CONDITIONAL:
+            with transaction.atomic():
+                if InventoryService._increment_reserved(totals) == len(totals):
+                    items = items_query.in_bulk(list(totals))
+                    return InventoryService._create_order_reservations(
+                        order_id, lines, items, expires_minutes,
+                    )
+                # Some line is short: undo the rows that did update
+                transaction.set_rollback(True)
+            
+            InventoryService._check_order_availability(
+                items_query.in_bulk(list(totals)), totals,
+            )
+            raise InsufficientStockError(
+                f"Cannot reserve stock for order {order_id}"
+            )
+        
+        with MultiItemLock(list(totals)) as locks:
+            tokens = locks.fencing_tokens
+            
+            with transaction.atomic():
+                items = items_query.in_bulk(list(totals))
+                InventoryService._check_order_availability(items, totals)
+                
+                if InventoryService._increment_reserved(totals, tokens) != len(totals):
+                    raise LockTimeoutError(
+                        f"Stale fencing token reserving stock for order {order_id}"
+                    )
+                for pk, quantity in totals.items():
+                    items[pk].reserved_qty += quantity
+                
+                return InventoryService._create_order_reservations(
+                    order_id, lines, items, expires_minutes,
+                )
+    
+    @staticmethod
+    def _increment_reserved(
+        totals: Dict[Any, int],
+        fencing_tokens: Optional[Dict[str, int]] = None,
+    ) -> int:
+        """
+        Add reserved quantities to several items in one UPDATE.
+        
+        Without fencing tokens each row is guarded on net stock; with
+        them each row is guarded on (and stamped with) its token.
+        
+        Returns:
+            Number of rows updated
+        """
+        now = timezone.now()
+        guard = Q()
+        for pk, quantity in totals.items():
+            if fencing_tokens is None:
+                guard |= Q(pk=pk, available_qty__gte=F('reserved_qty') + quantity)
+            else:
+                guard |= Q(pk=pk, lock_token__lte=fencing_tokens[str(pk)])
+        
+        values = {
+            'reserved_qty': F('reserved_qty') + Case(
+                *[When(pk=pk, then=Value(quantity)) for pk, quantity in totals.items()],
+                output_field=IntegerField(),
+            ),
+            'version': F('version') + 1,
+            'last_movement_at': now,
+            'updated_at': now,
+        }
+        if fencing_tokens is not None:
+            values['lock_token'] = Case(
+                *[When(pk=pk, then=Value(fencing_tokens[str(pk)])) for pk in totals],
+                output_field=PositiveBigIntegerField(),
+            )
+        
+        return InventoryItem.objects.filter(guard).update(**values)
+    
+    @staticmethod
+    def _check_order_availability(items: Dict[Any, InventoryItem], totals: Dict[Any, int]) -> None:
+        """Raise InsufficientStockError naming every short item."""
+        shortfalls = []
+        for pk, quantity in totals.items():
+            item = items.get(pk)
+            if item is None:
+                shortfalls.append(f"{pk} (not found)")
+            elif not item.can_reserve(quantity):
+                shortfalls.append(
+                    f"{item.sku} (requested {quantity}, available {item.net_qty})"
+                )
+        
+        if shortfalls:
+            raise InsufficientStockError(
+                f"Cannot reserve: {', '.join(shortfalls)}"
+            )
+    
+    @staticmethod
+    def _create_order_reservations(
+        order_id: str,
+        lines: List[Tuple[InventoryItem, int]],
+        items: Dict[Any, InventoryItem],
+        expires_minutes: int,
+    ) -> List[InventoryReservation]:
+        """Bulk insert reservation and movement rows for order lines."""
+        expires_at = timezone.now() + timedelta(minutes=expires_minutes)
+        
+        reservations = InventoryReservation.objects.bulk_create([
+            InventoryReservation(
+                id=uuid.uuid4(),
+                inventory_item=items[item.pk],
+                order_id=order_id,
+                quantity=quantity,
+                status='pending',
+                expires_at=expires_at,
+            )
+            for item, quantity in lines
+        ])
+        
+        InventoryMovement.objects.bulk_create([
+            InventoryMovement(
+                id=uuid.uuid4(),
+                company_id=reservation.inventory_item.company_id,
+                inventory_item=reservation.inventory_item,
+                movement_type='sale',
+                quantity=-reservation.quantity,
+                quantity_before=reservation.inventory_item.available_qty,
+                quantity_after=reservation.inventory_item.available_qty - reservation.quantity,
+                reference_type='reservation',
+                reference_id=reservation.id,
+                notes=f"Reserved for order {order_id}",
+            )
+            for reservation in reservations
+        ])
+        
+        logger.info(
+            f"Reserved {len(reservations)} lines across {len(items)} items "
+            f"for order {order_id}"
+        )
+        
+        return reservations
+    
     @staticmethod
     def confirm_reservation(reservation: InventoryReservation) -> None:
         """
@@ -128,12 +447,13 @@ class InventoryService:
         
         Args:
             reservation: The reservation to confirm
-            
+        
         Raises:
             ValueError: If reservation is not pending
         """
-        with InventoryLock(reservation.inventory_item_id):
-            reservation.refresh_from_db()
+        with InventoryLock(reservation.inventory_item_id), transaction.atomic():
+            # Row lock: the expiry sweep takes reservation rows without the lock
+            reservation.refresh_from_db(from_queryset=InventoryReservation.objects.select_for_update())
             reservation.confirm()
             logger.info(f"Confirmed reservation {reservation.id}")
     
@@ -145,50 +465,52 @@ class InventoryService:
         Args:
             reservation: The reservation to release
         """
-        with InventoryLock(reservation.inventory_item_id):
-            reservation.refresh_from_db()
+        with InventoryLock(reservation.inventory_item_id) as lock, transaction.atomic():
+            # Row lock: the expiry sweep takes reservation rows without the
+            # lock, and whichever commits first returns the stock
+            reservation.refresh_from_db(from_queryset=InventoryReservation.objects.select_for_update())
             
             if reservation.status in ['released', 'expired']:
                 return  # Already released
             
-            with transaction.atomic():
-                quantity = reservation.quantity
-                item = reservation.inventory_item
-                
-                # Restore reserved quantity
-                updated = InventoryItem.objects.filter(
-                    pk=item.pk,
-                    version=item.version
-                ).update(
-                    reserved_qty=F('reserved_qty') - quantity,
-                    version=F('version') + 1,
-                    last_movement_at=timezone.now(),
-                )
-                
-                if updated == 0:
-                    # Refresh and retry without optimistic lock
-                    item.refresh_from_db()
-                    item.reserved_qty = max(0, item.reserved_qty - quantity)
-                    item.increment_version()
-                    item.update_movement_timestamp()
-                    item.save()
-                
-                reservation.release()
-                
-                # Create movement log for return
-                InventoryMovement.create_movement(
-                    inventory_item=item,
-                    movement_type='return',
-                    quantity=quantity,
-                    reference_type='reservation_release',
-                    reference_id=reservation.id,
-                    notes="Reservation released",
-                )
-                
-                logger.info(
-                    f"Released reservation {reservation.id}, "
-                    f"restored {quantity}x {item.sku}"
+            quantity = reservation.quantity
+            item = reservation.inventory_item
+            
+            # Restore reserved quantity relative to the row's current
+            # value: conditional reservations change it without the lock
+            now = timezone.now()
+            updated = InventoryItem.objects.filter(
+                pk=item.pk,
+                lock_token__lte=lock.fencing_token,
+            ).update(
+                reserved_qty=Greatest(F('reserved_qty') - quantity, 0),
+                version=F('version') + 1,
+                lock_token=lock.fencing_token,
+                last_movement_at=now,
+                updated_at=now,
+            )
+            
+            if updated == 0:
+                raise LockTimeoutError(
+                    f"Lock on {item.sku} expired and was taken by a newer holder"
                 )
+            
+            reservation.release()
+            
+            # Create movement log for return
+            InventoryMovement.create_movement(
+                inventory_item=item,
+                movement_type='return',
+                quantity=quantity,
+                reference_type='reservation_release',
+                reference_id=reservation.id,
+                notes="Reservation released",
+            )
+            
+            logger.info(
+                f"Released reservation {reservation.id}, "
+                f"restored {quantity}x {item.sku}"
+            )
     
     @staticmethod
     def adjust_stock(
@@ -205,15 +527,17 @@ class InventoryService:
             quantity_delta: Amount to add (positive) or remove (negative)
             notes: Reason for adjustment
             user: User making the adjustment
-            
+        
         Returns:
             Created InventoryMovement
-            
+        
         Raises:
             ValueError: If adjustment would result in negative stock
         """
-        with InventoryLock(inventory_item.id):
-            inventory_item.refresh_from_db()
+        with InventoryLock(inventory_item.id) as lock, transaction.atomic():
+            # Row lock as well: conditional reservations change
+            # reserved_qty without the Redis lock
+            inventory_item.refresh_from_db(from_queryset=InventoryItem.objects.select_for_update())
             
             new_qty = inventory_item.available_qty + quantity_delta
             if new_qty < 0:
@@ -229,30 +553,29 @@ class InventoryService:
                     f"available={new_qty}, reserved={inventory_item.reserved_qty}"
                 )
             
-            with transaction.atomic():
-                # Create movement first (before update)
-                movement = InventoryMovement.create_movement(
-                    inventory_item=inventory_item,
-                    movement_type='adjustment',
-                    quantity=quantity_delta,
-                    notes=notes,
-                    user=user,
-                )
-                
-                # Update stock
-                inventory_item.available_qty = new_qty
-                inventory_item.increment_version()
-                inventory_item.update_movement_timestamp()
-                inventory_item.save(update_fields=[
-                    'available_qty', 'version', 'last_movement_at', 'updated_at'
-                ])
-                
-                logger.info(
-                    f"Adjusted {inventory_item.sku} by {quantity_delta:+d} "
-                    f"(now {new_qty})"
-                )
-                
-                return movement
+            # Create movement first (before update)
+            movement = InventoryMovement.create_movement(
+                inventory_item=inventory_item,
+                movement_type='adjustment',
+                quantity=quantity_delta,
+                notes=notes,
+                user=user,
+            )
+            
+            # Update stock
+            inventory_item.available_qty = new_qty
+            inventory_item.increment_version()
+            inventory_item.update_movement_timestamp()
+            InventoryService._save_fenced(inventory_item, lock.fencing_token, [
+                'available_qty', 'version', 'last_movement_at',
+            ])
+            
+            logger.info(
+                f"Adjusted {inventory_item.sku} by {quantity_delta:+d} "
+                f"(now {new_qty})"
+            )
+            
+            return movement
     
     @staticmethod
     def transfer_stock(
@@ -273,17 +596,19 @@ class InventoryService:
             quantity: Amount to transfer
             notes: Transfer notes
             user: User performing transfer
-            
+        
         Returns:
             Tuple of (outbound movement, inbound movement)
-            
+        
         Raises:
             InsufficientStockError: If source doesn't have enough stock
         """
         # Use MultiItemLock to prevent deadlocks
-        with MultiItemLock([from_item.id, to_item.id]):
-            from_item.refresh_from_db()
-            to_item.refresh_from_db()
+        with MultiItemLock([from_item.id, to_item.id]) as locks, transaction.atomic():
+            # Row locks (in id order) as well: conditional reservations
+            # change reserved_qty without the Redis lock
+            for item in sorted((from_item, to_item), key=lambda item: str(item.pk)):
+                item.refresh_from_db(from_queryset=InventoryItem.objects.select_for_update())
             
             # Check source has enough stock
             if from_item.net_qty < quantity:
@@ -292,51 +617,51 @@ class InventoryService:
                     f"Available: {from_item.net_qty}"
                 )
             
-            with transaction.atomic():
-                # Create outbound movement
-                out_movement = InventoryMovement.create_movement(
-                    inventory_item=from_item,
-                    movement_type='transfer_out',
-                    quantity=-quantity,
-                    reference_type='transfer',
-                    reference_id=to_item.id,
-                    notes=notes,
-                    user=user,
-                )
-                
-                # Create inbound movement
-                in_movement = InventoryMovement.create_movement(
-                    inventory_item=to_item,
-                    movement_type='transfer_in',
-                    quantity=quantity,
-                    reference_type='transfer',
-                    reference_id=from_item.id,
-                    notes=notes,
-                    user=user,
-                )
-                
-                # Update source
-                from_item.available_qty -= quantity
-                from_item.increment_version()
-                from_item.update_movement_timestamp()
-                from_item.save(update_fields=[
-                    'available_qty', 'version', 'last_movement_at', 'updated_at'
-                ])
-                
-                # Update destination
-                to_item.available_qty += quantity
-                to_item.increment_version()
-                to_item.update_movement_timestamp()
-                to_item.save(update_fields=[
-                    'available_qty', 'version', 'last_movement_at', 'updated_at'
-                ])
-                
-                logger.info(
-                    f"Transferred {quantity}x from {from_item.location.code} "
-                    f"to {to_item.location.code}"
-                )
-                
-                return out_movement, in_movement
+            # Create outbound movement
+            out_movement = InventoryMovement.create_movement(
+                inventory_item=from_item,
+                movement_type='transfer_out',
+                quantity=-quantity,
+                reference_type='transfer',
+                reference_id=to_item.id,
+                notes=notes,
+                user=user,
+            )
+            
+            # Create inbound movement
+            in_movement = InventoryMovement.create_movement(
+                inventory_item=to_item,
+                movement_type='transfer_in',
+                quantity=quantity,
+                reference_type='transfer',
+                reference_id=from_item.id,
+                notes=notes,
+                user=user,
+            )
+            
+            # Update source
+            fencing_tokens = locks.fencing_tokens
+            from_item.available_qty -= quantity
+            from_item.increment_version()
+            from_item.update_movement_timestamp()
+            InventoryService._save_fenced(from_item, fencing_tokens[str(from_item.id)], [
+                'available_qty', 'version', 'last_movement_at',
+            ])
+            
+            # Update destination
+            to_item.available_qty += quantity
+            to_item.increment_version()
+            to_item.update_movement_timestamp()
+            InventoryService._save_fenced(to_item, fencing_tokens[str(to_item.id)], [
+                'available_qty', 'version', 'last_movement_at',
+            ])
+            
+            logger.info(
+                f"Transferred {quantity}x from {from_item.location.code} "
+                f"to {to_item.location.code}"
+            )
+            
+            return out_movement, in_movement
     
     @staticmethod
     def receive_stock(
@@ -357,38 +682,71 @@ class InventoryService:
             notes: Receipt notes
             reference_id: Optional purchase order reference
             user: User receiving the stock
-            
+        
         Returns:
             Created InventoryMovement
         """
-        with InventoryLock(inventory_item.id):
-            inventory_item.refresh_from_db()
+        with InventoryLock(inventory_item.id) as lock, transaction.atomic():
+            inventory_item.refresh_from_db(from_queryset=InventoryItem.objects.select_for_update())
             
-            with transaction.atomic():
-                # Create movement
-                movement = InventoryMovement.create_movement(
-                    inventory_item=inventory_item,
-                    movement_type='purchase',
-                    quantity=quantity,
-                    reference_type='purchase_order' if reference_id else '',
-                    reference_id=reference_id,
-                    notes=notes,
-                    user=user,
-                )
-                
-                # Update stock
-                inventory_item.available_qty += quantity
-                if unit_cost:
-                    inventory_item.unit_cost = unit_cost
-                inventory_item.increment_version()
-                inventory_item.update_movement_timestamp()
-                inventory_item.save()
-                
-                logger.info(
-                    f"Received {quantity}x {inventory_item.sku}"
-                )
-                
-                return movement
+            # Create movement
+            movement = InventoryMovement.create_movement(
+                inventory_item=inventory_item,
+                movement_type='purchase',
+                quantity=quantity,
+                reference_type='purchase_order' if reference_id else '',
+                reference_id=reference_id,
+                notes=notes,
+                user=user,
+            )
+            
+            # Update stock
+            inventory_item.available_qty += quantity
+            if unit_cost:
+                inventory_item.unit_cost = unit_cost
+            inventory_item.increment_version()
+            inventory_item.update_movement_timestamp()
+            InventoryService._save_fenced(inventory_item, lock.fencing_token, [
+                'available_qty', 'unit_cost', 'version', 'last_movement_at',
+            ])
+            
+            logger.info(
+                f"Received {quantity}x {inventory_item.sku}"
+            )
+            
+            return movement
+    
+    @staticmethod
+    def _save_fenced(
+        inventory_item: InventoryItem,
+        fencing_token: int,
+        fields: List[str],
+    ) -> None:
+        """
+        Write item fields unless a newer lock holder has written the row.
+        
+        Args:
+            inventory_item: Item with updated field values
+            fencing_token: Token of the lock held for this write
+            fields: Field names to write
+        
+        Raises:
+            LockTimeoutError: If the lock expired and a newer holder wrote
+        """
+        inventory_item.lock_token = fencing_token
+        updated = InventoryItem.objects.filter(
+            pk=inventory_item.pk,
+            lock_token__lte=fencing_token,
+        ).update(
+            lock_token=fencing_token,
+            updated_at=timezone.now(),
+            **{field: getattr(inventory_item, field) for field in fields},
+        )
+        
+        if updated == 0:
+            raise LockTimeoutError(
+                f"Lock on {inventory_item.sku} expired and was taken by a newer holder"
+            )
     
     @staticmethod
     def check_low_stock(company) -> List[InventoryItem]:
@@ -397,7 +755,7 @@ class InventoryService:
         
         Args:
             company: Company to check
-            
+        
         Returns:
             List of InventoryItems with low stock
         """
@@ -426,7 +784,7 @@ class InventoryService:
         Args:
             product: Product to check
             company: Optional company filter
-            
+        
         Returns:
             Dict with total_available, total_reserved, by_location
         """
@@ -467,30 +825,129 @@ class InventoryService:
         
         Args:
             company: Optional company filter
-            
+        
         Returns:
             Count of expired reservations
         """
+        return sum(
+            InventoryService.sweep_expired_reservations(company=company).values()
+        )
+    
+    @staticmethod
+    def sweep_expired_reservations(
+        company=None,
+        batch_size: int = RESERVATION_SWEEP_BATCH_SIZE,
+        max_batches: Optional[int] = None,
+    ) -> Dict[str, int]:
+        """
+        Expire pending reservations past their expiry in set-based chunks.
+        
+        Each chunk is its own transaction: the reservations are claimed
+        with SELECT ... FOR UPDATE SKIP LOCKED (oldest first, using the
+        pending-expiry index), marked expired with one UPDATE, their
+        reserved_qty returned with one grouped UPDATE per chunk, and
+        their return movements written with bulk_create. A sweep that is
+        stopped part way resumes from the next pending reservation, and
+        concurrent sweepers do not block each other.
+        
+        Args:
+            company: Optional company filter
+            batch_size: Reservations per chunk
+            max_batches: Stop after this many chunks (default: drain all)
+        
+        Returns:
+            Dict of company ID to count of expired reservations
+        """
+        counts: Dict[str, int] = {}
+        batches = 0
+        
+        while max_batches is None or batches < max_batches:
+            expired = InventoryService._expire_reservation_batch(company, batch_size)
+            if not expired:
+                break
+            batches += 1
+            for company_id, count in expired.items():
+                counts[company_id] = counts.get(company_id, 0) + count
+            if sum(expired.values()) < batch_size:
+                break
+        
+        total = sum(counts.values())
+        if total > 0:
+            logger.info(f"Expired {total} reservations in {batches} batches")
+        
+        return counts
+    
+    @staticmethod
+    def _expire_reservation_batch(company, batch_size: int) -> Dict[str, int]:
+        """Expire one chunk of reservations; returns counts by company ID."""
         now = timezone.now()
         
         queryset = InventoryReservation.objects.filter(
             status='pending',
             expires_at__lt=now,
         )
-        
         if company:
             queryset = queryset.filter(inventory_item__company=company)
         
-        count = 0
-        for reservation in queryset.select_related('inventory_item'):
-            try:
-                reservation.expire()
-                InventoryService.release_reservation(reservation)
-                count += 1
-            except Exception as e:
-                logger.error(f"Error expiring reservation {reservation.id}: {e}")
-        
-        if count > 0:
-            logger.info(f"Expired {count} reservations")
+        with transaction.atomic():
+            batch = list(
+                queryset.select_for_update(skip_locked=True, of=('self',))
+                .order_by('expires_at', 'id')
+                .values('id', 'inventory_item_id', 'quantity')[:batch_size]
+            )
+            if not batch:
+                return {}
+            
+            InventoryReservation.objects.filter(
+                id__in=[row['id'] for row in batch],
+            ).update(status='expired', released_at=now)
+            
+            totals: Dict[Any, int] = {}
+            for row in batch:
+                totals[row['inventory_item_id']] = (
+                    totals.get(row['inventory_item_id'], 0) + row['quantity']
+                )
+            
+            # Bumping version makes in-flight optimistic updates retry
+            InventoryItem.objects.filter(pk__in=list(totals)).update(
+                reserved_qty=Greatest(
+                    F('reserved_qty') - Case(
+                        *[When(pk=pk, then=Value(quantity)) for pk, quantity in totals.items()],
+                        output_field=IntegerField(),
+                    ),
+                    Value(0),
+                ),
+                version=F('version') + 1,
+                last_movement_at=now,
+                updated_at=now,
+            )
+            
+            items = {
+                row['pk']: row
+                for row in InventoryItem.objects.filter(pk__in=list(totals))
+                .values('pk', 'company_id', 'available_qty')
+            }
+            
+            InventoryMovement.objects.bulk_create([
+                InventoryMovement(
+                    id=uuid.uuid4(),
+                    company_id=items[row['inventory_item_id']]['company_id'],
+                    inventory_item_id=row['inventory_item_id'],
+                    movement_type='return',
+                    quantity=row['quantity'],
+                    quantity_before=items[row['inventory_item_id']]['available_qty'],
+                    quantity_after=(
+                        items[row['inventory_item_id']]['available_qty'] + row['quantity']
+                    ),
+                    reference_type='reservation_release',
+                    reference_id=row['id'],
+                    notes="Reservation expired",
+                )
+                for row in batch
+            ])
         
-        return count
+        counts: Dict[str, int] = {}
+        for row in batch:
+            company_id = str(items[row['inventory_item_id']]['company_id'])
+            counts[company_id] = counts.get(company_id, 0) + 1
+        return counts
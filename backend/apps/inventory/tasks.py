@@ -15,32 +15,26 @@ logger = logging.getLogger(__name__)
 
 
 @shared_task(name='inventory.cleanup_expired_reservations')
-def cleanup_expired_reservations() -> dict:
+def cleanup_expired_reservations(max_batches: int = None) -> dict:
     """
     Clean up expired inventory reservations (periodic task).
     
     Should be scheduled to run every 5-10 minutes via Celery Beat.
+    Sweeps all companies in set-based chunks; a run stopped by
+    max_batches leaves the rest for the next run.
+    
+    Args:
+        max_batches: Optional cap on chunks processed in this run
     
     Returns:
         Dict with count of expired reservations per company
     """
     from apps.inventory.services import InventoryService
-    from apps.accounts.models import Company
-    
-    results = {}
-    total = 0
     
-    for company in Company.objects.filter(is_active=True):
-        try:
-            count = InventoryService.cleanup_expired_reservations(company=company)
-            if count > 0:
-                results[str(company.id)] = count
-                total += count
-        except Exception as e:
-            logger.error(f"Error cleaning up reservations for {company.id}: {e}")
+    results = InventoryService.sweep_expired_reservations(max_batches=max_batches)
     
     return {
-        'total_expired': total,
+        'total_expired': sum(results.values()),
         'by_company': results,
         'timestamp': timezone.now().isoformat(),
     }
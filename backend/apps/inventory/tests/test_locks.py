@@ -5,9 +5,12 @@ import pytest
 from unittest.mock import patch, MagicMock
 import uuid
 
+from django.core.cache.backends.redis import RedisCacheClient
+
 from apps.inventory.locks import (
     InventoryLock, MultiItemLock,
     LockAcquisitionError, LockTimeoutError,
+    CacheLockBackend, RedisLockBackend, get_lock_backend, get_lock_contention,
 )
 
 
@@ -118,15 +121,108 @@ class TestInventoryLock:
         mock_cache.set.assert_called_once()
 
 
+    @patch('apps.inventory.locks.cache')
+    def test_acquire_sets_fencing_token(self, mock_cache):
+        """Test acquisition draws a fencing token."""
+        mock_cache.add.return_value = True
+        mock_cache.incr.return_value = 42
+        
+        lock = InventoryLock(item_id=uuid.uuid4())
+        lock.acquire()
+        
+        assert lock.fencing_token == 42
+        mock_cache.incr.assert_called_once_with(lock.fence_key)
+    
+    @patch('apps.inventory.locks.cache')
+    def test_fence_counter_seeded_when_missing(self, mock_cache):
+        """Test a missing fence counter is seeded before incrementing."""
+        mock_cache.add.return_value = True
+        mock_cache.incr.side_effect = [ValueError("missing"), 7]
+        
+        lock = InventoryLock(item_id=uuid.uuid4())
+        lock.acquire()
+        
+        assert lock.fencing_token == 7
+        assert mock_cache.add.call_count == 2
+
+
+class TestRedisLockBackend:
+    """Tests for the Lua-scripted Redis lock backend."""
+    
+    def _backend(self):
+        client = MagicMock()
+        client.register_script.side_effect = lambda script: MagicMock()
+        return RedisLockBackend(client)
+    
+    @patch('apps.inventory.locks.cache')
+    def test_acquire_returns_token(self, mock_cache):
+        """Test a successful acquire returns the script's token."""
+        mock_cache.make_key.side_effect = lambda key: f":1:{key}"
+        backend = self._backend()
+        backend._acquire.return_value = 1001
+        
+        token = backend.acquire('inventory:lock:x', 'inventory:fence:x', 'owner', 15)
+        
+        assert token == 1001
+        backend._acquire.assert_called_once_with(
+            keys=[':1:inventory:lock:x', ':1:inventory:fence:x'],
+            args=['owner', 15000],
+        )
+    
+    @patch('apps.inventory.locks.cache')
+    def test_acquire_contended_returns_none(self, mock_cache):
+        """Test a held lock yields no token."""
+        backend = self._backend()
+        backend._acquire.return_value = 0
+        
+        assert backend.acquire('k', 'f', 'owner', 15) is None
+    
+    @patch('apps.inventory.locks.cache')
+    def test_release_is_single_script_call(self, mock_cache):
+        """Test release is one compare-and-delete round trip."""
+        backend = self._backend()
+        backend._release.return_value = 1
+        
+        assert backend.release('k', 'owner') == 1
+        backend._release.assert_called_once()
+        mock_cache.get.assert_not_called()
+        mock_cache.delete.assert_not_called()
+    
+    @patch('apps.inventory.locks.cache')
+    def test_lock_release_owner_mismatch(self, mock_cache):
+        """Test InventoryLock reports a re-taken lock as not released."""
+        redis_client = MagicMock(spec=RedisCacheClient)
+        redis_client.get_client.return_value.register_script.side_effect = (
+            lambda script: MagicMock(return_value=-1)
+        )
+        mock_cache._cache = redis_client
+        
+        lock = InventoryLock(item_id=uuid.uuid4())
+        lock._acquired = True
+        
+        assert lock.release() is False
+        assert lock._acquired is False
+    
+    @patch('apps.inventory.locks.cache')
+    def test_backend_selection(self, mock_cache):
+        """Test Redis scripts are used only with the Redis cache."""
+        assert isinstance(get_lock_backend(), CacheLockBackend)
+        
+        mock_cache._cache = MagicMock(spec=RedisCacheClient)
+        backend = get_lock_backend()
+        
+        assert isinstance(backend, RedisLockBackend)
+        assert get_lock_backend() is backend
+
+
 class TestMultiItemLock:
     """Tests for MultiItemLock."""
     
-    @patch('apps.inventory.locks.InventoryLock')
-    def test_multi_lock_acquire(self, MockLock):
+    @patch('apps.inventory.locks.cache')
+    def test_multi_lock_acquire(self, mock_cache):
         """Test acquiring multiple locks."""
-        mock_lock_instance = MagicMock()
-        mock_lock_instance.acquire.return_value = True
-        MockLock.return_value = mock_lock_instance
+        mock_cache.add.return_value = True
+        mock_cache.incr.side_effect = [11, 12]
         
         item_ids = [uuid.uuid4(), uuid.uuid4()]
         multi_lock = MultiItemLock(item_ids)
@@ -135,19 +231,15 @@ class TestMultiItemLock:
         
         assert result is True
         assert len(multi_lock.locks) == 2
+        assert sorted(multi_lock.fencing_tokens.values()) == [11, 12]
+        assert all(lock.owner == multi_lock.owner for lock in multi_lock.locks)
     
-    @patch('apps.inventory.locks.InventoryLock')
-    def test_multi_lock_consistent_order(self, MockLock):
+    @patch('apps.inventory.locks.get_lock_backend')
+    def test_multi_lock_consistent_order(self, mock_get_backend):
         """Test locks are acquired in consistent order to prevent deadlocks."""
-        captured_ids = []
-        
-        def track_lock_creation(item_id, timeout):
-            captured_ids.append(str(item_id))
-            mock = MagicMock()
-            mock.acquire.return_value = True
-            return mock
-        
-        MockLock.side_effect = track_lock_creation
+        backend = MagicMock()
+        backend.acquire_many.return_value = ([1, 2], [])
+        mock_get_backend.return_value = backend
         
         # Create locks in any order
         id1 = uuid.UUID('aaaaaaaa-aaaa-aaaa-aaaa-aaaaaaaaaaaa')
@@ -156,26 +248,77 @@ class TestMultiItemLock:
         multi_lock = MultiItemLock([id2, id1])  # Passed in reverse order
         multi_lock.acquire()
         
-        # Should be sorted alphabetically
-        assert captured_ids[0] < captured_ids[1]
+        # Should be sorted alphabetically, in a single backend call
+        backend.acquire_many.assert_called_once()
+        keys = backend.acquire_many.call_args[0][0]
+        assert keys == [f"inventory:lock:{id1}", f"inventory:lock:{id2}"]
     
-    @patch('apps.inventory.locks.InventoryLock')
-    def test_multi_lock_release_on_failure(self, MockLock):
-        """Test all locks are released if one acquisition fails."""
-        first_lock = MagicMock()
-        first_lock.acquire.return_value = True
-        first_lock.release.return_value = True
+    @patch('apps.inventory.locks.time.sleep')
+    @patch('apps.inventory.locks.get_lock_backend')
+    def test_multi_lock_backs_off_as_unit(self, mock_get_backend, mock_sleep):
+        """Test contention retries the whole set, not one item."""
+        backend = MagicMock()
+        backend.acquire_many.side_effect = [(None, [1]), ([5, 6], [])]
+        mock_get_backend.return_value = backend
         
-        second_lock = MagicMock()
-        second_lock.acquire.side_effect = LockAcquisitionError("Failed")
+        multi_lock = MultiItemLock([uuid.uuid4(), uuid.uuid4()])
         
-        MockLock.side_effect = [first_lock, second_lock]
+        assert multi_lock.acquire() is True
+        assert backend.acquire_many.call_count == 2
+        mock_sleep.assert_called_once()
+    
+    @patch('apps.inventory.locks.time.sleep')
+    @patch('apps.inventory.locks.get_lock_backend')
+    def test_multi_lock_failure_after_retries(self, mock_get_backend, mock_sleep):
+        """Test failure names the contended item and holds nothing."""
+        backend = MagicMock()
+        backend.acquire_many.return_value = (None, [0])
+        mock_get_backend.return_value = backend
         
-        item_ids = [uuid.uuid4(), uuid.uuid4()]
-        multi_lock = MultiItemLock(item_ids)
+        multi_lock = MultiItemLock([uuid.uuid4()], max_retries=2)
         
-        with pytest.raises(LockAcquisitionError):
+        with pytest.raises(LockAcquisitionError, match=multi_lock.item_ids[0]):
             multi_lock.acquire()
         
-        # First lock should have been released
-        first_lock.release.assert_called_once()
+        assert backend.acquire_many.call_count == 3
+        assert multi_lock.locks == []
+    
+    @patch('apps.inventory.locks.cache')
+    def test_cache_backend_rolls_back_partial_claim(self, mock_cache):
+        """Test all locks are released if one key is already held."""
+        mock_cache.add.side_effect = [True, False, True]
+        mock_cache.get.return_value = 'owner'
+        
+        tokens, contended = CacheLockBackend().acquire_many(
+            ['lock:a', 'lock:b'], ['fence:a', 'fence:b'],
+            ['contention:a', 'contention:b'], 'owner', 15,
+        )
+        
+        assert tokens is None
+        assert contended == [1]
+        mock_cache.delete.assert_called_once_with('lock:a')
+        mock_cache.incr.assert_called_once_with('contention:b')
+    
+    @patch('apps.inventory.locks.cache')
+    def test_redis_backend_acquire_many_result(self, mock_cache):
+        """Test script results map to tokens or contended indexes."""
+        client = MagicMock()
+        client.register_script.side_effect = lambda script: MagicMock()
+        backend = RedisLockBackend(client)
+        
+        backend._acquire_many.return_value = [1, 101, 102]
+        assert backend.acquire_many(['a', 'b'], ['fa', 'fb'], ['ca', 'cb'], 'o', 15) == (
+            [101, 102], [],
+        )
+        
+        backend._acquire_many.return_value = [0, 2]
+        assert backend.acquire_many(['a', 'b'], ['fa', 'fb'], ['ca', 'cb'], 'o', 15) == (
+            None, [1],
+        )
+    
+    @patch('apps.inventory.locks.cache')
+    def test_get_lock_contention(self, mock_cache):
+        """Test contention counts default to zero."""
+        mock_cache.get_many.return_value = {'inventory:contention:a': 3}
+        
+        assert get_lock_contention(['a', 'b']) == {'a': 3, 'b': 0}
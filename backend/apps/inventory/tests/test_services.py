@@ -1,12 +1,14 @@
 """
 Unit tests for inventory services.
 """
+import threading
 import uuid
 import pytest
 from decimal import Decimal
 from datetime import timedelta
 from unittest.mock import patch, MagicMock
 
+from django.db import connections
 from django.utils import timezone
 
 from apps.inventory.models import InventoryItem, InventoryReservation, InventoryMovement
@@ -99,6 +101,217 @@ class TestInventoryServiceReservation:
         assert reservation.status == 'released'
 
 
+class TestConditionalReservation:
+    """Tests for the lock-free conditional update reservation engine."""
+    
+    def test_reserve_stock_conditional_success(self):
+        """Test reservation and movement are written by the guarded update."""
+        item = InventoryItemFactory(available_qty=100, reserved_qty=0)
+        
+        with patch('apps.inventory.services.inventory_service.InventoryLock') as mock_lock:
+            reservation = InventoryService.reserve_stock(
+                inventory_item=item,
+                quantity=10,
+                order_id=str(uuid.uuid4()),
+                mode='conditional',
+            )
+        
+        mock_lock.assert_not_called()
+        assert reservation.status == 'pending'
+        assert item.reserved_qty == 10
+        
+        item.refresh_from_db()
+        assert item.reserved_qty == 10
+        assert item.version == 2
+        assert InventoryMovement.objects.filter(
+            reference_type='reservation', reference_id=reservation.id,
+        ).exists()
+    
+    def test_reserve_stock_conditional_insufficient(self):
+        """Test the guard rejects reservations beyond net stock."""
+        item = InventoryItemFactory(available_qty=20, reserved_qty=15)
+        
+        with pytest.raises(InsufficientStockError):
+            InventoryService.reserve_stock_conditional(
+                inventory_item=item,
+                quantity=10,
+                order_id=str(uuid.uuid4()),
+            )
+        
+        item.refresh_from_db()
+        assert item.reserved_qty == 15
+        assert not InventoryReservation.objects.filter(inventory_item=item).exists()
+    
+    def test_reserve_stock_conditional_uses_stored_quantities(self):
+        """Test the guard checks the row, not the stale instance."""
+        item = InventoryItemFactory(available_qty=10, reserved_qty=0)
+        InventoryItem.objects.filter(pk=item.pk).update(reserved_qty=8)
+        
+        with pytest.raises(InsufficientStockError):
+            InventoryService.reserve_stock_conditional(
+                inventory_item=item,
+                quantity=5,
+                order_id=str(uuid.uuid4()),
+            )
+    
+    def test_reservation_mode_from_company_setting(self):
+        """Test the engine is selected per company."""
+        company = CompanyFactory(settings={'inventory_reservation_mode': 'conditional'})
+        item = InventoryItemFactory(company=company, available_qty=10)
+        
+        assert InventoryService.get_reservation_mode(company) == 'conditional'
+        
+        with patch.object(
+            InventoryService, 'reserve_stock_conditional',
+        ) as mock_conditional:
+            InventoryService.reserve_stock(item, 1, str(uuid.uuid4()))
+        
+        mock_conditional.assert_called_once()
+    
+    def test_unknown_reservation_mode_falls_back_to_lock(self):
+        """Test an invalid setting falls back to the lock engine."""
+        company = CompanyFactory(settings={'inventory_reservation_mode': 'bogus'})
+        
+        assert InventoryService.get_reservation_mode(company) == 'lock'
+    
+    def test_release_keeps_concurrent_conditional_reservation(self):
+        """Test releasing is relative to reservations made without the lock."""
+        item = InventoryItemFactory(available_qty=100, reserved_qty=10)
+        reservation = InventoryReservationFactory(inventory_item=item, quantity=10, status='pending')
+        
+        InventoryService.reserve_stock_conditional(
+            InventoryItem.objects.get(pk=item.pk), 5, str(uuid.uuid4()),
+        )
+        InventoryService.release_reservation(reservation)
+        
+        item.refresh_from_db()
+        assert item.reserved_qty == 5
+    
+    @pytest.mark.django_db(transaction=True)
+    def test_sweep_skips_reservation_being_released(self):
+        """Test a sweep running during a release leaves the reservation to it."""
+        item = InventoryItemFactory(available_qty=100, reserved_qty=15)
+        reservation = InventoryReservationFactory(
+            inventory_item=item,
+            quantity=10,
+            status='pending',
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        swept = {}
+        release = InventoryReservation.release
+        
+        def release_during_sweep(instance):
+            # release_reservation holds the reservation row lock here
+            def sweep():
+                try:
+                    swept.update(InventoryService.sweep_expired_reservations())
+                finally:
+                    connections.close_all()
+            
+            thread = threading.Thread(target=sweep)
+            thread.start()
+            thread.join()
+            release(instance)
+        
+        with patch.object(InventoryReservation, 'release', release_during_sweep):
+            InventoryService.release_reservation(reservation)
+        
+        assert swept == {}
+        item.refresh_from_db()
+        reservation.refresh_from_db()
+        assert reservation.status == 'released'
+        assert item.reserved_qty == 5
+    
+    def test_swept_reservation_cannot_be_released_or_confirmed(self):
+        """Test a stale copy of an expired reservation changes nothing."""
+        item = InventoryItemFactory(available_qty=100, reserved_qty=15)
+        reservation = InventoryReservationFactory(
+            inventory_item=item,
+            quantity=10,
+            status='pending',
+            expires_at=timezone.now() - timedelta(minutes=1),
+        )
+        stale = InventoryReservation.objects.get(pk=reservation.pk)
+        InventoryService.sweep_expired_reservations()
+        
+        InventoryService.release_reservation(stale)
+        with pytest.raises(ValueError):
+            InventoryService.confirm_reservation(reservation)
+        
+        item.refresh_from_db()
+        assert item.reserved_qty == 5
+
+
+class TestReserveOrder:
+    """Tests for whole-order batch reservations."""
+    
+    @pytest.mark.parametrize('mode', ['lock', 'conditional'])
+    def test_reserve_order_success(self, mode):
+        """Test every line is reserved with one reservation per line."""
+        company = CompanyFactory()
+        first = InventoryItemFactory(company=company, available_qty=10)
+        second = InventoryItemFactory(company=company, available_qty=5)
+        order_id = str(uuid.uuid4())
+        
+        reservations = InventoryService.reserve_order(
+            order_id, [(first, 3), (second, 5), (first, 2)], mode=mode,
+        )
+        
+        assert [r.quantity for r in reservations] == [3, 5, 2]
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert first.reserved_qty == 5
+        assert second.reserved_qty == 5
+        assert InventoryMovement.objects.filter(
+            reference_type='reservation',
+            reference_id__in=[r.id for r in reservations],
+        ).count() == 3
+    
+    @pytest.mark.parametrize('mode', ['lock', 'conditional'])
+    def test_reserve_order_all_or_nothing(self, mode):
+        """Test one short line reserves nothing."""
+        company = CompanyFactory()
+        first = InventoryItemFactory(company=company, available_qty=10)
+        second = InventoryItemFactory(company=company, available_qty=1)
+        
+        with pytest.raises(InsufficientStockError, match=second.sku):
+            InventoryService.reserve_order(
+                str(uuid.uuid4()), [(first, 3), (second, 2)], mode=mode,
+            )
+        
+        first.refresh_from_db()
+        assert first.reserved_qty == 0
+        assert not InventoryReservation.objects.filter(
+            inventory_item__in=[first, second],
+        ).exists()
+    
+    def test_reserve_order_checks_repeated_item_total(self):
+        """Test repeated lines of one item are checked together."""
+        item = InventoryItemFactory(available_qty=4)
+        
+        with pytest.raises(InsufficientStockError):
+            InventoryService.reserve_order(
+                str(uuid.uuid4()), [(item, 3), (item, 2)], mode='conditional',
+            )
+    
+    def test_reserve_order_queries_do_not_scale_with_lines(self, django_assert_max_num_queries):
+        """Test query count is independent of the number of lines."""
+        company = CompanyFactory()
+        items = [InventoryItemFactory(company=company, available_qty=10) for _ in range(20)]
+        
+        with django_assert_max_num_queries(8):
+            InventoryService.reserve_order(
+                str(uuid.uuid4()), [(item, 1) for item in items], mode='conditional',
+            )
+    
+    def test_reserve_order_rejects_non_positive_quantity(self):
+        """Test zero quantities are rejected."""
+        item = InventoryItemFactory(available_qty=4)
+        
+        with pytest.raises(ValueError):
+            InventoryService.reserve_order(str(uuid.uuid4()), [(item, 0)])
+
+
 class TestInventoryServiceAdjustment:
     """Tests for stock adjustment operations."""
     
@@ -165,6 +378,30 @@ class TestInventoryServiceAdjustment:
 class TestInventoryServiceTransfer:
     """Tests for stock transfer operations."""
     
+    def test_adjust_stock_records_fencing_token(self):
+        """Test item writes record the lock's fencing token."""
+        item = InventoryItemFactory(available_qty=10, reserved_qty=0)
+        
+        InventoryService.adjust_stock(item, quantity_delta=5)
+        
+        item.refresh_from_db()
+        assert item.available_qty == 15
+        assert item.lock_token > 0
+    
+    def test_stale_fencing_token_rejected(self):
+        """Test a write with an older fencing token is rejected."""
+        from apps.inventory.locks import LockTimeoutError
+        
+        item = InventoryItemFactory(available_qty=10, reserved_qty=0)
+        InventoryItem.objects.filter(pk=item.pk).update(lock_token=100)
+        
+        item.available_qty = 99
+        with pytest.raises(LockTimeoutError):
+            InventoryService._save_fenced(item, 99, ['available_qty'])
+        
+        item.refresh_from_db()
+        assert item.available_qty == 10
+    
     def test_transfer_stock_success(self):
         """Test successful stock transfer."""
         company = CompanyFactory()
@@ -310,3 +547,37 @@ class TestInventoryServiceUtilities:
         
         active.refresh_from_db()
         assert active.status == 'pending'
+        
+        item.refresh_from_db()
+        assert item.reserved_qty == 0
+        assert InventoryMovement.objects.filter(
+            reference_type='reservation_release', reference_id=expired.id,
+        ).exists()
+    
+    def test_sweep_expired_reservations_in_chunks(self):
+        """Test the sweeper drains a backlog in bounded, resumable chunks."""
+        company = CompanyFactory()
+        item = InventoryItemFactory(company=company, available_qty=100, reserved_qty=5)
+        reservations = [
+            InventoryReservationFactory(
+                inventory_item=item,
+                quantity=1,
+                expires_at=timezone.now() - timedelta(minutes=i + 1),
+            )
+            for i in range(5)
+        ]
+        
+        first = InventoryService.sweep_expired_reservations(batch_size=2, max_batches=1)
+        assert first == {str(company.id): 2}
+        
+        item.refresh_from_db()
+        assert item.reserved_qty == 3
+        
+        rest = InventoryService.sweep_expired_reservations(batch_size=2)
+        assert rest == {str(company.id): 3}
+        
+        item.refresh_from_db()
+        assert item.reserved_qty == 0
+        assert InventoryReservation.objects.filter(
+            id__in=[r.id for r in reservations], status='expired',
+        ).count() == 5
@@ -8,6 +8,7 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 
+from core.eager_loading import EagerLoadingMixin
 from core.permissions import IsCompanyMember
 from apps.inventory.models import (
     Location, InventoryItem, InventoryReservation, InventoryMovement,
@@ -23,7 +24,7 @@ from apps.inventory.serializers import (
 from apps.inventory.services import InventoryService, InsufficientStockError
 
 
-class LocationViewSet(viewsets.ModelViewSet):
+class LocationViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for inventory locations."""
     
     permission_classes = [IsAuthenticated, IsCompanyMember]
@@ -48,7 +49,7 @@ class LocationViewSet(viewsets.ModelViewSet):
         serializer.save(company=self.request.user.company)
 
 
-class InventoryItemViewSet(viewsets.ModelViewSet):
+class InventoryItemViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
     """ViewSet for inventory items."""
     
     permission_classes = [IsAuthenticated, IsCompanyMember]
@@ -175,7 +176,7 @@ class InventoryItemViewSet(viewsets.ModelViewSet):
         return Response(levels)
 
 
-class InventoryMovementViewSet(viewsets.ReadOnlyModelViewSet):
+class InventoryMovementViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for inventory movements (read-only audit log)."""
     
     serializer_class = InventoryMovementSerializer
@@ -192,7 +193,7 @@ class InventoryMovementViewSet(viewsets.ReadOnlyModelViewSet):
         ).select_related('inventory_item', 'inventory_item__location', 'created_by')
 
 
-class InventoryReservationViewSet(viewsets.ReadOnlyModelViewSet):
+class InventoryReservationViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """ViewSet for inventory reservations (read-only for admin)."""
     
     serializer_class = InventoryReservationSerializer
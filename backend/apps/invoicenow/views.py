@@ -5,6 +5,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 
+from core.eager_loading import EagerLoadingMixin
 from apps.invoicenow.models import PEPPOLInvoice, PEPPOLAcknowledgment
 from apps.invoicenow.serializers import (
     PEPPOLInvoiceSerializer, PEPPOLInvoiceListSerializer,
@@ -14,7 +15,7 @@ from apps.invoicenow.serializers import (
 from apps.invoicenow.services import PEPPOLService
 
 
-class PEPPOLInvoiceViewSet(viewsets.ReadOnlyModelViewSet):
+class PEPPOLInvoiceViewSet(EagerLoadingMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for PEPPOL invoices.
     
@@ -79,6 +79,18 @@ if os.environ.get('ENABLE_CELERY_BEAT', '') == '1':
             'task': 'apps.accounting.tasks.generate_daily_reports',
             'schedule': crontab(hour=0, minute=30),  # 12:30 AM daily
         },
+        'process-ledger-events': {
+            'task': 'accounting.process_ledger_events',
+            'schedule': crontab(minute='*/5'),
+        },
+        'reconcile-account-balances-daily': {
+            'task': 'accounting.sync_all_account_balances',
+            'schedule': crontab(hour=1, minute=30),  # 1:30 AM daily
+        },
+        'snapshot-ar-aging-daily': {
+            'task': 'accounting.snapshot_ar_aging',
+            'schedule': crontab(hour=0, minute=15),  # 12:15 AM daily
+        },
         'gst-filing-reminder': {
             'task': 'apps.accounting.tasks.gst_filing_reminder',
             'schedule': crontab(day_of_month=1, hour=9, minute=0),  # 1st of month, 9 AM
@@ -0,0 +1,176 @@
+"""
+Eager loading plans for DRF serializers.
+
+Derives the select_related / prefetch_related a serializer needs from
+its fields, so list endpoints run a fixed number of queries however many
+rows they return:
+- Dotted sources ('customer.name') follow forward FK/one-to-one fields
+  and become select_related.
+- Nested serializers become select_related (single) or
+  prefetch_related (many=True), including their own nested needs.
+- Many-related fields become prefetch_related.
+
+Anything that cannot be derived (counts, SerializerMethodField reads)
+is declared on the serializer with a setup_eager_loading classmethod,
+which receives the queryset after the derived plan is applied.
+
+Instances that are already loaded (e.g. a cart from get_or_create)
+get the derived plan with prefetch_instances.
+
+Usage:
+    class OrderViewSet(EagerLoadingMixin, viewsets.ModelViewSet):
+        ...
+    
+    class OrderListSerializer(serializers.ModelSerializer):
+        @classmethod
+        def setup_eager_loading(cls, queryset):
+            return queryset.annotate(item_count=Count('items'))
+"""
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+
+
+# (serializer class, model) -> derived plan
+_plans: Dict[tuple, Tuple[Set[str], Set[str]]] = {}
+_plans_lock = threading.Lock()
+
+
+def _forward_path(model, parts) -> Optional[str]:
+    """Join parts that are all forward FK/one-to-one fields, else None."""
+    for part in parts:
+        try:
+            field = model._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if not (field.many_to_one or field.one_to_one) or field.related_model is None:
+            return None
+        model = field.related_model
+    return '__'.join(parts)
+
+
+def _related_model(model, name: str):
+    try:
+        return model._meta.get_field(name).related_model
+    except FieldDoesNotExist:
+        return None
+
+
+def derive_plan(serializer_class, model) -> Tuple[Set[str], Set[str]]:
+    """
+    Derive the related lookups a serializer reads.
+    
+    Args:
+        serializer_class: Serializer class (or instance)
+        model: Model the serializer represents
+    
+    Returns:
+        Tuple of (select_related lookups, prefetch_related lookups)
+    """
+    serializer = serializer_class() if isinstance(serializer_class, type) else serializer_class
+    select: Set[str] = set()
+    prefetch: Set[str] = set()
+    
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        parts = field.source.split('.')
+        
+        if isinstance(field, serializers.ListSerializer):
+            related = _related_model(model, parts[0])
+            if len(parts) != 1 or related is None:
+                continue
+            prefetch.add(parts[0])
+            child_select, child_prefetch = derive_plan(field.child, related)
+            prefetch.update(f'{parts[0]}__{lookup}' for lookup in child_select | child_prefetch)
+        elif isinstance(field, serializers.BaseSerializer):
+            path = _forward_path(model, parts)
+            if path is None:
+                continue
+            select.add(path)
+            related = _related_model(model, parts[0]) if len(parts) == 1 else None
+            if related is not None:
+                child_select, child_prefetch = derive_plan(field, related)
+                select.update(f'{path}__{lookup}' for lookup in child_select)
+                prefetch.update(f'{path}__{lookup}' for lookup in child_prefetch)
+        elif isinstance(field, serializers.ManyRelatedField):
+            if len(parts) == 1 and _related_model(model, parts[0]) is not None:
+                prefetch.add(parts[0])
+        elif len(parts) > 1:
+            # 'customer.name' reads customer; 'a.b.c' reads a and a.b
+            path = _forward_path(model, parts[:-1])
+            if path is not None:
+                select.add(path)
+    
+    return select, prefetch
+
+
+def get_plan(serializer_class, model) -> Tuple[Set[str], Set[str]]:
+    """Get the derived plan of a serializer class (cached per class and model)."""
+    key = (serializer_class, model)
+    plan = _plans.get(key)
+    if plan is None:
+        plan = derive_plan(serializer_class, model)
+        with _plans_lock:
+            _plans[key] = plan
+    return plan
+
+
+def plan_queryset(queryset, serializer_class):
+    """
+    Apply a serializer's derived and declared eager loading to a queryset.
+    
+    Args:
+        queryset: QuerySet the serializer will read
+        serializer_class: Serializer class
+    
+    Returns:
+        QuerySet with select_related / prefetch_related (and whatever
+        the serializer's setup_eager_loading adds)
+    """
+    select, prefetch = get_plan(serializer_class, queryset.model)
+    if select:
+        queryset = queryset.select_related(*sorted(select))
+    if prefetch:
+        queryset = queryset.prefetch_related(*sorted(prefetch))
+    
+    setup = getattr(serializer_class, 'setup_eager_loading', None)
+    if setup is not None:
+        queryset = setup(queryset)
+    return queryset
+
+
+def prefetch_instances(instances, serializer_class) -> None:
+    """
+    Load a serializer's derived related lookups onto fetched instances.
+    
+    select_related lookups are prefetched instead (one query per
+    relation). setup_eager_loading is queryset-only and not applied.
+    
+    Args:
+        instances: Model instances of one model
+        serializer_class: Serializer class that will read them
+    """
+    instances = list(instances)
+    if not instances:
+        return
+    select, prefetch = get_plan(serializer_class, type(instances[0]))
+    lookups = sorted(select | prefetch)
+    if lookups:
+        prefetch_related_objects(instances, *lookups)
+
+
+class EagerLoadingMixin:
+    """
+    ViewSet mixin applying the serializer's eager loading plan.
+    
+    The plan is applied in filter_queryset, so it covers list and
+    get_object() with whichever serializer the action uses.
+    """
+    
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        return plan_queryset(queryset, self.get_serializer_class())
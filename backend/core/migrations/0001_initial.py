@@ -0,0 +1,30 @@
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        # Creates the core schema
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentSequence',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('company_id', models.UUIDField(help_text='Company the series belongs to')),
+                ('document_type', models.CharField(help_text='Numbered document type (e.g. invoice, order)', max_length=50)),
+                ('period_key', models.CharField(blank=True, default='', help_text='Period the series restarts on (e.g. 2024, 202403)', max_length=20)),
+                ('last_value', models.BigIntegerField(default=0, help_text='Last number allocated (or reserved as a block)')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': '"core"."document_sequences"',
+                'constraints': [models.UniqueConstraint(fields=('company_id', 'document_type', 'period_key'), name='document_sequence_unique_series')],
+            },
+        ),
+    ]
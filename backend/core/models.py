@@ -6,6 +6,7 @@ These base models provide common fields and functionality for all models:
 - Automatic timestamp tracking
 - Audit fields for user tracking
 - Soft delete support
+- Document numbering sequences (see core.sequences)
 """
 import uuid
 from django.db import models
@@ -160,3 +161,51 @@ class CompanyOwnedModel(SoftDeleteModel):
     
     class Meta:
         abstract = True
+
+
+class DocumentSequence(models.Model):
+    """
+    Per-company counter for a document numbering series.
+    
+    One row per (company, document type, period key), e.g. journal
+    entries for 2024 or orders for 2024-03-15. Allocation goes through
+    core.sequences, never through the ORM.
+    
+    company_id is a plain UUID (no foreign key) so block reservations,
+    which commit on their own connection, never wait on the company row.
+    """
+    id = models.UUIDField(
+        primary_key=True,
+        default=uuid.uuid4,
+        editable=False,
+    )
+    company_id = models.UUIDField(
+        help_text="Company the series belongs to"
+    )
+    document_type = models.CharField(
+        max_length=50,
+        help_text="Numbered document type (e.g. invoice, order)"
+    )
+    period_key = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        help_text="Period the series restarts on (e.g. 2024, 202403)"
+    )
+    last_value = models.BigIntegerField(
+        default=0,
+        help_text="Last number allocated (or reserved as a block)"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = '"core"."document_sequences"'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['company_id', 'document_type', 'period_key'],
+                name='document_sequence_unique_series',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.document_type}:{self.period_key} = {self.last_value}"
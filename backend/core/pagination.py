@@ -0,0 +1,245 @@
+"""
+DRF pagination for Singapore SMB E-commerce Platform.
+
+Provides:
+- Page number pagination (default, unchanged for existing clients)
+- Keyset pagination, opt-in with ?pagination=keyset
+
+Keyset pages filter on the last row's ordering values instead of
+skipping OFFSET rows, so page 5000 costs the same as page 1. The key is
+the view's current ordering (OrderingFilter, then the queryset's or the
+model's ordering, else -created_at) with the primary key appended as a
+tie-breaker. Ordering fields must be non-null.
+
+Usage:
+    GET /api/v1/commerce/orders/?pagination=keyset&status=confirmed
+    -> {"next": ".../?cursor=...", "previous": null, "results": [...]}
+"""
+import base64
+import binascii
+import datetime
+import json
+from typing import Any, List, Optional, Tuple
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def _encode_value(value):
+    """JSON-encode a key value (full microsecond precision for datetimes)."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the view's ordering.
+    
+    Responses have next/previous cursor links and results, but no count
+    (counting would scan the whole filtered set).
+    """
+    
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    
+    def __init__(self, page_size: int = 20):
+        self.page_size = page_size
+    
+    def get_ordering(self, queryset) -> List[str]:
+        """Get the keyset ordering with the primary key tie-breaker."""
+        ordering = list(queryset.query.order_by) or list(queryset.query.get_meta().ordering)
+        if not ordering or not all(isinstance(field, str) for field in ordering):
+            try:
+                queryset.model._meta.get_field('created_at')
+                ordering = ['-created_at']
+            except FieldDoesNotExist:
+                ordering = []
+        
+        names = [field.lstrip('-') for field in ordering]
+        if 'pk' not in names and queryset.model._meta.pk.name not in names:
+            descending = ordering[-1].startswith('-') if ordering else True
+            ordering.append('-pk' if descending else 'pk')
+        return ordering
+    
+    def get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+    
+    def decode_cursor(self, request) -> Tuple[Optional[List[Any]], bool]:
+        """Decode the cursor into (key values, whether paging backwards)."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            return list(payload['v']), bool(payload.get('r', False))
+        except (binascii.Error, ValueError, KeyError, TypeError, UnicodeEncodeError):
+            raise NotFound('Invalid cursor.')
+    
+    def encode_cursor(self, values: List[Any], reverse: bool) -> str:
+        payload = json.dumps({'v': values, 'r': reverse}, default=_encode_value)
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+    
+    def _field(self, model, name: str):
+        """Resolve an ordering name (which may span relations) to a field."""
+        if name == 'pk':
+            return model._meta.pk
+        field = None
+        for part in name.split('__'):
+            field = model._meta.get_field(part)
+            if field.is_relation and field.related_model is not None:
+                model = field.related_model
+        return field
+    
+    def _value(self, obj, name: str):
+        value = obj
+        for part in name.split('__'):
+            value = getattr(value, part)
+        return getattr(value, 'pk', value)
+    
+    def _seek(self, model, ordering: List[str], values: List[Any], reverse: bool) -> Q:
+        """
+        Rows after the key in ordering (before it when reverse).
+        
+        (a, b) > (x, y) is expanded to a > x OR (a = x AND b > y), with
+        the comparison flipped for descending fields.
+        """
+        try:
+            values = [
+                self._field(model, field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values, strict=True)
+            ]
+        except (FieldDoesNotExist, ValidationError, ValueError):
+            raise NotFound('Invalid cursor.')
+        
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            ascending = not field.startswith('-')
+            lookup = 'gt' if ascending != reverse else 'lt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return condition
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size_value = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        
+        values, reverse = self.decode_cursor(request)
+        query_ordering = self.ordering
+        if reverse:
+            query_ordering = [
+                field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering
+            ]
+        
+        queryset = queryset.order_by(*query_ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(queryset.model, self.ordering, values, reverse))
+        
+        rows = list(queryset[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if reverse:
+            rows.reverse()
+        
+        self.has_next = has_more if not reverse else values is not None
+        self.has_previous = values is not None if not reverse else has_more
+        self.page = rows
+        return rows
+    
+    def _link(self, obj, reverse: bool) -> str:
+        values = [self._value(obj, field.lstrip('-')) for field in self.ordering]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(values, reverse))
+    
+    def get_next_link(self) -> Optional[str]:
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+    
+    def get_previous_link(self) -> Optional[str]:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self._link(self.page[0], reverse=True)
+    
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+    
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+    
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset pagination cursor (from next/previous links).',
+                'schema': {'type': 'string'},
+            },
+        ]
+
+
+class StandardPagination(PageNumberPagination):
+    """
+    Page number pagination with opt-in keyset mode.
+    
+    ?pagination=keyset (or a cursor parameter) switches the request to
+    KeysetPagination; otherwise responses are unchanged.
+    """
+    
+    mode_query_param = 'pagination'
+    keyset = None
+    
+    def use_keyset(self, request) -> bool:
+        return (
+            request.query_params.get(self.mode_query_param) == 'keyset'
+            or KeysetPagination.cursor_query_param in request.query_params
+        )
+    
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination(page_size=self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+    
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+    
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                'name': self.mode_query_param,
+                'required': False,
+                'in': 'query',
+                'description': "Set to 'keyset' for cursor-based pages (no count).",
+                'schema': {'type': 'string', 'enum': ['keyset']},
+            },
+        ] + KeysetPagination().get_schema_operation_parameters(view)
@@ -0,0 +1,204 @@
+"""
+Document numbering sequences.
+
+Per-company, per-document-type counters stored in DocumentSequence,
+allocated with a single INSERT ... ON CONFLICT DO UPDATE ... RETURNING
+statement so there is no read-then-increment race.
+
+Two modes:
+- GAPLESS (tax documents: journal entries, invoices): the counter is
+  incremented in the caller's transaction. A rolled-back document rolls
+  its number back too, so numbers never skip; concurrent allocations in
+  the same series wait for each other's commit.
+- FAST (orders): each worker process reserves a block of numbers on its
+  own connection, committed immediately, and hands them out from memory.
+  The series row is touched once per block and never held across the
+  caller's transaction. Unused numbers in a block are skipped. Forked
+  children (prefork Celery, gunicorn) start without the parent's blocks.
+
+Usage:
+    number = next_number(company.id, 'invoice', period_key='202403')
+"""
+import logging
+import os
+import threading
+import uuid
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.utils import timezone
+
+from core.models import DocumentSequence
+
+
+logger = logging.getLogger(__name__)
+
+GAPLESS = 'gapless'
+FAST = 'fast'
+
+# Numbering mode per document type (unknown types are gapless)
+SEQUENCE_MODES = {
+    'journal_entry': GAPLESS,
+    'invoice': GAPLESS,
+    'order': FAST,
+    **getattr(settings, 'SEQUENCE_MODES', {}),
+}
+
+# Numbers reserved per block in FAST mode
+BLOCK_SIZE = getattr(settings, 'SEQUENCE_BLOCK_SIZE', 50)
+
+# In-process blocks: (company_id, document_type, period_key) -> [next, last]
+_blocks: Dict[Tuple[str, str, str], list] = {}
+_blocks_lock = threading.Lock()
+
+
+def _upsert(cursor, company_id, document_type: str, period_key: str, increment: int) -> Tuple[int, bool]:
+    """
+    Add increment to a series, creating it if needed.
+    
+    Returns:
+        Tuple of (new last_value, whether the series was just created)
+    """
+    table = DocumentSequence._meta.db_table
+    cursor.execute(
+        f"INSERT INTO {table} "
+        f"(id, company_id, document_type, period_key, last_value, updated_at) "
+        f"VALUES (%s, %s, %s, %s, %s, %s) "
+        f"ON CONFLICT (company_id, document_type, period_key) DO UPDATE SET "
+        f"last_value = {table}.last_value + EXCLUDED.last_value, "
+        f"updated_at = EXCLUDED.updated_at "
+        f"RETURNING last_value, (xmax = 0)",
+        [uuid.uuid4(), company_id, document_type, period_key, increment, timezone.now()],
+    )
+    last_value, created = cursor.fetchone()
+    return last_value, created
+
+
+def _allocate(
+    cursor,
+    company_id,
+    document_type: str,
+    period_key: str,
+    increment: int,
+    floor: Optional[Callable[[], int]],
+) -> int:
+    """Allocate increment numbers; returns the last one."""
+    last_value, created = _upsert(cursor, company_id, document_type, period_key, increment)
+    if created and floor is not None:
+        # New series over existing documents: continue after the highest
+        offset = floor() or 0
+        if offset > 0:
+            cursor.execute(
+                f"UPDATE {DocumentSequence._meta.db_table} "
+                f"SET last_value = last_value + %s "
+                f"WHERE company_id = %s AND document_type = %s AND period_key = %s "
+                f"RETURNING last_value",
+                [offset, company_id, document_type, period_key],
+            )
+            last_value = cursor.fetchone()[0]
+    return last_value
+
+
+def _reserve_block(company_id, document_type: str, period_key: str, floor) -> list:
+    """Reserve BLOCK_SIZE numbers, committed independently of the caller."""
+    if connection.in_atomic_block:
+        # Commit on a side connection so the series row is not held
+        # (or rolled back) with the caller's transaction. It is opened
+        # per block and closed straight away, so it is not left outside
+        # Django's connection handling.
+        block_connection = connections.create_connection(DEFAULT_DB_ALIAS)
+        try:
+            with block_connection.cursor() as cursor:
+                last_value = _allocate(cursor, company_id, document_type, period_key, BLOCK_SIZE, floor)
+        finally:
+            block_connection.close()
+    else:
+        with connection.cursor() as cursor:
+            last_value = _allocate(cursor, company_id, document_type, period_key, BLOCK_SIZE, floor)
+    
+    logger.debug(
+        f"Reserved {document_type} block {last_value - BLOCK_SIZE + 1}-{last_value} "
+        f"for company {company_id}"
+    )
+    return [last_value - BLOCK_SIZE + 1, last_value]
+
+
+def next_number(
+    company_id,
+    document_type: str,
+    period_key: str = '',
+    floor: Optional[Callable[[], int]] = None,
+    mode: Optional[str] = None,
+) -> int:
+    """
+    Allocate the next number in a series.
+    
+    Args:
+        company_id: Company UUID
+        document_type: Series name (e.g. 'invoice')
+        period_key: Period the series restarts on ('' for never)
+        floor: Called once when the series is first created; returns the
+            highest number already used outside the sequence
+        mode: GAPLESS or FAST (default: SEQUENCE_MODES for the type)
+    
+    Returns:
+        Allocated number (starting at 1)
+    """
+    mode = mode or SEQUENCE_MODES.get(document_type, GAPLESS)
+    
+    if mode == GAPLESS:
+        return next_range(company_id, document_type, 1, period_key, floor)[0]
+    
+    key = (str(company_id), document_type, period_key)
+    with _blocks_lock:
+        block = _blocks.get(key)
+        if block is None or block[0] > block[1]:
+            block = _reserve_block(company_id, document_type, period_key, floor)
+            _blocks[key] = block
+        value = block[0]
+        block[0] += 1
+        return value
+
+
+def next_range(
+    company_id,
+    document_type: str,
+    count: int,
+    period_key: str = '',
+    floor: Optional[Callable[[], int]] = None,
+) -> range:
+    """
+    Allocate count consecutive numbers in the caller's transaction.
+    
+    Gapless like next_number's GAPLESS mode, but one statement for the
+    whole range (for batch document creation).
+    
+    Returns:
+        Range of allocated numbers
+    """
+    with connection.cursor() as cursor:
+        last_value = _allocate(cursor, company_id, document_type, period_key, count, floor)
+    return range(last_value - count + 1, last_value + 1)
+
+
+def reset_blocks() -> None:
+    """Discard in-process blocks (e.g. in tests)."""
+    with _blocks_lock:
+        _blocks.clear()
+
+
+def _reset_after_fork() -> None:
+    """
+    Give a forked child its own, empty block state.
+    
+    The parent's blocks would otherwise be handed out again by every
+    child. The lock is replaced because another parent thread may have
+    held it at fork time.
+    """
+    global _blocks_lock
+    _blocks_lock = threading.Lock()
+    _blocks.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
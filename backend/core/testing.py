@@ -0,0 +1,55 @@
+"""
+Test helpers.
+
+Provides:
+- assert_constant_queries: fail when a list endpoint's query count grows
+  with the number of rows (an N+1 in a serializer or view)
+"""
+from typing import Callable, Dict, Sequence
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+DEFAULT_ROW_COUNTS = (1, 50, 500)
+
+
+def assert_constant_queries(
+    client,
+    url: str,
+    create_rows: Callable[[int], None],
+    row_counts: Sequence[int] = DEFAULT_ROW_COUNTS,
+) -> Dict[int, int]:
+    """
+    Assert a GET costs the same number of queries at each row count.
+    
+    Rows are added incrementally: create_rows(n) is called with the
+    number of rows to add to reach the next count. The page size caps
+    the rows serialized, so pass a large one (e.g.
+    ?pagination=keyset&page_size=200).
+    
+    Args:
+        client: Authenticated API client
+        url: List endpoint URL
+        create_rows: Creates the given number of additional rows
+        row_counts: Total rows at each measurement
+    
+    Returns:
+        Dict of row count to query count
+    """
+    counts: Dict[int, int] = {}
+    total = 0
+    for row_count in row_counts:
+        create_rows(row_count - total)
+        total = row_count
+        
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        assert response.status_code == 200, response.content
+        counts[row_count] = len(context.captured_queries)
+    
+    assert len(set(counts.values())) == 1, (
+        f"Query count grows with rows for {url}: {counts}\n"
+        + '\n'.join(query['sql'] for query in context.captured_queries)
+    )
+    return counts